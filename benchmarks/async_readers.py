@@ -0,0 +1,120 @@
+"""Compare the sync and async facades with many simultaneous readers.
+
+Each reader loads and renders pages of actionable items, either on its own
+thread through `facade` or as its own task through `facade_async`, and the
+throughput and latency of the page loads are reported:
+
+    PYTHONPATH=./lista_de_listas_cli python benchmarks/async_readers.py \
+        --items 100000 --readers 1,10,100
+"""
+import asyncio
+import statistics
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import click
+import database
+import facade
+import facade_async
+import models
+import schemas
+from sqlalchemy import create_engine
+from sqlalchemy.orm import scoped_session, sessionmaker
+
+
+def make_database(url: str, items: int):
+    engine = create_engine(url, connect_args={'check_same_thread': False})
+    database.configure_sqlite(engine)
+    models.create_or_upgrade_schema(bind=engine)
+    # Every thread gets its own session, like with `database.db_session`.
+    facade.db_session = scoped_session(sessionmaker(bind=engine))
+
+    tag = facade.create_tag(schemas.TagCreate(name='Next'))
+    facade.create_items(
+        schemas.ItemCreate(name=f'Item {index}') for index in range(items)
+    )
+    facade.assign_tag(list(range(1, items + 1, 3)), tag)
+    facade.db_session.remove()
+
+
+def read_pages(pages: int) -> [float]:
+    latencies = []
+
+    for _ in range(pages):
+        started = time.perf_counter()
+        for item in facade.get_actionable_items():
+            facade.get_item_text_to_show(item)
+        facade.db_session.rollback()
+        latencies.append(time.perf_counter() - started)
+
+    facade.db_session.remove()
+
+    return latencies
+
+
+async def read_pages_async(pages: int) -> [float]:
+    latencies = []
+
+    for _ in range(pages):
+        started = time.perf_counter()
+        for item in await facade_async.get_actionable_items():
+            facade_async.get_item_text_to_show(item)
+        latencies.append(time.perf_counter() - started)
+
+    return latencies
+
+
+def run_threads(readers: int, pages: int) -> [[float]]:
+    with ThreadPoolExecutor(readers) as executor:
+        return list(executor.map(read_pages, [pages] * readers))
+
+
+async def run_tasks(readers: int, pages: int) -> [[float]]:
+    try:
+        return await asyncio.gather(
+            *(read_pages_async(pages) for _ in range(readers))
+        )
+    finally:
+        await facade_async.async_session.kw['bind'].dispose()
+
+
+def report(name: str, readers: int, seconds: float, latencies: [[float]]):
+    latencies = sorted(latency for run in latencies for latency in run)
+    p99 = latencies[int(len(latencies) * 0.99) - 1]
+
+    click.echo(
+        f'{name:>6} {readers:8d} {len(latencies) / seconds:12.1f} '
+        f'{statistics.median(latencies) * 1000:10.1f} {p99 * 1000:10.1f}'
+    )
+
+
+@click.command()
+@click.option('--items', default=100_000, help='Number of items stored.')
+@click.option('--readers', default='1,10,100', help='Simultaneous readers.')
+@click.option('--pages', default=20, help='Pages loaded by each reader.')
+def main(items: int, readers: str, pages: int):
+    with tempfile.TemporaryDirectory() as directory:
+        url = f'sqlite:///{directory}/benchmark.db'
+        make_database(url, items)
+        facade_async.async_session = facade_async.create_session_factory(
+            facade_async.get_async_url(url)
+        )
+
+        click.echo(
+            f"{'facade':>6} {'readers':>8} {'pages/s':>12} "
+            f"{'p50 ms':>10} {'p99 ms':>10}"
+        )
+
+        for count in [int(count) for count in readers.split(',')]:
+            started = time.perf_counter()
+            latencies = run_threads(count, pages)
+            report('sync', count, time.perf_counter() - started, latencies)
+
+            started = time.perf_counter()
+            latencies = asyncio.run(run_tasks(count, pages))
+            report('async', count, time.perf_counter() - started, latencies)
+
+
+if __name__ == '__main__':
+    main()
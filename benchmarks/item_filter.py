@@ -0,0 +1,75 @@
+"""Compare InquirerPy's fuzzy matching with `FuzzyIndex` while typing.
+
+The query is typed one key at a time over the rendered texts of synthetic
+items, and the time taken to filter after each key is reported:
+
+    PYTHONPATH=./lista_de_listas_cli python benchmarks/item_filter.py \
+        --items 100000
+"""
+import asyncio
+import random
+import time
+
+import click
+from fuzzy_filter import FuzzyIndex
+from pfzy import fuzzy_match
+
+SYLLABLES = ['ka', 'lo', 'mi', 'nu', 'pe', 'ra', 'si', 'to', 'vu', 'ze']
+TAGS = ['@Next', '@Waiting', '@Someday', '@Work', '@Personal']
+
+
+def make_texts(randomizer: random.Random, count: int) -> [str]:
+    words = [
+        ''.join(randomizer.choices(SYLLABLES, k=randomizer.randint(3, 5)))
+        for _ in range(5000)
+    ]
+
+    return [
+        ' '.join(randomizer.choices(words, k=6))
+        + ' '
+        + randomizer.choice(TAGS)
+        for _ in range(count)
+    ]
+
+
+def time_keys(filter_function, query: str) -> [float]:
+    timings = []
+
+    for length in range(1, len(query) + 1):
+        started = time.perf_counter()
+        filter_function(query[:length])
+        timings.append(time.perf_counter() - started)
+
+    return timings
+
+
+@click.command()
+@click.option('--items', default=100_000, help='Number of texts to filter.')
+def main(items: int):
+    randomizer = random.Random(0)
+    texts = make_texts(randomizer, items)
+    query = ' '.join(randomizer.choice(texts).split()[:2])
+
+    started = time.perf_counter()
+    index = FuzzyIndex(texts)
+    click.echo(
+        f'index built in {(time.perf_counter() - started) * 1000:.1f} ms'
+    )
+
+    haystack = [{'name': text} for text in texts]
+    fuzzy = time_keys(
+        lambda text: asyncio.run(fuzzy_match(text, haystack, key='name')),
+        query,
+    )
+    indexed = time_keys(index.filter, query)
+
+    click.echo(f"{'query':>24} {'pfzy ms':>10} {'index ms':>10}")
+    for length, (fuzzy_time, index_time) in enumerate(zip(fuzzy, indexed)):
+        click.echo(
+            f'{query[:length + 1]!r:>24} '
+            f'{fuzzy_time * 1000:10.2f} {index_time * 1000:10.2f}'
+        )
+
+
+if __name__ == '__main__':
+    main()
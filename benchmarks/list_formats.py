@@ -0,0 +1,81 @@
+"""Measure the throughput and memory of `list` in each output format.
+
+The command runs in its own process, writing to /dev/null, against a
+database of synthetic items, and its wall time and peak memory are
+reported. The peak includes SQLite's page cache and memory map, up to
+64 MB and 256 MB with the `performance` profile; set `SQLITE_CACHE_SIZE`
+and `SQLITE_MMAP_SIZE` to measure what the items themselves take:
+
+    SQLITE_CACHE_SIZE=-2000 SQLITE_MMAP_SIZE=0 \
+        PYTHONPATH=./lista_de_listas_cli python benchmarks/list_formats.py \
+        --items 1000000
+"""
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import click
+import database
+import facade
+import formats
+import models
+import schemas
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+MAIN = os.path.join(os.path.dirname(facade.__file__), 'main.py')
+
+
+def make_database(url: str, items: int):
+    engine = create_engine(url)
+    database.configure_sqlite(engine)
+    models.create_or_upgrade_schema(bind=engine)
+    facade.db_session = sessionmaker(bind=engine, autoflush=False)()
+
+    tag = facade.create_tag(schemas.TagCreate(name='Next'))
+    facade.create_items(
+        schemas.ItemCreate(name=f'Item {index}', description='Some text')
+        for index in range(items)
+    )
+    facade.assign_tag(list(range(1, items + 1, 3)), tag)
+
+
+def run_list(url: str, output_format: str) -> (float, int):
+    started = time.perf_counter()
+
+    with open(os.devnull, 'w') as output:
+        process = subprocess.Popen(
+            [sys.executable, MAIN, 'list', '--format', output_format],
+            stdout=output,
+            env={**os.environ, 'DATABASE_URL': url, 'DAEMON_SOCKET': ''},
+        )
+        _, status, usage = os.wait4(process.pid, 0)
+
+    if status:
+        raise click.ClickException(f'list --format {output_format} failed.')
+
+    # ru_maxrss is in kilobytes on Linux.
+    return time.perf_counter() - started, usage.ru_maxrss
+
+
+@click.command()
+@click.option('--items', default=100_000, help='Number of items listed.')
+def main(items: int):
+    with tempfile.TemporaryDirectory() as directory:
+        url = f'sqlite:///{directory}/benchmark.db'
+        make_database(url, items)
+
+        click.echo(f"{'format':>8} {'items/s':>12} {'peak MB':>10}")
+
+        for output_format in formats.WRITERS:
+            seconds, peak = run_list(url, output_format)
+            click.echo(
+                f'{output_format:>8} {items / seconds:12.0f} '
+                f'{peak / 1024:10.1f}'
+            )
+
+
+if __name__ == '__main__':
+    main()
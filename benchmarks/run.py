@@ -0,0 +1,335 @@
+"""Time the facade queries and the CLI commands on synthetic datasets.
+
+A database is generated for each size, with tags in a parent and children
+hierarchy picked with a Zipf-like distribution, and every benchmark is run
+against it. The results are written as JSON, and `--compare` prints the
+change of each median from a previous run:
+
+    PYTHONPATH=./lista_de_listas_cli python benchmarks/run.py \
+        --sizes 1000,100000,1000000 --output after.json --compare before.json
+
+Nothing is read from the network, and the daemon is never used.
+"""
+import json
+import os
+import platform
+import random
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from itertools import islice
+from typing import Callable, NamedTuple, Optional
+from unittest.mock import patch
+
+import click
+import counters
+import database
+import facade
+import main as cli_main
+import models
+import schemas
+import sqlalchemy
+from click.testing import CliRunner
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+
+MAIN = os.path.join(os.path.dirname(facade.__file__), 'main.py')
+
+# Contexts and the tags inside them, plus tags without children. Items get
+# one child tag each, so the menu has a few large views and a long tail.
+TAG_HIERARCHY = {
+    'Work': ['Email', 'Calls', 'Office', 'Reports', 'Meetings'],
+    'Home': ['Errands', 'Kitchen', 'Garden', 'Repairs'],
+    'Computer': ['Online', 'Writing', 'Code'],
+    'Agenda': ['Boss', 'Partner', 'Accountant'],
+    'Waiting for': [],
+    'Someday': [],
+}
+WORDS = (
+    'call email buy fix write read review plan pay book send ask clean '
+    'report invoice meeting garden car bank doctor project draft idea list '
+    'taxes gift trip printer budget slides contract notes backup'
+).split()
+STATUS_WEIGHTS = {
+    schemas.ItemStatus.UNDONE: 60,
+    schemas.ItemStatus.DONE: 30,
+    schemas.ItemStatus.WONT: 5,
+    schemas.ItemStatus.NOTE: 5,
+}
+INBOX_SHARE = 0.3
+
+
+class Benchmark(NamedTuple):
+    name: str
+    function: Callable
+    # Returns the arguments of the function, and is not timed.
+    setup: Optional[Callable] = None
+
+
+def use_database(url: str):
+    engine = create_engine(url)
+    database.configure_sqlite(engine)
+    models.create_or_upgrade_schema(bind=engine)
+    facade.db_session = sessionmaker(bind=engine, autoflush=False)()
+    cli_main.db_session = facade.db_session
+
+
+def make_tags() -> [models.Tag]:
+    """Create the tag hierarchy and return the tags items can be given."""
+    tags = []
+
+    for (name, children) in TAG_HIERARCHY.items():
+        parent = facade.create_tag(schemas.TagCreate(name=name))
+        tags += [
+            facade.create_tag(
+                schemas.TagCreate(name=child, parent_id=parent.id)
+            )
+            for child in children
+        ] or [parent]
+
+    return tags
+
+
+def make_items(randomizer: random.Random, count: int):
+    statuses = list(STATUS_WEIGHTS)
+    weights = list(STATUS_WEIGHTS.values())
+
+    for _ in range(count):
+        words = randomizer.choices(WORDS, k=randomizer.randint(2, 6))
+        yield schemas.ItemCreate(
+            name=' '.join(words).capitalize(),
+            description=' '.join(randomizer.choices(WORDS, k=10))
+            if randomizer.random() < 0.2
+            else None,
+            status=randomizer.choices(statuses, weights)[0],
+        )
+
+
+def make_dataset(url: str, size: int, seed: int = 0) -> models.Tag:
+    """Fill a new database and return its largest tag."""
+    randomizer = random.Random(seed)
+    use_database(url)
+
+    tags = make_tags()
+    tag_weights = [1 / rank for rank in range(1, len(tags) + 1)]
+    items = make_items(randomizer, size)
+
+    while chunk := list(islice(items, facade.IMPORT_CHUNK_SIZE)):
+        links = [
+            {'item_id': item_id, 'tag_id': tag.id}
+            for item_id in facade.insert_items(chunk)
+            if randomizer.random() >= INBOX_SHARE
+            for tag in randomizer.choices(tags, tag_weights)
+        ]
+        if links:
+            facade.db_session.execute(insert(models.ItemTag), links)
+            facade.db_session.commit()
+
+    if counters.VIEW_COUNTERS:
+        facade.rebuild_view_counters()
+
+    return tags[0]
+
+
+def measure(benchmark: Benchmark, repeat: int) -> dict:
+    times = []
+
+    for _ in range(repeat):
+        arguments = benchmark.setup() if benchmark.setup else ()
+        started = time.perf_counter()
+        benchmark.function(*arguments)
+        times.append((time.perf_counter() - started) * 1000)
+
+        # Every run starts without the objects loaded by the previous one.
+        facade.db_session.rollback()
+
+    return {
+        'runs': repeat,
+        'min_ms': min(times),
+        'median_ms': statistics.median(times),
+        'max_ms': max(times),
+    }
+
+
+def run_command(*arguments: str, url: str):
+    subprocess.run(
+        [sys.executable, MAIN, *arguments],
+        env={**os.environ, 'DATABASE_URL': url, 'DAEMON_SOCKET': ''},
+        stdout=subprocess.DEVNULL,
+        check=True,
+    )
+
+
+def invoke(*arguments: str):
+    result = CliRunner().invoke(cli_main.cli, arguments)
+
+    if result.exit_code:
+        raise click.ClickException(f'{arguments} failed: {result.output}')
+
+
+def get_benchmarks(tag: models.Tag, url: str) -> [Benchmark]:
+    return [
+        Benchmark('facade.get_item_list', facade.get_item_list),
+        Benchmark('facade.get_actionable_items', facade.get_actionable_items),
+        Benchmark('facade.get_inbox_items', facade.get_inbox_items),
+        Benchmark(
+            'facade.get_actionable_items_with_the_tag',
+            lambda: facade.get_actionable_items_with_the_tag(tag),
+        ),
+        Benchmark(
+            'facade.get_actionable_items_under_the_tag',
+            lambda: facade.get_actionable_items_under_the_tag(
+                facade.get_tag(tag.parent_id)
+            ),
+        ),
+        Benchmark(
+            'facade.iterate_items (first page)',
+            lambda: list(islice(facade.iterate_items(), facade.PAGE_SIZE)),
+        ),
+        Benchmark(
+            'facade.search_items', lambda: facade.search_items('invoice')
+        ),
+        Benchmark('facade.load_view_summary', facade.load_view_summary),
+        Benchmark('facade.get_tag_list', facade.get_tag_list),
+        Benchmark(
+            'facade.get_list_of_tags_with_items',
+            facade.get_list_of_tags_with_items,
+        ),
+        Benchmark(
+            'facade.get_list_of_tags_with_actionable_items',
+            facade.get_list_of_tags_with_actionable_items,
+        ),
+        Benchmark(
+            'facade.get_actionable_tag_list', facade.get_actionable_tag_list
+        ),
+        Benchmark(
+            'facade.get_tag_list_without_parent',
+            facade.get_tag_list_without_parent,
+        ),
+        Benchmark(
+            'facade.create_item',
+            lambda: facade.create_item(
+                schemas.ItemCreate(name='Benchmark item')
+            ),
+        ),
+        Benchmark(
+            'facade.get_item_text_to_show (one page)',
+            lambda page: [facade.get_item_text_to_show(item) for item in page],
+            setup=lambda: (facade.get_actionable_items(),),
+        ),
+        Benchmark(
+            'cli: list --format plain',
+            lambda: invoke('list', '--format', 'plain'),
+        ),
+        Benchmark(
+            'cli: list --format json --tag',
+            lambda: invoke('list', '--format', 'json', '--tag', tag.name),
+        ),
+        Benchmark('cli: add', lambda: invoke('add', 'Benchmark item')),
+        Benchmark(
+            'startup: add',
+            lambda: run_command('add', 'Benchmark item', url=url),
+        ),
+    ]
+
+
+def get_environment() -> dict:
+    return {
+        'date': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'sqlalchemy': sqlalchemy.__version__,
+        'sqlite': sqlite3.sqlite_version,
+        'platform': platform.platform(),
+        'sqlite_profile': database.SQLITE_PROFILE,
+        'view_counters': counters.VIEW_COUNTERS,
+    }
+
+
+def run_benchmarks(sizes: [int], repeat: int, pattern: str) -> [dict]:
+    """Yield the result of each benchmark whose name contains the pattern."""
+    with tempfile.TemporaryDirectory() as directory:
+        url = f'sqlite:///{directory}/empty.db'
+        use_database(url)
+        startup = Benchmark(
+            'startup: --help', lambda: run_command('--help', url=url)
+        )
+        if pattern in startup.name:
+            yield {
+                'name': startup.name,
+                'items': 0,
+                **measure(startup, repeat),
+            }
+
+        for size in sizes:
+            url = f'sqlite:///{directory}/items_{size}.db'
+            tag = make_dataset(url, size)
+
+            # The CLI would use a running daemon instead of the dataset.
+            with patch('daemon_client.send_request', return_value=None):
+                for benchmark in get_benchmarks(tag, url):
+                    if pattern in benchmark.name:
+                        yield {
+                            'name': benchmark.name,
+                            'items': size,
+                            **measure(benchmark, repeat),
+                        }
+
+
+def load_baseline(path: str) -> {(str, int): float}:
+    with open(path) as file:
+        results = json.load(file)['results']
+
+    return {
+        (result['name'], result['items']): result['median_ms']
+        for result in results
+    }
+
+
+@click.command()
+@click.option(
+    '--sizes',
+    default='1000,100000',
+    help='Comma separated numbers of items of each dataset.',
+)
+@click.option('--repeat', default=5, help='Times each benchmark is run.')
+@click.option('-k', 'pattern', default='', help='Only names containing it.')
+@click.option('--output', type=click.Path(), help='JSON file for results.')
+@click.option(
+    '--compare',
+    type=click.Path(exists=True),
+    help='JSON file of a previous run to compare with.',
+)
+def main(sizes: str, repeat: int, pattern: str, output: str, compare: str):
+    baseline = load_baseline(compare) if compare else {}
+    results = []
+
+    for result in run_benchmarks(
+        [int(size) for size in sizes.split(',')], repeat, pattern
+    ):
+        results.append(result)
+        line = (
+            f"{result['items']:>9} {result['name']:<48} "
+            f"{result['median_ms']:10.2f} ms"
+        )
+
+        previous = baseline.get((result['name'], result['items']))
+        if previous:
+            line += f" {result['median_ms'] / previous:6.2f}x"
+
+        click.echo(line)
+
+    if output:
+        with open(output, 'w') as file:
+            json.dump(
+                {'environment': get_environment(), 'results': results},
+                file,
+                indent=2,
+            )
+
+
+if __name__ == '__main__':
+    main()
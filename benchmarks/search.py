@@ -0,0 +1,83 @@
+"""Compare the FTS5 item search with a LIKE '%term%' scan.
+
+The items are made of words from a synthetic vocabulary with a Zipf-like
+distribution, and one query is timed for words of each frequency rank, as a
+LIKE scan only stops early when the word is common:
+
+    PYTHONPATH=./lista_de_listas_cli python benchmarks/search.py --items 100000
+"""
+import random
+import tempfile
+import time
+
+import click
+import database
+import facade
+import models
+import schemas
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+SYLLABLES = ['ka', 'lo', 'mi', 'nu', 'pe', 'ra', 'si', 'to', 'vu', 'ze']
+QUERY_RANKS = [10, 100, 1000, 5000]
+
+
+def make_vocabulary(randomizer: random.Random, size: int = 20000) -> [str]:
+    words = sorted(
+        {
+            ''.join(randomizer.choices(SYLLABLES, k=randomizer.randint(3, 5)))
+            for _ in range(size)
+        }
+    )
+    randomizer.shuffle(words)
+
+    return words
+
+
+def make_items(randomizer: random.Random, vocabulary: [str], count: int):
+    weights = [1 / rank for rank in range(1, len(vocabulary) + 1)]
+
+    for _ in range(count):
+        yield schemas.ItemCreate(
+            name=' '.join(randomizer.choices(vocabulary, weights, k=5)),
+            description=' '.join(
+                randomizer.choices(vocabulary, weights, k=15)
+            ),
+        )
+
+
+def time_query(search_function, query: str, repeat: int) -> float:
+    started = time.perf_counter()
+
+    for _ in range(repeat):
+        search_function(query, limit=20, load_tags=None)
+
+    return (time.perf_counter() - started) / repeat
+
+
+@click.command()
+@click.option('--items', default=100_000, help='Number of items to search.')
+@click.option('--repeat', default=5, help='Times each query is run.')
+def main(items: int, repeat: int):
+    randomizer = random.Random(0)
+    vocabulary = make_vocabulary(randomizer)
+
+    with tempfile.TemporaryDirectory() as directory:
+        engine = create_engine(f'sqlite:///{directory}/benchmark.db')
+        database.configure_sqlite(engine)
+        models.create_or_upgrade_schema(bind=engine)
+        facade.db_session = sessionmaker(bind=engine, autoflush=False)()
+
+        facade.create_items(make_items(randomizer, vocabulary, items))
+
+        click.echo(f"{'word rank':>10} {'fts5 ms':>10} {'like ms':>10}")
+
+        for rank in QUERY_RANKS:
+            query = vocabulary[rank - 1]
+            fts = time_query(facade.search_items_with_fts, query, repeat)
+            like = time_query(facade.search_items_with_like, query, repeat)
+            click.echo(f'{rank:>10} {fts * 1000:10.2f} {like * 1000:10.2f}')
+
+
+if __name__ == '__main__':
+    main()
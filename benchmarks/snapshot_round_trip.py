@@ -0,0 +1,96 @@
+"""Time exporting a database to a snapshot and importing it into an empty one.
+
+Every third item gets one of a few tags, one of them a child of another,
+and the size of the snapshot and the peak memory of the process are
+reported along with the time of each step:
+
+    PYTHONPATH=./lista_de_listas_cli python benchmarks/snapshot_round_trip.py \
+        --items 1000000
+"""
+import os
+import resource
+import tempfile
+import time
+
+import click
+import database
+import facade
+import models
+import schemas
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+TAG_NAMES = ['Work', 'Home', 'Next', 'Someday']
+
+
+def use_database(url: str):
+    engine = create_engine(url)
+    database.configure_sqlite(engine)
+    models.create_or_upgrade_schema(bind=engine)
+    facade.db_session = sessionmaker(bind=engine, autoflush=False)()
+
+
+def fill_database(items: int):
+    parent = facade.create_tag(schemas.TagCreate(name=TAG_NAMES[0]))
+    tags = [parent] + [
+        facade.create_tag(schemas.TagCreate(name=name, parent_id=parent.id))
+        for name in TAG_NAMES[1:2]
+    ]
+    tags += [
+        facade.create_tag(schemas.TagCreate(name=name))
+        for name in TAG_NAMES[2:]
+    ]
+
+    facade.create_items(
+        schemas.ItemCreate(name=f'Item {index}', description='Some text')
+        for index in range(items)
+    )
+    for (index, tag) in enumerate(tags):
+        facade.assign_tag(
+            list(range(1 + index, items + 1, 3 * len(tags))), tag
+        )
+
+
+def timed(function, *args) -> float:
+    started = time.perf_counter()
+    function(*args)
+
+    return time.perf_counter() - started
+
+
+@click.command()
+@click.option('--items', default=100_000, help='Number of items exported.')
+def main(items: int):
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'snapshot.ndjson.gz')
+
+        use_database(f'sqlite:///{directory}/source.db')
+        fill_database(items)
+
+        with open(path, 'wb') as file:
+            export_time = timed(facade.export_snapshot, file)
+
+        use_database(f'sqlite:///{directory}/target.db')
+
+        with open(path, 'rb') as file:
+            import_time = timed(facade.import_snapshot, file)
+
+        size = os.path.getsize(path)
+
+    # ru_maxrss is in kilobytes on Linux.
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    click.echo(
+        f'export: {export_time:.2f} s, {items / export_time:.0f} items/s'
+    )
+    click.echo(
+        f'import: {import_time:.2f} s, {items / import_time:.0f} items/s'
+    )
+    click.echo(
+        f'snapshot: {size / 1024 / 1024:.1f} MB, {size / items:.1f} B/item'
+    )
+    click.echo(f'peak memory: {peak / 1024:.1f} MB')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,110 @@
+"""Compare add and list throughput of each SQLite profile.
+
+Writer processes add items one by one through `facade.create_item` while
+reader processes render the actionable items view, all against the same
+database file:
+
+    PYTHONPATH=./lista_de_listas_cli python benchmarks/sqlite_profiles.py \
+        --seconds 5 --writers 4 --readers 4
+"""
+import multiprocessing
+import tempfile
+import time
+
+import click
+import database
+import facade
+import models
+import schemas
+from sqlalchemy import create_engine
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import sessionmaker
+
+
+def connect(url: str, profile: str):
+    engine = create_engine(url, connect_args={'check_same_thread': False})
+    database.configure_sqlite(engine, profile)
+    facade.db_session = sessionmaker(bind=engine, autoflush=False)()
+
+    return engine
+
+
+def add_items(url: str, profile: str, seconds: float, _) -> (int, int):
+    connect(url, profile)
+    operations = errors = 0
+    deadline = time.perf_counter() + seconds
+
+    while time.perf_counter() < deadline:
+        try:
+            facade.create_item(schemas.ItemCreate(name=f'Item {operations}'))
+            operations += 1
+        except OperationalError:
+            facade.db_session.rollback()
+            errors += 1
+
+    return operations, errors
+
+
+def list_items(url: str, profile: str, seconds: float, _) -> (int, int):
+    connect(url, profile)
+    operations = errors = 0
+    deadline = time.perf_counter() + seconds
+
+    while time.perf_counter() < deadline:
+        try:
+            for item in facade.get_actionable_items():
+                facade.get_item_text_to_show(item)
+            facade.db_session.rollback()
+            operations += 1
+        except OperationalError:
+            facade.db_session.rollback()
+            errors += 1
+
+    return operations, errors
+
+
+def run_profile(
+    profile: str, seconds: float, writers: int, readers: int
+) -> dict:
+    with tempfile.TemporaryDirectory() as directory:
+        url = f'sqlite:///{directory}/benchmark.db'
+        models.create_or_upgrade_schema(bind=connect(url, profile))
+        facade.create_items(
+            schemas.ItemCreate(name=f'Item {index}') for index in range(1000)
+        )
+
+        with multiprocessing.Pool(writers + readers) as pool:
+            arguments = (url, profile, seconds)
+            adds = pool.starmap_async(
+                add_items, [(*arguments, index) for index in range(writers)]
+            )
+            lists = pool.starmap_async(
+                list_items, [(*arguments, index) for index in range(readers)]
+            )
+            adds, lists = adds.get(), lists.get()
+
+    return {
+        'profile': profile,
+        'adds_per_second': sum(count for count, _ in adds) / seconds,
+        'lists_per_second': sum(count for count, _ in lists) / seconds,
+        'locked_errors': sum(errors for _, errors in adds + lists),
+    }
+
+
+@click.command()
+@click.option('--seconds', default=5.0, help='Duration of each profile run.')
+@click.option('--writers', default=4, help='Processes adding items.')
+@click.option('--readers', default=4, help='Processes listing items.')
+def main(seconds: float, writers: int, readers: int):
+    for profile in database.SQLITE_PROFILES:
+        result = run_profile(profile, seconds, writers, readers)
+        click.echo(
+            f"{result['profile']:>12}: "
+            f"{result['adds_per_second']:10.1f} adds/s "
+            f"{result['lists_per_second']:10.1f} lists/s "
+            f"{result['locked_errors']:6d} locked errors"
+        )
+
+
+if __name__ == '__main__':
+    main()
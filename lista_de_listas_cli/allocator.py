@@ -0,0 +1,84 @@
+import os
+import threading
+
+import models
+from decouple import config
+from sqlalchemy import func, insert, literal, select, update
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+# A process reserves the IDs of its new rows this many at a time, so that
+# most creates do not write the `id_block` table. The IDs a process did not
+# use when it exits are skipped: one-shot commands, like `add` without the
+# daemon, reserve only what they need instead.
+ID_BLOCK_SIZE: int = config('ID_BLOCK_SIZE', 50, cast=int)
+
+_reserved_ids: {tuple: range} = {}
+_reserved_ids_lock = threading.Lock()
+
+
+def get_block_key(session: Session, model) -> tuple:
+    return (str(session.get_bind().url), model.__tablename__)
+
+
+def has_reserved_ids(session: Session, model, count: int = 1) -> bool:
+    return len(_reserved_ids.get(get_block_key(session, model), ())) >= count
+
+
+def allocate_ids(
+    session: Session, model, count: int = 1, block_size: int = None
+) -> range:
+    bind = session.get_bind()
+    key = get_block_key(session, model)
+
+    with _reserved_ids_lock:
+        available = _reserved_ids.get(key, range(0))
+
+        if len(available) < count:
+            size = max(count, block_size or ID_BLOCK_SIZE)
+            first_id = reserve_block(bind, model, size)
+            available = range(first_id, first_id + size)
+
+        _reserved_ids[key] = available[count:]
+
+    return available[:count]
+
+
+def reserve_block(bind: Engine, model, size: int) -> int:
+    id_block = models.IdBlock
+    name = model.__tablename__
+
+    while True:
+        try:
+            with bind.begin() as connection:
+                updated = connection.execute(
+                    update(id_block)
+                    .where(id_block.name == name)
+                    .values(next_id=id_block.next_id + size)
+                ).rowcount
+
+                if not updated:
+                    next_id = func.coalesce(func.max(model.id), 0) + 1 + size
+                    connection.execute(
+                        insert(id_block).from_select(
+                            ['name', 'next_id'],
+                            select(literal(name), next_id),
+                        )
+                    )
+
+                next_id = connection.execute(
+                    select(id_block.next_id).where(id_block.name == name)
+                ).scalar_one()
+        except IntegrityError:
+            # Another writer created the counter row first, so increment it.
+            continue
+
+        return next_id - size
+
+
+def forget_reserved_ids():
+    _reserved_ids.clear()
+
+
+os.register_at_fork(after_in_child=forget_reserved_ids)
@@ -0,0 +1,287 @@
+from collections import Counter
+from typing import Iterable, Mapping, Optional
+
+import models
+import schemas
+from decouple import config
+from sqlalchemy import event, exists, insert, inspect, literal, select, update
+from sqlalchemy.orm import Query, Session
+
+# Keeps the number of actionable items of each view in the `view_counter`
+# table, updated in the transaction of every write, so that the menu does
+# not count the items again. Run `rebuild-counters` after turning it on.
+VIEW_COUNTERS: bool = config('VIEW_COUNTERS', default=False, cast=bool)
+
+
+def get_counter_name(view: str, tag_id: Optional[int] = None) -> str:
+    return f'{view}.{tag_id}' if tag_id is not None else view
+
+
+def get_counter_tag_id(name: str) -> Optional[int]:
+    _, _, tag_id = name.partition('.')
+
+    return int(tag_id) if tag_id else None
+
+
+def get_counter_names(
+    status: schemas.ItemStatus,
+    tag_ids: Iterable[int],
+    tree_ids: Iterable[int] = (),
+) -> [str]:
+    """Return the counters an item with this status and tags is part of.
+
+    The tree IDs are the tags with children the item is under, through any
+    of its tags.
+    """
+    if status != schemas.ItemStatus.UNDONE:
+        return []
+
+    tag_names = [get_counter_name('tag', tag_id) for tag_id in tag_ids]
+    tree_names = [get_counter_name('tree', tree_id) for tree_id in tree_ids]
+
+    return ['actionable', *(tag_names or ['inbox']), *tree_names]
+
+
+def load_tree_ids(session: Session, tag_ids: Iterable[int]) -> {int: [int]}:
+    """Return the tags with children each tag is under, itself included."""
+    result = {tag_id: [] for tag_id in tag_ids}
+    if not result:
+        return result
+
+    rows = session.execute(
+        select(models.TagPath.descendant_id, models.TagPath.ancestor_id)
+        .where(models.TagPath.descendant_id.in_(result))
+        .where(
+            exists().where(models.Tag.parent_id == models.TagPath.ancestor_id)
+        )
+    )
+    for (tag_id, tree_id) in rows:
+        result[tag_id].append(tree_id)
+
+    return result
+
+
+def get_tree_ids(tag_ids: Iterable[int], tree_ids_by_tag_id: dict) -> [int]:
+    return sorted(
+        {
+            tree_id
+            for tag_id in tag_ids
+            for tree_id in tree_ids_by_tag_id.get(tag_id, [])
+        }
+    )
+
+
+def update_counters(session: Session, deltas: Mapping[str, int]):
+    if not VIEW_COUNTERS:
+        return
+
+    connection = session.connection()
+    table = models.ViewCounter.__table__
+
+    for (name, delta) in sorted(deltas.items()):
+        if not delta:
+            continue
+
+        result = connection.execute(
+            update(table)
+            .where(table.c.name == name)
+            .values(count=table.c.count + delta)
+        )
+
+        # The update took the write lock on SQLite, so no other connection
+        # can add the row in between.
+        if not result.rowcount:
+            connection.execute(
+                insert(table).values(
+                    name=name, tag_id=get_counter_tag_id(name), count=delta
+                )
+            )
+
+
+def add_tree_counter(session: Session, tag_id: int):
+    """Start counting the tree of a tag that just got its first child.
+
+    The child has no items yet, so the tree has the items of the tag.
+    """
+    if not VIEW_COUNTERS:
+        return
+
+    table = models.ViewCounter.__table__
+    name = get_counter_name('tree', tag_id)
+    tree_counter = exists().where(table.c.name == name)
+
+    session.execute(
+        insert(table).from_select(
+            ['name', 'tag_id', 'count'],
+            select(literal(name), table.c.tag_id, table.c.count)
+            .where(table.c.name == get_counter_name('tag', tag_id))
+            .where(~tree_counter),
+        )
+    )
+
+
+def load_item_views(
+    session: Session, item_ids: [int]
+) -> {int: (schemas.ItemStatus, [int])}:
+    """Return the status and tags of the items, to count a bulk change."""
+    result = {}
+    rows = (
+        session.query(
+            models.Item.id, models.Item.status, models.ItemTag.tag_id
+        )
+        .outerjoin(models.ItemTag, models.ItemTag.item_id == models.Item.id)
+        .filter(models.Item.id.in_(item_ids))
+    )
+
+    for (item_id, status, tag_id) in rows:
+        _, tag_ids = result.setdefault(item_id, (status, []))
+        if tag_id is not None:
+            tag_ids.append(tag_id)
+
+    return result
+
+
+def get_counter_deltas(
+    before: {int: (schemas.ItemStatus, [int])},
+    after: {int: (schemas.ItemStatus, [int])},
+    tree_ids_by_tag_id: dict = None,
+) -> Counter:
+    deltas = Counter()
+    tree_ids_by_tag_id = tree_ids_by_tag_id or {}
+
+    for (status, tag_ids) in before.values():
+        tree_ids = get_tree_ids(tag_ids, tree_ids_by_tag_id)
+        deltas.subtract(get_counter_names(status, tag_ids, tree_ids))
+
+    for (status, tag_ids) in after.values():
+        tree_ids = get_tree_ids(tag_ids, tree_ids_by_tag_id)
+        deltas.update(get_counter_names(status, tag_ids, tree_ids))
+
+    return deltas
+
+
+def update_item_counters(
+    session: Session,
+    before: {int: (schemas.ItemStatus, [int])},
+    after: {int: (schemas.ItemStatus, [int])},
+):
+    """Count the change of the items from the views before to after."""
+    tag_ids = {
+        tag_id
+        for views in (before, after)
+        for (_, tag_ids) in views.values()
+        for tag_id in tag_ids
+    }
+    tree_ids_by_tag_id = load_tree_ids(session, tag_ids)
+
+    update_counters(
+        session, get_counter_deltas(before, after, tree_ids_by_tag_id)
+    )
+
+
+def read_counters(session: Session) -> Query:
+    return (
+        session.query(
+            models.ViewCounter.name,
+            models.ViewCounter.tag_id,
+            models.Tag.name,
+            models.ViewCounter.count,
+        )
+        .outerjoin(models.Tag, models.Tag.id == models.ViewCounter.tag_id)
+        .filter(models.ViewCounter.count != 0)
+    )
+
+
+def write_counters(session: Session, counts: Mapping[str, int]):
+    table = models.ViewCounter.__table__
+
+    session.execute(table.delete())
+
+    rows = [
+        {
+            'name': name,
+            'tag_id': get_counter_tag_id(name),
+            'count': count,
+        }
+        for (name, count) in counts.items()
+    ]
+    if rows:
+        session.execute(table.insert(), rows)
+
+
+def get_flushed_views(
+    session: Session, item: models.Item
+) -> (Optional[tuple], Optional[tuple]):
+    """Return the status and tags of the item before and after a flush."""
+    attributes = inspect(item).attrs
+    status = attributes.status.load_history()
+    tags = attributes.tags.load_history()
+
+    old_view = None
+    if item not in session.new:
+        old_status = next(iter(status.deleted or status.unchanged), None)
+        old_tags = [tag.id for tag in (*tags.unchanged, *tags.deleted)]
+        old_view = (old_status, old_tags)
+
+    new_view = None
+    if item not in session.deleted:
+        # The column default is only applied by the insert.
+        new_status = item.status or schemas.ItemStatus.UNDONE
+        new_tags = [tag.id for tag in (*tags.unchanged, *tags.added)]
+        new_view = (new_status, new_tags)
+
+    return old_view, new_view
+
+
+def keep_the_previous_status(*_):
+    # With active history, the previous status is loaded before it is
+    # replaced, so the flush knows which counters the item leaves.
+    pass
+
+
+def count_flushed_items(session: Session, *_):
+    if not VIEW_COUNTERS:
+        return
+
+    before = {}
+    after = {}
+
+    for item in [*session.new, *session.dirty, *session.deleted]:
+        if isinstance(item, models.Item):
+            old_view, new_view = get_flushed_views(session, item)
+            if old_view == new_view:
+                continue
+            if old_view:
+                before[id(item)] = old_view
+            if new_view:
+                after[id(item)] = new_view
+
+    if before or after:
+        update_item_counters(session, before, after)
+
+
+def listen_for_flushes():
+    """Count the items of every flush, from now on."""
+    if event.contains(Session, 'before_flush', count_flushed_items):
+        return
+
+    event.listen(
+        models.Item.status,
+        'set',
+        keep_the_previous_status,
+        active_history=True,
+    )
+    event.listen(Session, 'before_flush', count_flushed_items)
+
+
+def stop_listening_for_flushes():
+    if not event.contains(Session, 'before_flush', count_flushed_items):
+        return
+
+    event.remove(models.Item.status, 'set', keep_the_previous_status)
+    event.remove(Session, 'before_flush', count_flushed_items)
+
+
+# Without counters, changing a status does not load the previous one.
+if VIEW_COUNTERS:
+    listen_for_flushes()
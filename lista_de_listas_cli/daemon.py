@@ -0,0 +1,140 @@
+import asyncio
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+import facade
+import schemas
+from daemon_client import SOCKET_PATH, send_request
+from decouple import config
+
+# Adds that arrive within this many seconds are written in one transaction.
+BATCH_DELAY: float = config('DAEMON_BATCH_DELAY', 0.005, cast=float)
+BATCH_SIZE: int = config('DAEMON_BATCH_SIZE', 500, cast=int)
+
+
+class DaemonError(Exception):
+    pass
+
+
+class Daemon:
+    def __init__(
+        self, batch_delay: float = BATCH_DELAY, batch_size: int = BATCH_SIZE
+    ):
+        self.batch_delay = batch_delay
+        self.batch_size = batch_size
+        # The facade shares one session, so every database call runs on the
+        # same worker thread.
+        self.executor = ThreadPoolExecutor(max_workers=1)
+        self.pending_items: Optional[asyncio.Queue] = None
+
+    async def run_in_executor(self, function, *args):
+        loop = asyncio.get_running_loop()
+
+        return await loop.run_in_executor(self.executor, function, *args)
+
+    async def serve(self, socket_path: str = SOCKET_PATH):
+        remove_stale_socket(socket_path)
+
+        self.pending_items = asyncio.Queue()
+        await self.run_in_executor(facade.get_tag_registry)
+
+        server = await asyncio.start_unix_server(
+            self.handle_client, path=socket_path
+        )
+        commit_task = asyncio.create_task(self.commit_pending_items())
+
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            commit_task.cancel()
+            self.executor.shutdown()
+            if os.path.exists(socket_path):
+                os.unlink(socket_path)
+
+    async def handle_client(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ):
+        try:
+            while line := await reader.readline():
+                try:
+                    response = await self.handle_request(json.loads(line))
+                except (ValueError, AttributeError):
+                    # Not JSON, or not an object.
+                    response = {'ok': False, 'error': 'Invalid request.'}
+                writer.write(json.dumps(response).encode() + b'\n')
+                await writer.drain()
+        finally:
+            writer.close()
+
+    async def handle_request(self, request: dict) -> dict:
+        handlers = {'add': self.add, 'list': self.list, 'ping': self.ping}
+        handler = handlers.get(request.get('command'))
+
+        if not handler:
+            return {'ok': False, 'error': 'Unknown command.'}
+
+        try:
+            return {'ok': True, **await handler(request)}
+        except ValueError as error:
+            return {'ok': False, 'error': str(error)}
+
+    async def ping(self, _: dict) -> dict:
+        return {}
+
+    async def add(self, request: dict) -> dict:
+        item = schemas.ItemCreate(
+            name=request.get('name', ''),
+            description=request.get('description'),
+        )
+        item_id = asyncio.get_running_loop().create_future()
+
+        await self.pending_items.put((item, item_id))
+
+        return {'id': await item_id}
+
+    async def list(self, request: dict) -> dict:
+        return await self.run_in_executor(
+            facade.get_actionable_page, request.get('cursor')
+        )
+
+    async def commit_pending_items(self):
+        while True:
+            batch = [await self.pending_items.get()]
+
+            await asyncio.sleep(self.batch_delay)
+
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self.pending_items.get_nowait())
+                except asyncio.QueueEmpty:
+                    break
+
+            items = [item for item, _ in batch]
+
+            try:
+                ids = await self.run_in_executor(facade.insert_items, items)
+            except Exception as error:  # pylint: disable=broad-except
+                # The next batches would fail on the session left by this one.
+                await self.run_in_executor(facade.db_session.rollback)
+                for _, item_id in batch:
+                    item_id.set_exception(error)
+            else:
+                for (_, item_id), new_id in zip(batch, ids):
+                    item_id.set_result(new_id)
+
+
+def remove_stale_socket(socket_path: str):
+    if not os.path.exists(socket_path):
+        return
+
+    if send_request({'command': 'ping'}, socket_path=socket_path) is not None:
+        raise DaemonError(f'A daemon is already listening on {socket_path}.')
+
+    os.unlink(socket_path)
+
+
+def serve(socket_path: str = SOCKET_PATH):
+    asyncio.run(Daemon().serve(socket_path))
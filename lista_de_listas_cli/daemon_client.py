@@ -0,0 +1,36 @@
+import json
+import os
+import socket
+from typing import Optional
+
+from decouple import config
+
+# The commands used from scripts only import this module, so that they do not
+# pay for loading the daemon and asyncio.
+SOCKET_PATH: str = config(
+    'DAEMON_SOCKET', os.path.join(os.path.dirname(__file__), 'daemon.sock')
+)
+CLIENT_TIMEOUT: float = config('DAEMON_CLIENT_TIMEOUT', 10.0, cast=float)
+
+
+def send_request(
+    request: dict, socket_path: str = SOCKET_PATH
+) -> Optional[dict]:
+    """Send a request to the daemon, or return None if it is not running."""
+    if not os.path.exists(socket_path):
+        return None
+
+    client = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    client.settimeout(CLIENT_TIMEOUT)
+
+    try:
+        client.connect(socket_path)
+    except (ConnectionRefusedError, FileNotFoundError):
+        client.close()
+        return None
+
+    # Once the request was sent, errors are raised instead of falling back,
+    # otherwise an add could be written twice.
+    with client, client.makefile('rb') as response:
+        client.sendall(json.dumps(request).encode() + b'\n')
+        return json.loads(response.readline())
@@ -1,21 +1,92 @@
 import os
 
 from decouple import config
-from sqlalchemy import create_engine
-from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import declarative_base, scoped_session, sessionmaker
 
 SQLALCHEMY_DATABASE_URL: str = config(
     'DATABASE_URL', f'sqlite:///{os.path.dirname(__file__)}/db.sqlite3'
 )
+
+# Pragmas applied to every new SQLite connection. The `default` profile keeps
+# SQLite's own settings; `performance` lets readers and writers from several
+# processes work at the same time and trades durability of the very last
+# transactions on power loss for fewer fsyncs. WAL needs shared memory
+# between the processes, so it does not work on network filesystems, and
+# switching to it is kept by the database file: it is opt-in.
+SQLITE_PROFILES = {
+    'default': {},
+    'performance': {
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',
+        'cache_size': -64000,
+        'mmap_size': 268435456,
+        'temp_store': 'MEMORY',
+        'busy_timeout': 5000,
+    },
+}
+SQLITE_PRAGMAS = [
+    'journal_mode',
+    'synchronous',
+    'cache_size',
+    'mmap_size',
+    'temp_store',
+    'busy_timeout',
+]
+
+SQLITE_PROFILE: str = config('SQLITE_PROFILE', 'default')
+
+# With it disabled, objects keep their loaded state after a commit instead of
+# being reloaded on the next access.
+EXPIRE_ON_COMMIT: bool = config(
+    'DATABASE_EXPIRE_ON_COMMIT', default=True, cast=bool
+)
+
+
+def get_sqlite_pragmas(profile: str = SQLITE_PROFILE) -> dict:
+    """Return the pragmas of the profile, overridden by `SQLITE_<PRAGMA>`."""
+    pragmas = SQLITE_PROFILES[profile].copy()
+
+    for name in SQLITE_PRAGMAS:
+        value = config(f'SQLITE_{name.upper()}', None)
+        if value is not None:
+            pragmas[name] = value
+
+    return pragmas
+
+
+def configure_sqlite(bind: Engine, profile: str = SQLITE_PROFILE):
+    if bind.dialect.name != 'sqlite':
+        return
+
+    pragmas = get_sqlite_pragmas(profile)
+
+    @event.listens_for(bind, 'connect')
+    def set_sqlite_pragmas(dbapi_connection, _):
+        cursor = dbapi_connection.cursor()
+        for (name, value) in pragmas.items():
+            cursor.execute(f'PRAGMA {name} = {value}')
+        cursor.close()
+
+
 connect_args = (
     {'check_same_thread': False}
     if SQLALCHEMY_DATABASE_URL.startswith('sqlite:')
     else {}
 )
 engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args=connect_args)
+configure_sqlite(engine)
 
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+SessionLocal = sessionmaker(
+    autocommit=False,
+    autoflush=False,
+    expire_on_commit=EXPIRE_ON_COMMIT,
+    bind=engine,
+)
 
 Base = declarative_base()
-db_session = SessionLocal()
+
+# Every thread gets its own session; `db_session.remove()` closes it and
+# drops its identity map.
+db_session = scoped_session(SessionLocal)
@@ -1,47 +1,256 @@
+import re
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from collections import Counter
+from contextlib import nullcontext
+from itertools import islice
+from typing import (
+    IO,
+    Callable,
+    ContextManager,
+    Iterable,
+    Iterator,
+    NamedTuple,
+    Optional,
+)
+
+import counters
 import models
 import schemas
+import snapshot
+import write_behind
+from allocator import allocate_ids, has_reserved_ids
 from database import db_session
-from sqlalchemy import func
+from sqlalchemy import (
+    BigInteger,
+    Float,
+    and_,
+    delete,
+    distinct,
+    exists,
+    func,
+    insert,
+    literal,
+    null,
+    or_,
+    select,
+    text,
+    union_all,
+    update,
+)
+from sqlalchemy.orm import Query, Session, selectinload
+from sqlalchemy.orm.util import identity_key
+from sqlalchemy.sql.expression import Delete, Exists, Insert, Select, Update
+from tag_registry import TagInfo, TagRegistry
+
+IMPORT_CHUNK_SIZE = 500
+PAGE_SIZE = 100
+STREAM_BATCH_SIZE = 1000
+
+TagLoader = Optional[Callable]
+
+
+class TagCount(NamedTuple):
+    id: int
+    name: str
+    count: int
+
+
+class ViewSummary(NamedTuple):
+    inbox: int
+    actionable: int
+    tags: [TagCount]
+    # The tags with children, counting the items of their descendants too.
+    trees: [TagCount] = []
+
+
+_tag_registry: dict = {'session': None, 'registry': None}
+_view_summary: dict = {'session': None, 'summary': None}
+_write_behind: dict = {'writer': None}
+
+
+def encode_cursor(row_id: int) -> str:
+    return urlsafe_b64encode(f'id:{row_id}'.encode()).decode()
+
+
+def decode_cursor(cursor: Optional[str]) -> int:
+    if not cursor:
+        return 0
+
+    try:
+        prefix, row_id = urlsafe_b64decode(cursor.encode()).decode().split(':')
+        if prefix != 'id':
+            raise ValueError
+
+        return int(row_id)
+    except ValueError as error:
+        raise ValueError('Invalid cursor.') from error
+
+
+def get_next_cursor(page: list, limit: int = PAGE_SIZE) -> Optional[str]:
+    if page and len(page) >= limit:
+        return encode_cursor(page[-1].id)
+
+    return None
 
 
-def get_item_list(skip: int = 0, limit: int = 100) -> [models.Item]:
-    return db_session.query(models.Item).offset(skip).limit(limit).all()
+def get_all_pages(function: Callable, *args, limit: int = PAGE_SIZE) -> list:
+    result = []
+    cursor = None
 
+    while True:
+        page = function(*args, cursor=cursor, limit=limit)
+        result.extend(page)
 
-def get_actionable_items(skip: int = 0, limit: int = 100) -> [models.Item]:
+        cursor = get_next_cursor(page, limit)
+        if not cursor:
+            return result
+
+
+# The statements built by the functions returning a `Select`, `Insert`,
+# `Update` or `Delete` are also run by the async facade.
+def select_items(load_tags: TagLoader = selectinload) -> Select:
+    statement = select(models.Item)
+
+    if load_tags:
+        statement = statement.options(load_tags(models.Item.tags))
+
+    return statement
+
+
+def query_items(load_tags: TagLoader = selectinload) -> Query:
+    query = db_session.query(models.Item)
+
+    if load_tags:
+        query = query.options(load_tags(models.Item.tags))
+
+    return query
+
+
+def get_item_list(
+    cursor: Optional[str] = None,
+    limit: int = PAGE_SIZE,
+    load_tags: TagLoader = selectinload,
+) -> [models.Item]:
     return (
-        db_session.query(models.Item)
+        query_items(load_tags)
+        .filter(models.Item.id > decode_cursor(cursor))
+        .order_by(models.Item.id)
+        .limit(limit)
+        .all()
+    )
+
+
+def get_actionable_items(
+    cursor: Optional[str] = None,
+    limit: int = PAGE_SIZE,
+    load_tags: TagLoader = selectinload,
+) -> [models.Item]:
+    return (
+        query_items(load_tags)
         .filter_by(status=schemas.ItemStatus.UNDONE)
-        .offset(skip)
+        .filter(models.Item.id > decode_cursor(cursor))
+        .order_by(models.Item.id)
         .limit(limit)
         .all()
     )
 
 
-def get_inbox_items(skip: int = 0, limit: int = 100) -> [models.Item]:
+def get_inbox_items(
+    cursor: Optional[str] = None,
+    limit: int = PAGE_SIZE,
+    load_tags: TagLoader = selectinload,
+) -> [models.Item]:
     return (
-        db_session.query(models.Item)
+        query_items(load_tags)
         .filter_by(status=schemas.ItemStatus.UNDONE)
         .filter(~models.Item.tags.any())
-        .offset(skip)
+        .filter(models.Item.id > decode_cursor(cursor))
+        .order_by(models.Item.id)
         .limit(limit)
         .all()
     )
 
 
+def get_actionable_page(cursor: Optional[str] = None) -> dict:
+    page = get_actionable_items(cursor=cursor)
+
+    return {
+        'items': [
+            {'id': item.id, 'text': get_item_text_to_show(item)}
+            for item in page
+        ],
+        'cursor': get_next_cursor(page),
+    }
+
+
 def get_actionable_items_with_the_tag(
-    tag: models.Tag, skip: int = 0, limit: int = 100
+    tag: models.Tag,
+    cursor: Optional[str] = None,
+    limit: int = PAGE_SIZE,
+    load_tags: TagLoader = selectinload,
 ) -> [models.Item]:
     return (
-        db_session.query(models.Item)
+        query_items(load_tags)
         .filter_by(status=schemas.ItemStatus.UNDONE)
         .filter(models.Item.tags.any(id=tag.id))
-        .offset(skip)
+        .filter(models.Item.id > decode_cursor(cursor))
+        .order_by(models.Item.id)
         .limit(limit)
         .all()
     )
 
 
+def get_actionable_items_under_the_tag(
+    tag: models.Tag,
+    cursor: Optional[str] = None,
+    limit: int = PAGE_SIZE,
+    load_tags: TagLoader = selectinload,
+) -> [models.Item]:
+    """Return the items with the tag or any of its descendants."""
+    return (
+        query_items(load_tags)
+        .filter_by(status=schemas.ItemStatus.UNDONE)
+        .filter(is_under_the_tag(tag.id))
+        .filter(models.Item.id > decode_cursor(cursor))
+        .order_by(models.Item.id)
+        .limit(limit)
+        .all()
+    )
+
+
+def is_under_the_tag(tag_id: int) -> Exists:
+    # An item with many tags of the subtree still matches once.
+    return (
+        exists()
+        .where(models.ItemTag.item_id == models.Item.id)
+        .where(models.ItemTag.tag_id == models.TagPath.descendant_id)
+        .where(models.TagPath.ancestor_id == tag_id)
+    )
+
+
+def iterate_items(
+    statuses: [schemas.ItemStatus] = None,
+    tag: models.Tag = None,
+    inbox: bool = False,
+    batch_size: int = STREAM_BATCH_SIZE,
+) -> Iterator[models.Item]:
+    """Yield the items as they are fetched, a batch at a time.
+
+    The session only keeps weak references to unchanged objects, so the
+    items are released once the caller is done with them.
+    """
+    query = query_items()
+
+    if statuses:
+        query = query.filter(models.Item.status.in_(statuses))
+    if tag:
+        query = query.filter(models.Item.tags.any(id=tag.id))
+    if inbox:
+        query = query.filter(~models.Item.tags.any())
+
+    return iter(query.order_by(models.Item.id).yield_per(batch_size))
+
+
 # def get_non_actionable_items(
 #         skip: int = 0, limit: int = 100
 # ) -> [models.Item]:
@@ -50,48 +259,621 @@ def get_actionable_items_with_the_tag(
 #         .offset(skip).limit(limit).all()
 
 
+def get_search_terms(query: str) -> [str]:
+    return re.findall(r'\w+', query.lower())
+
+
+def search_items(
+    query: str,
+    statuses: [schemas.ItemStatus] = None,
+    limit: int = PAGE_SIZE,
+    load_tags: TagLoader = selectinload,
+) -> [models.Item]:
+    if db_session.get_bind().dialect.name == 'sqlite':
+        search_function = search_items_with_fts
+    else:
+        search_function = search_items_with_like
+
+    return search_function(query, statuses, limit, load_tags)
+
+
+def search_items_with_fts(
+    query: str,
+    statuses: [schemas.ItemStatus] = None,
+    limit: int = PAGE_SIZE,
+    load_tags: TagLoader = selectinload,
+) -> [models.Item]:
+    terms = get_search_terms(query)
+    if not terms:
+        return []
+
+    statement = select_items_with_fts(terms, load_tags)
+    statement = filter_by_statuses(statement, statuses).limit(limit)
+
+    return db_session.scalars(statement).all()
+
+
+def search_items_with_like(
+    query: str,
+    statuses: [schemas.ItemStatus] = None,
+    limit: int = PAGE_SIZE,
+    load_tags: TagLoader = selectinload,
+) -> [models.Item]:
+    terms = get_search_terms(query)
+    if not terms:
+        return []
+
+    statement = select_items_with_like(terms, load_tags)
+    statement = filter_by_statuses(statement, statuses).limit(limit)
+
+    return db_session.scalars(statement).all()
+
+
+def select_items_with_fts(terms: [str], load_tags: TagLoader) -> Select:
+    # Every term has to match, either as a whole word or as a word prefix.
+    match = ' '.join(f'"{term}"*' for term in terms)
+    ranking = (
+        text(
+            'SELECT rowid AS item_id, bm25(item_search) AS score '
+            'FROM item_search WHERE item_search MATCH :match'
+        )
+        .bindparams(match=match)
+        .columns(item_id=BigInteger, score=Float)
+        .subquery('ranking')
+    )
+
+    return (
+        select_items(load_tags)
+        .join(ranking, ranking.c.item_id == models.Item.id)
+        .order_by(ranking.c.score, models.Item.id)
+    )
+
+
+def select_items_with_like(terms: [str], load_tags: TagLoader) -> Select:
+    return (
+        select_items(load_tags)
+        .where(
+            and_(
+                *(
+                    or_(
+                        func.lower(models.Item.name).contains(
+                            term, autoescape=True
+                        ),
+                        func.lower(models.Item.description).contains(
+                            term, autoescape=True
+                        ),
+                    )
+                    for term in terms
+                )
+            )
+        )
+        .order_by(models.Item.id)
+    )
+
+
+def filter_by_statuses(
+    statement: Select, statuses: Optional[Iterable[schemas.ItemStatus]]
+) -> Select:
+    if statuses:
+        statement = statement.where(models.Item.status.in_(statuses))
+
+    return statement
+
+
+def get_view_summary() -> ViewSummary:
+    """Return the number of actionable items of each view of the menu.
+
+    The summary is kept until the next write made through this module.
+    """
+    if (
+        _view_summary['summary'] is None
+        or _view_summary['session'] is not db_session
+    ):
+        _view_summary['summary'] = load_view_summary()
+        _view_summary['session'] = db_session
+
+    return _view_summary['summary']
+
+
+def load_view_summary() -> ViewSummary:
+    if counters.VIEW_COUNTERS:
+        rows = counters.read_counters(db_session)
+    else:
+        rows = read_view_counts()
+
+    return make_view_summary(rows)
+
+
+def make_view_summary(rows: Iterable[tuple]) -> ViewSummary:
+    totals = {'inbox': 0, 'actionable': 0}
+    tags = []
+    trees = []
+
+    # The views are named like the counters, or just 'tag' and 'tree'.
+    for (view, tag_id, tag_name, count) in rows:
+        if view.startswith('tree'):
+            trees.append(TagCount(tag_id, tag_name, count))
+        elif tag_id is not None:
+            tags.append(TagCount(tag_id, tag_name, count))
+        else:
+            totals[view] = count
+
+    return ViewSummary(tags=sorted(tags), trees=sorted(trees), **totals)
+
+
+def count_views() -> Select:
+    undone = models.Item.status == schemas.ItemStatus.UNDONE
+    item_count = func.count(models.Item.id)
+
+    tag_counts = (
+        select(literal('tag'), models.Tag.id, models.Tag.name, item_count)
+        .join_from(
+            models.Tag,
+            models.ItemTag,
+            models.ItemTag.tag_id == models.Tag.id,
+        )
+        .join(models.Item, models.Item.id == models.ItemTag.item_id)
+        .where(undone)
+        .group_by(models.Tag.id, models.Tag.name)
+    )
+    inbox_count = (
+        select(literal('inbox'), null(), null(), item_count)
+        .where(undone)
+        .where(~models.Item.tags.any())
+    )
+    actionable_count = select(
+        literal('actionable'), null(), null(), item_count
+    ).where(undone)
+    # An item with many tags of the same subtree is counted once.
+    tree_counts = (
+        select(
+            literal('tree'),
+            models.Tag.id,
+            models.Tag.name,
+            func.count(distinct(models.Item.id)),
+        )
+        .join_from(
+            models.Tag,
+            models.TagPath,
+            models.TagPath.ancestor_id == models.Tag.id,
+        )
+        .join(
+            models.ItemTag,
+            models.ItemTag.tag_id == models.TagPath.descendant_id,
+        )
+        .join(models.Item, models.Item.id == models.ItemTag.item_id)
+        .where(undone)
+        .where(models.Tag.children.any())
+        .group_by(models.Tag.id, models.Tag.name)
+    )
+
+    return union_all(tag_counts, inbox_count, actionable_count, tree_counts)
+
+
+def read_view_counts() -> Iterable[tuple]:
+    # Unlike a query, a compound select does not flush the session first.
+    db_session.flush()
+
+    return db_session.execute(count_views())
+
+
+def rebuild_view_counters() -> int:
+    counts = {
+        counters.get_counter_name(view, tag_id): count
+        for (view, tag_id, _, count) in read_view_counts()
+        if count
+    }
+
+    counters.write_counters(db_session, counts)
+    db_session.commit()
+
+    invalidate_view_summary()
+
+    return len(counts)
+
+
+def check_view_counters() -> [(str, int, int)]:
+    """Return the counters that differ from the items, with both counts."""
+    expected = {
+        counters.get_counter_name(view, tag_id): count
+        for (view, tag_id, _, count) in read_view_counts()
+        if count
+    }
+    actual = {
+        name: count
+        for (name, _, _, count) in counters.read_counters(db_session)
+    }
+
+    return [
+        (name, expected.get(name, 0), actual.get(name, 0))
+        for name in sorted(expected.keys() | actual.keys())
+        if expected.get(name, 0) != actual.get(name, 0)
+    ]
+
+
+def invalidate_view_summary():
+    _view_summary['summary'] = None
+
+
+def commit():
+    """Commit the session, or leave it to the write-behind writer if on."""
+    writer = _write_behind['writer']
+
+    if writer is None:
+        db_session.commit()
+    else:
+        writer.changed()
+
+
+def start_write_behind(journal_path: str = None) -> int:
+    """Batch the commits of this module until `stop_write_behind()`.
+
+    The changes a previous session left in the journal are applied first,
+    and their number is returned.
+    """
+    # The session of this thread, when `db_session` is a scoped session.
+    session = db_session() if callable(db_session) else db_session
+
+    writer = write_behind.WriteBehind(
+        session,
+        journal_path or write_behind.get_journal_path(session.get_bind()),
+    )
+    recovered = writer.start()
+    _write_behind['writer'] = writer
+
+    invalidate_tag_registry()
+    invalidate_view_summary()
+
+    return recovered
+
+
+def stop_write_behind():
+    writer = _write_behind['writer']
+
+    if writer is not None:
+        _write_behind['writer'] = None
+        writer.stop()
+
+
+def commit_pending_writes():
+    writer = _write_behind['writer']
+
+    if writer is not None and writer.pending:
+        writer.commit()
+
+
+def waiting_for_input() -> ContextManager:
+    """Let the pending writes be committed while the block runs."""
+    writer = _write_behind['writer']
+
+    return writer.waiting_for_input() if writer else nullcontext()
+
+
+def allocate_id(model, block_size: int = None) -> int:
+    writer = _write_behind['writer']
+
+    # A new block of IDs is reserved on a connection of its own, which would
+    # wait for the database lock held by the pending writes.
+    if writer and writer.pending and not has_reserved_ids(db_session, model):
+        writer.commit()
+
+    return allocate_ids(db_session, model, block_size=block_size)[0]
+
+
 def get_item(item_id: int) -> models.Item:
     return db_session.query(models.Item).filter_by(id=item_id).first()
 
 
-def create_item(item: schemas.ItemCreate) -> models.Item:
-    item_id = db_session.query(func.max(models.Item.id)).scalar() + 1
-
+def create_item(
+    item: schemas.ItemCreate, id_block_size: int = None
+) -> models.Item:
     item = models.Item(
-        id=item_id,
+        id=allocate_id(models.Item, block_size=id_block_size),
         **item.dict(),
     )
 
     db_session.add(item)
-    db_session.commit()
+    commit()
     db_session.refresh(item)
 
+    invalidate_view_summary()
+
     return item
 
 
+def insert_items(items: [schemas.ItemCreate]) -> [int]:
+    ids = allocate_ids(db_session, models.Item, count=len(items))
+
+    rows = [
+        {
+            'id': item_id,
+            'name': item.name.strip(),
+            'description': item.description,
+            'status': item.status,
+        }
+        for item_id, item in zip(ids, items)
+    ]
+
+    db_session.execute(insert(models.Item), rows)
+    counters.update_counters(
+        db_session,
+        Counter(
+            name
+            for row in rows
+            for name in counters.get_counter_names(row['status'], [])
+        ),
+    )
+    commit()
+
+    invalidate_view_summary()
+
+    return list(ids)
+
+
+def create_items(
+    items: Iterable[schemas.ItemCreate], chunk_size: int = IMPORT_CHUNK_SIZE
+) -> int:
+    return sum(insert_items_in_chunks(items, chunk_size))
+
+
+def insert_items_in_chunks(
+    items: Iterable[schemas.ItemCreate], chunk_size: int = IMPORT_CHUNK_SIZE
+) -> Iterator[int]:
+    """Insert the items one chunk per transaction, yielding each chunk size.
+
+    What was yielded is committed, even if reading the next items fails.
+    """
+    iterator = iter(items)
+
+    while chunk := list(islice(iterator, chunk_size)):
+        yield len(insert_items(chunk))
+
+
+def export_snapshot(output: IO[bytes]) -> (int, int):
+    return snapshot.write_snapshot(db_session, output)
+
+
+def import_snapshot(file: IO[bytes]) -> (int, int):
+    counts = snapshot.read_snapshot(db_session, file)
+
+    invalidate_tag_registry()
+    invalidate_view_summary()
+
+    return counts
+
+
+def edit_item(item: models.Item, item_data: schemas.ItemCreate):
+    for (key, value) in item_data.dict(exclude={'tags'}).items():
+        setattr(item, key, value)
+
+    commit()
+
+    invalidate_view_summary()
+
+
 def set_item_status(item: models.Item, status: schemas.ItemStatus):
     item.status = status
-    db_session.commit()
+    commit()
+
+    invalidate_view_summary()
 
 
-def get_tag_list(skip: int = 0, limit: int = 100) -> [models.Item]:
-    return db_session.query(models.Tag).offset(skip).limit(limit).all()
+def set_items_status(item_ids: [int], status: schemas.ItemStatus) -> int:
+    if counters.VIEW_COUNTERS:
+        update_counters_of_the_items(
+            db_session, item_ids, lambda _, tag_ids: (status, tag_ids)
+        )
+
+    result = db_session.execute(update_items_status(item_ids, status))
+    commit()
+
+    expire_items(item_ids, ['status'])
+
+    invalidate_view_summary()
+
+    return result.rowcount
+
+
+def update_items_status(item_ids: [int], status: schemas.ItemStatus) -> Update:
+    return (
+        update(models.Item)
+        .where(models.Item.id.in_(item_ids))
+        .values(status=status)
+        .execution_options(synchronize_session=False)
+    )
+
+
+def update_counters_of_the_items(
+    session: Session, item_ids: [int], change: Callable
+):
+    """Count the items again with the status and tags `change` returns."""
+    before = counters.load_item_views(session, item_ids)
+    after = {
+        item_id: change(status, tag_ids)
+        for (item_id, (status, tag_ids)) in before.items()
+    }
+
+    counters.update_item_counters(session, before, after)
+
+
+def expire_items(item_ids: [int], attributes: [str]):
+    """Reload the attributes a set-based statement changed, when accessed."""
+    for item_id in item_ids:
+        item = db_session.identity_map.get(identity_key(models.Item, item_id))
+        if item is not None:
+            db_session.expire(item, attributes)
+
+
+def assign_tag(item_ids: [int], tag: models.Tag) -> int:
+    """Add the tag to the items, replacing the other tags of its group."""
+    sibling_ids = get_sibling_ids(get_tag_registry(), tag)
+
+    if counters.VIEW_COUNTERS:
+        update_counters_of_the_items(
+            db_session,
+            item_ids,
+            lambda status, tag_ids: (
+                status,
+                replace_group_tag(tag_ids, tag.id, sibling_ids),
+            ),
+        )
+
+    if sibling_ids:
+        db_session.execute(delete_item_tags(item_ids, sibling_ids))
+
+    result = db_session.execute(insert_missing_item_tags(item_ids, tag.id))
+    commit()
+
+    expire_items(item_ids, ['tags'])
+    db_session.expire(tag, ['items'])
+
+    invalidate_view_summary()
+
+    return result.rowcount
+
+
+def get_sibling_ids(registry: TagRegistry, tag: models.Tag) -> [int]:
+    """Return the other tags of the group of the tag."""
+    if not tag.parent_id:
+        return []
+
+    return [
+        sibling.id
+        for sibling in registry.get_children(tag.parent_id)
+        if sibling.id != tag.id
+    ]
+
+
+def replace_group_tag(
+    tag_ids: [int], tag_id: int, sibling_ids: [int]
+) -> [int]:
+    return [
+        *(
+            other_id
+            for other_id in tag_ids
+            if other_id not in sibling_ids and other_id != tag_id
+        ),
+        tag_id,
+    ]
+
+
+def delete_item_tags(item_ids: [int], tag_ids: Iterable[int]) -> Delete:
+    return (
+        delete(models.ItemTag)
+        .where(models.ItemTag.item_id.in_(item_ids))
+        .where(models.ItemTag.tag_id.in_(tag_ids))
+        .execution_options(synchronize_session=False)
+    )
+
+
+def insert_missing_item_tags(item_ids: [int], tag_id: int) -> Insert:
+    already_tagged = exists().where(
+        models.ItemTag.item_id == models.Item.id,
+        models.ItemTag.tag_id == tag_id,
+    )
+
+    return insert(models.ItemTag).from_select(
+        ['item_id', 'tag_id'],
+        select(models.Item.id, literal(tag_id))
+        .where(models.Item.id.in_(item_ids))
+        .where(~already_tagged),
+    )
+
+
+def set_item_tags(item_id: int, tag_ids: [int]) -> int:
+    """Give the item exactly these tags, and return how many rows changed.
+
+    Of two tags of the same group, the last one is kept, like when they are
+    appended to `Item.tags`.
+    """
+    parent_id_by_tag_id = dict(
+        db_session.execute(select_parent_ids(tag_ids)).all()
+    )
+    new_ids = pick_item_tags(tag_ids, parent_id_by_tag_id)
+    current_ids = set(db_session.scalars(select_tag_ids_of_the_item(item_id)))
+
+    if counters.VIEW_COUNTERS:
+        update_counters_of_the_items(
+            db_session, [item_id], lambda status, _: (status, new_ids)
+        )
+
+    removed_ids = current_ids.difference(new_ids)
+    added_ids = set(new_ids) - current_ids
+
+    if removed_ids:
+        db_session.execute(delete_item_tags([item_id], removed_ids))
+    if added_ids:
+        db_session.execute(
+            insert(models.ItemTag),
+            [{'item_id': item_id, 'tag_id': tag_id} for tag_id in added_ids],
+        )
+    commit()
+
+    expire_items([item_id], ['tags'])
+    for tag_id in removed_ids | added_ids:
+        tag = db_session.identity_map.get(identity_key(models.Tag, tag_id))
+        if tag is not None:
+            db_session.expire(tag, ['items'])
+
+    invalidate_view_summary()
+
+    return len(removed_ids) + len(added_ids)
+
+
+def select_parent_ids(tag_ids: [int]) -> Select:
+    return select(models.Tag.id, models.Tag.parent_id).where(
+        models.Tag.id.in_(tag_ids)
+    )
+
+
+def select_tag_ids_of_the_item(item_id: int) -> Select:
+    return select(models.ItemTag.tag_id).where(
+        models.ItemTag.item_id == item_id
+    )
+
+
+def pick_item_tags(tag_ids: [int], parent_id_by_tag_id: {int: int}) -> [int]:
+    """Return the existing tags, keeping only the last one of each group."""
+    tag_id_by_group = {}
+
+    for tag_id in tag_ids:
+        if tag_id in parent_id_by_tag_id:
+            parent_id = parent_id_by_tag_id[tag_id]
+            # Tags without a parent are groups of their own.
+            group = parent_id if parent_id is not None else ('tag', tag_id)
+            tag_id_by_group.pop(group, None)
+            tag_id_by_group[group] = tag_id
+
+    return list(tag_id_by_group.values())
+
+
+def get_tag_list(
+    cursor: Optional[str] = None, limit: int = PAGE_SIZE
+) -> [models.Item]:
+    return (
+        db_session.query(models.Tag)
+        .filter(models.Tag.id > decode_cursor(cursor))
+        .order_by(models.Tag.id)
+        .limit(limit)
+        .all()
+    )
 
 
 def get_list_of_tags_with_items(
-    skip: int = 0, limit: int = 100
+    cursor: Optional[str] = None, limit: int = PAGE_SIZE
 ) -> [models.Item]:
     return (
         db_session.query(models.Tag)
         .filter(models.Tag.items.any())
-        .offset(skip)
+        .filter(models.Tag.id > decode_cursor(cursor))
+        .order_by(models.Tag.id)
         .limit(limit)
         .all()
     )
 
 
 def get_list_of_tags_with_actionable_items(
-    skip: int = 0, limit: int = 100
+    cursor: Optional[str] = None, limit: int = PAGE_SIZE
 ) -> [models.Item]:
     return (
         db_session.query(models.Tag)
@@ -99,61 +881,138 @@ def get_list_of_tags_with_actionable_items(
         .join(models.Item, models.Item.id == models.ItemTag.item_id)
         .filter(models.Item.status == schemas.ItemStatus.UNDONE)
         .distinct()
-        .offset(skip)
+        .filter(models.Tag.id > decode_cursor(cursor))
+        .order_by(models.Tag.id)
         .limit(limit)
         .all()
     )
 
 
-def get_actionable_tag_list(skip: int = 0, limit: int = 100) -> [models.Item]:
+def get_actionable_tag_list(
+    cursor: Optional[str] = None, limit: int = PAGE_SIZE
+) -> [models.Item]:
     return (
         db_session.query(models.Tag)
         .filter(~models.Tag.children.any())
-        .offset(skip)
+        .filter(models.Tag.id > decode_cursor(cursor))
+        .order_by(models.Tag.id)
         .limit(limit)
         .all()
     )
 
 
 def get_tag_list_without_parent(
-    skip: int = 0, limit: int = 100
+    cursor: Optional[str] = None, limit: int = PAGE_SIZE
 ) -> [models.Tag]:
     return (
         db_session.query(models.Tag)
         .filter_by(parent_id=None)
-        .offset(skip)
+        .filter(models.Tag.id > decode_cursor(cursor))
+        .order_by(models.Tag.id)
         .limit(limit)
         .all()
     )
 
 
+def get_tag_registry() -> TagRegistry:
+    if (
+        _tag_registry['registry'] is None
+        or _tag_registry['session'] is not db_session
+    ):
+        _tag_registry['registry'] = TagRegistry.load(db_session)
+        _tag_registry['session'] = db_session
+
+    return _tag_registry['registry']
+
+
+def invalidate_tag_registry():
+    _tag_registry['registry'] = None
+
+
 def get_tag(tag_id: int) -> models.Tag:
-    return db_session.query(models.Tag).filter_by(id=tag_id).first()
+    return db_session.get(models.Tag, tag_id)
 
 
-def get_tag_by_name(tag_name: str) -> models.Tag:
+def get_tags(tag_id_list: [int]) -> [models.Tag]:
+    if not tag_id_list:
+        return []
+
+    tag_by_id = {
+        tag.id: tag
+        for tag in db_session.query(models.Tag).filter(
+            models.Tag.id.in_(tag_id_list)
+        )
+    }
+
+    return [tag_by_id[tag_id] for tag_id in tag_id_list if tag_id in tag_by_id]
+
+
+def get_tag_ancestors(tag_id: int) -> [models.Tag]:
+    """Return the ancestors of the tag, from the root down to its parent."""
     return (
         db_session.query(models.Tag)
-        .filter(func.lower(models.Tag.name) == func.lower(tag_name))
-        .first()
+        .join(models.TagPath, models.TagPath.ancestor_id == models.Tag.id)
+        .filter(models.TagPath.descendant_id == tag_id)
+        .filter(models.TagPath.depth > 0)
+        .order_by(models.TagPath.depth.desc())
+        .all()
     )
 
 
-def create_tag(tag: schemas.TagCreate) -> models.Tag:
-    tag_id = db_session.query(func.max(models.Tag.id)).scalar() + 1
+def get_tag_descendants(tag_id: int) -> [models.Tag]:
+    """Return the tags under the tag at any depth, the nearest first."""
+    return (
+        db_session.query(models.Tag)
+        .join(models.TagPath, models.TagPath.descendant_id == models.Tag.id)
+        .filter(models.TagPath.ancestor_id == tag_id)
+        .filter(models.TagPath.depth > 0)
+        .order_by(models.TagPath.depth, models.Tag.id)
+        .all()
+    )
+
+
+def get_tag_by_name(tag_name: str) -> models.Tag:
+    tag = get_tag_registry().get_by_name(tag_name)
+
+    return get_tag(tag.id) if tag else None
+
 
+def create_tag(tag: schemas.TagCreate) -> models.Tag:
     tag = models.Tag(
-        id=tag_id,
+        id=allocate_id(models.Tag),
         **tag.dict(),
     )
 
     db_session.add(tag)
-    db_session.commit()
+    if tag.parent_id:
+        db_session.flush()
+        counters.add_tree_counter(db_session, tag.parent_id)
+    commit()
     db_session.refresh(tag)
 
+    invalidate_tag_registry()
+    # The parent may get its first child, and so a view of its tree.
+    invalidate_view_summary()
+
     return tag
 
 
+def edit_tag(tag: models.Tag, tag_data: schemas.TagCreate):
+    parent_id = tag.parent_id
+
+    for (key, value) in tag_data.dict(exclude={'children', 'items'}).items():
+        setattr(tag, key, value)
+
+    commit()
+
+    # Moving a subtree changes the trees of all of its old and new ancestors.
+    if counters.VIEW_COUNTERS and tag.parent_id != parent_id:
+        rebuild_view_counters()
+
+    invalidate_tag_registry()
+    invalidate_view_summary()
+
+
 def get_item_text_to_show(
     item: models.Item, context: models.Tag = None
 ) -> str:
@@ -172,11 +1031,23 @@ def get_item_text_to_show(
 
 
 def get_tag_text_to_show(tag: models.Tag, context: models.Tag = None) -> str:
-    result = tag.name
+    return make_tag_text(
+        tag.name, get_tag_registry().get_ancestors(tag.id), context
+    )
 
-    if tag.parent_id:
-        parent_tag = get_tag(tag.parent_id)
-        if parent_tag and context != parent_tag:
-            result += ' @' + parent_tag.name.replace(' ', '_')
 
-    return result
+def make_tag_text(
+    name: str, ancestors: [TagInfo], context: models.Tag = None
+) -> str:
+    """Follow the name with the ancestors below the context, like
+    `Project @Area/Work`."""
+    ancestor_ids = [ancestor.id for ancestor in ancestors]
+    if context and context.id in ancestor_ids:
+        ancestors = ancestors[ancestor_ids.index(context.id) + 1 :]
+
+    if not ancestors:
+        return name
+
+    return f'{name} @' + '/'.join(
+        ancestor.name.replace(' ', '_') for ancestor in ancestors
+    )
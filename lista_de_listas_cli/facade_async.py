@@ -0,0 +1,682 @@
+import asyncio
+from collections import Counter
+from contextlib import asynccontextmanager
+from itertools import islice
+from typing import IO, AsyncIterator, Awaitable, Callable, Iterable, Optional
+from weakref import WeakKeyDictionary, WeakSet
+
+import allocator
+import counters
+import database
+import facade
+import models
+import schemas
+import snapshot
+from decouple import config
+from facade import (
+    IMPORT_CHUNK_SIZE,
+    PAGE_SIZE,
+    STREAM_BATCH_SIZE,
+    TagLoader,
+    ViewSummary,
+    count_views,
+    decode_cursor,
+    delete_item_tags,
+    filter_by_statuses,
+    get_next_cursor,
+    get_search_terms,
+    get_sibling_ids,
+    insert_missing_item_tags,
+    replace_group_tag,
+    select_items,
+    select_items_with_fts,
+    select_items_with_like,
+    select_parent_ids,
+    select_tag_ids_of_the_item,
+    update_counters_of_the_items,
+    update_items_status,
+)
+from sqlalchemy import insert, select
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import Session, selectinload, sessionmaker
+from sqlalchemy.orm.attributes import set_committed_value
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from sqlalchemy.sql import Select
+from tag_registry import TagRegistry
+
+# Defaults to `DATABASE_URL` with the aiosqlite driver for SQLite.
+ASYNC_DATABASE_URL: Optional[str] = config('ASYNC_DATABASE_URL', None)
+ASYNC_POOL_SIZE: int = config('ASYNC_POOL_SIZE', 10, cast=int)
+
+
+def get_async_url(url: str) -> str:
+    if url.startswith('sqlite:'):
+        return 'sqlite+aiosqlite:' + url[len('sqlite:') :]
+
+    raise ValueError(
+        f'Set ASYNC_DATABASE_URL to use the async facade with {url}.'
+    )
+
+
+def create_session_factory(url: str = None) -> sessionmaker:
+    url = (
+        url
+        or ASYNC_DATABASE_URL
+        or get_async_url(database.SQLALCHEMY_DATABASE_URL)
+    )
+
+    # SQLite files get no pool by default, and opening an aiosqlite
+    # connection starts a thread and runs the pragmas again.
+    engine = create_async_engine(
+        url, poolclass=AsyncAdaptedQueuePool, pool_size=ASYNC_POOL_SIZE
+    )
+    database.configure_sqlite(engine.sync_engine)
+
+    # The objects are returned after their session is closed, so they keep
+    # what was loaded instead of being expired on commit.
+    return sessionmaker(
+        bind=engine, class_=AsyncSession, expire_on_commit=False
+    )
+
+
+# Unlike the facade, every call runs in a session of its own, so many tasks
+# can read at the same time. Related objects are only available when they
+# were loaded eagerly, as the tags of the items are by default. It is created
+# on first use, so that importing this module needs no async driver.
+async_session: Optional[sessionmaker] = None
+
+_tag_registry: dict = {'registry': None}
+_view_summary: dict = {'summary': None}
+_locks_by_loop = WeakKeyDictionary()
+_connected_pools = WeakSet()
+
+
+def get_session_factory() -> sessionmaker:
+    global async_session  # pylint: disable=global-statement
+
+    if async_session is None:
+        async_session = create_session_factory()
+
+    return async_session
+
+
+def get_lock(name: str) -> asyncio.Lock:
+    """Return the lock with this name of the running event loop."""
+    locks = _locks_by_loop.setdefault(asyncio.get_running_loop(), {})
+
+    return locks.setdefault(name, asyncio.Lock())
+
+
+@asynccontextmanager
+async def open_session() -> AsyncIterator[AsyncSession]:
+    async with get_session_factory()() as session:
+        pool = session.bind.sync_engine.pool
+
+        # SQLAlchemy holds a thread lock while the first connection of a
+        # pool runs the connect events, like the SQLite pragmas, so another
+        # task connecting meanwhile would stop the event loop.
+        if pool not in _connected_pools:
+            async with get_lock('connect'):
+                await session.connection()
+            _connected_pools.add(pool)
+
+        yield session
+
+
+async def get_all_pages(
+    function: Callable[..., Awaitable[list]], *args, limit: int = PAGE_SIZE
+) -> list:
+    result = []
+    cursor = None
+
+    while True:
+        page = await function(*args, cursor=cursor, limit=limit)
+        result.extend(page)
+
+        cursor = get_next_cursor(page, limit)
+        if not cursor:
+            return result
+
+
+def select_page(statement: Select, model, cursor: str, limit: int) -> Select:
+    return (
+        statement.where(model.id > decode_cursor(cursor))
+        .order_by(model.id)
+        .limit(limit)
+    )
+
+
+async def fetch_all(statement: Select) -> list:
+    async with open_session() as session:
+        return (await session.scalars(statement)).all()
+
+
+async def get_item_list(
+    cursor: Optional[str] = None,
+    limit: int = PAGE_SIZE,
+    load_tags: TagLoader = selectinload,
+) -> [models.Item]:
+    return await fetch_all(
+        select_page(select_items(load_tags), models.Item, cursor, limit)
+    )
+
+
+async def get_actionable_items(
+    cursor: Optional[str] = None,
+    limit: int = PAGE_SIZE,
+    load_tags: TagLoader = selectinload,
+) -> [models.Item]:
+    statement = select_items(load_tags).where(
+        models.Item.status == schemas.ItemStatus.UNDONE
+    )
+
+    return await fetch_all(select_page(statement, models.Item, cursor, limit))
+
+
+async def get_inbox_items(
+    cursor: Optional[str] = None,
+    limit: int = PAGE_SIZE,
+    load_tags: TagLoader = selectinload,
+) -> [models.Item]:
+    statement = (
+        select_items(load_tags)
+        .where(models.Item.status == schemas.ItemStatus.UNDONE)
+        .where(~models.Item.tags.any())
+    )
+
+    return await fetch_all(select_page(statement, models.Item, cursor, limit))
+
+
+async def get_actionable_items_with_the_tag(
+    tag: models.Tag,
+    cursor: Optional[str] = None,
+    limit: int = PAGE_SIZE,
+    load_tags: TagLoader = selectinload,
+) -> [models.Item]:
+    statement = (
+        select_items(load_tags)
+        .where(models.Item.status == schemas.ItemStatus.UNDONE)
+        .where(models.Item.tags.any(id=tag.id))
+    )
+
+    return await fetch_all(select_page(statement, models.Item, cursor, limit))
+
+
+async def get_actionable_items_under_the_tag(
+    tag: models.Tag,
+    cursor: Optional[str] = None,
+    limit: int = PAGE_SIZE,
+    load_tags: TagLoader = selectinload,
+) -> [models.Item]:
+    statement = (
+        select_items(load_tags)
+        .where(models.Item.status == schemas.ItemStatus.UNDONE)
+        .where(facade.is_under_the_tag(tag.id))
+    )
+
+    return await fetch_all(select_page(statement, models.Item, cursor, limit))
+
+
+async def iterate_items(
+    statuses: [schemas.ItemStatus] = None,
+    tag: models.Tag = None,
+    inbox: bool = False,
+    batch_size: int = STREAM_BATCH_SIZE,
+) -> AsyncIterator[models.Item]:
+    statement = select_items()
+
+    if statuses:
+        statement = statement.where(models.Item.status.in_(statuses))
+    if tag:
+        statement = statement.where(models.Item.tags.any(id=tag.id))
+    if inbox:
+        statement = statement.where(~models.Item.tags.any())
+
+    statement = statement.order_by(models.Item.id).execution_options(
+        yield_per=batch_size
+    )
+
+    async with open_session() as session:
+        async for item in await session.stream_scalars(statement):
+            yield item
+
+
+async def search_items(
+    query: str,
+    statuses: [schemas.ItemStatus] = None,
+    limit: int = PAGE_SIZE,
+    load_tags: TagLoader = selectinload,
+) -> [models.Item]:
+    terms = get_search_terms(query)
+    if not terms:
+        return []
+
+    if get_session_factory().kw['bind'].dialect.name == 'sqlite':
+        statement = select_items_with_fts(terms, load_tags)
+    else:
+        statement = select_items_with_like(terms, load_tags)
+
+    return await fetch_all(
+        filter_by_statuses(statement, statuses).limit(limit)
+    )
+
+
+async def get_view_summary() -> ViewSummary:
+    """Return the number of actionable items of each view of the menu.
+
+    The summary is kept until the next write made through this module.
+    """
+    if _view_summary['summary'] is None:
+        _view_summary['summary'] = await load_view_summary()
+
+    return _view_summary['summary']
+
+
+async def load_view_summary() -> ViewSummary:
+    async with open_session() as session:
+        if counters.VIEW_COUNTERS:
+            rows = await session.run_sync(
+                lambda sync_session: counters.read_counters(sync_session).all()
+            )
+        else:
+            rows = (await session.execute(count_views())).all()
+
+    return facade.make_view_summary(rows)
+
+
+async def count_views_by_counter(session: AsyncSession) -> {str: int}:
+    return {
+        counters.get_counter_name(view, tag_id): count
+        for (view, tag_id, _, count) in await session.execute(count_views())
+        if count
+    }
+
+
+async def rebuild_view_counters() -> int:
+    async with open_session() as session:
+        counts = await count_views_by_counter(session)
+
+        await session.run_sync(counters.write_counters, counts)
+        await session.commit()
+
+    invalidate_view_summary()
+
+    return len(counts)
+
+
+async def check_view_counters() -> [(str, int, int)]:
+    """Return the counters that differ from the items, with both counts."""
+    async with open_session() as session:
+        expected = await count_views_by_counter(session)
+        actual = {
+            name: count
+            for (name, _, _, count) in await session.run_sync(
+                lambda sync_session: counters.read_counters(sync_session).all()
+            )
+        }
+
+    return [
+        (name, expected.get(name, 0), actual.get(name, 0))
+        for name in sorted(expected.keys() | actual.keys())
+        if expected.get(name, 0) != actual.get(name, 0)
+    ]
+
+
+def invalidate_view_summary():
+    _view_summary['summary'] = None
+
+
+async def allocate_ids(session: AsyncSession, model, count: int = 1) -> range:
+    # The allocator holds a thread lock while it reserves a block, which
+    # would stop the event loop if a second task waited for it.
+    async with get_lock('allocate'):
+        return await session.run_sync(allocator.allocate_ids, model, count)
+
+
+async def get_item(item_id: int) -> Optional[models.Item]:
+    async with open_session() as session:
+        return await session.scalar(
+            select_items().where(models.Item.id == item_id)
+        )
+
+
+async def create_item(item: schemas.ItemCreate) -> models.Item:
+    async with open_session() as session:
+        item = models.Item(
+            id=(await allocate_ids(session, models.Item))[0],
+            **item.dict(),
+        )
+
+        session.add(item)
+        await session.commit()
+
+    invalidate_view_summary()
+
+    return item
+
+
+async def insert_items(items: [schemas.ItemCreate]) -> [int]:
+    async with open_session() as session:
+        ids = await allocate_ids(session, models.Item, count=len(items))
+
+        rows = [
+            {
+                'id': item_id,
+                'name': item.name.strip(),
+                'description': item.description,
+                'status': item.status,
+            }
+            for item_id, item in zip(ids, items)
+        ]
+
+        await session.execute(insert(models.Item), rows)
+        await session.run_sync(
+            counters.update_counters,
+            Counter(
+                name
+                for row in rows
+                for name in counters.get_counter_names(row['status'], [])
+            ),
+        )
+        await session.commit()
+
+    invalidate_view_summary()
+
+    return list(ids)
+
+
+async def create_items(
+    items: Iterable[schemas.ItemCreate], chunk_size: int = IMPORT_CHUNK_SIZE
+) -> int:
+    total = 0
+    iterator = iter(items)
+
+    while chunk := list(islice(iterator, chunk_size)):
+        total += len(await insert_items(chunk))
+
+    return total
+
+
+async def edit_item(item: models.Item, item_data: schemas.ItemCreate):
+    values = item_data.dict(exclude={'tags'})
+
+    def update_item(session: Session):
+        # The counters are kept when the ORM flushes the new status.
+        stored_item = session.get(models.Item, item.id)
+        for (key, value) in values.items():
+            setattr(stored_item, key, value)
+
+    async with open_session() as session:
+        await session.run_sync(update_item)
+        await session.commit()
+
+    for (key, value) in values.items():
+        set_committed_value(item, key, value)
+
+    invalidate_view_summary()
+
+
+async def set_item_status(item: models.Item, status: schemas.ItemStatus):
+    await set_items_status([item.id], status)
+
+    set_committed_value(item, 'status', status)
+
+
+async def set_items_status(item_ids: [int], status: schemas.ItemStatus) -> int:
+    async with open_session() as session:
+        if counters.VIEW_COUNTERS:
+            await session.run_sync(
+                update_counters_of_the_items,
+                item_ids,
+                lambda _, tag_ids: (status, tag_ids),
+            )
+
+        result = await session.execute(update_items_status(item_ids, status))
+        await session.commit()
+
+    invalidate_view_summary()
+
+    return result.rowcount
+
+
+async def assign_tag(item_ids: [int], tag: models.Tag) -> int:
+    """Add the tag to the items, replacing the other tags of its group."""
+    sibling_ids = get_sibling_ids(await get_tag_registry(), tag)
+
+    async with open_session() as session:
+        if counters.VIEW_COUNTERS:
+            await session.run_sync(
+                update_counters_of_the_items,
+                item_ids,
+                lambda status, tag_ids: (
+                    status,
+                    replace_group_tag(tag_ids, tag.id, sibling_ids),
+                ),
+            )
+
+        if sibling_ids:
+            await session.execute(delete_item_tags(item_ids, sibling_ids))
+
+        result = await session.execute(
+            insert_missing_item_tags(item_ids, tag.id)
+        )
+        await session.commit()
+
+    invalidate_view_summary()
+
+    return result.rowcount
+
+
+async def set_item_tags(item_id: int, tag_ids: [int]) -> int:
+    async with open_session() as session:
+        parent_id_by_tag_id = dict(
+            (await session.execute(select_parent_ids(tag_ids))).all()
+        )
+        new_ids = facade.pick_item_tags(tag_ids, parent_id_by_tag_id)
+        current_ids = set(
+            await session.scalars(select_tag_ids_of_the_item(item_id))
+        )
+
+        if counters.VIEW_COUNTERS:
+            await session.run_sync(
+                update_counters_of_the_items,
+                [item_id],
+                lambda status, _: (status, new_ids),
+            )
+
+        removed_ids = current_ids.difference(new_ids)
+        added_ids = set(new_ids) - current_ids
+
+        if removed_ids:
+            await session.execute(delete_item_tags([item_id], removed_ids))
+        if added_ids:
+            await session.execute(
+                insert(models.ItemTag),
+                [
+                    {'item_id': item_id, 'tag_id': tag_id}
+                    for tag_id in added_ids
+                ],
+            )
+        await session.commit()
+
+    invalidate_view_summary()
+
+    return len(removed_ids) + len(added_ids)
+
+
+async def get_tag_list(
+    cursor: Optional[str] = None, limit: int = PAGE_SIZE
+) -> [models.Tag]:
+    return await fetch_all(
+        select_page(select(models.Tag), models.Tag, cursor, limit)
+    )
+
+
+async def get_list_of_tags_with_items(
+    cursor: Optional[str] = None, limit: int = PAGE_SIZE
+) -> [models.Tag]:
+    statement = select(models.Tag).where(models.Tag.items.any())
+
+    return await fetch_all(select_page(statement, models.Tag, cursor, limit))
+
+
+async def get_list_of_tags_with_actionable_items(
+    cursor: Optional[str] = None, limit: int = PAGE_SIZE
+) -> [models.Tag]:
+    statement = (
+        select(models.Tag)
+        .join(models.ItemTag, models.ItemTag.tag_id == models.Tag.id)
+        .join(models.Item, models.Item.id == models.ItemTag.item_id)
+        .where(models.Item.status == schemas.ItemStatus.UNDONE)
+        .distinct()
+    )
+
+    return await fetch_all(select_page(statement, models.Tag, cursor, limit))
+
+
+async def get_actionable_tag_list(
+    cursor: Optional[str] = None, limit: int = PAGE_SIZE
+) -> [models.Tag]:
+    statement = select(models.Tag).where(~models.Tag.children.any())
+
+    return await fetch_all(select_page(statement, models.Tag, cursor, limit))
+
+
+async def get_tag_list_without_parent(
+    cursor: Optional[str] = None, limit: int = PAGE_SIZE
+) -> [models.Tag]:
+    statement = select(models.Tag).where(models.Tag.parent_id.is_(None))
+
+    return await fetch_all(select_page(statement, models.Tag, cursor, limit))
+
+
+async def get_tag_registry() -> TagRegistry:
+    if _tag_registry['registry'] is None:
+        async with open_session() as session:
+            _tag_registry['registry'] = await session.run_sync(
+                TagRegistry.load
+            )
+
+    return _tag_registry['registry']
+
+
+def invalidate_tag_registry():
+    _tag_registry['registry'] = None
+
+
+async def get_tag(tag_id: int) -> Optional[models.Tag]:
+    async with open_session() as session:
+        return await session.get(models.Tag, tag_id)
+
+
+async def get_tags(tag_id_list: [int]) -> [models.Tag]:
+    if not tag_id_list:
+        return []
+
+    tag_by_id = {
+        tag.id: tag
+        for tag in await fetch_all(
+            select(models.Tag).where(models.Tag.id.in_(tag_id_list))
+        )
+    }
+
+    return [tag_by_id[tag_id] for tag_id in tag_id_list if tag_id in tag_by_id]
+
+
+async def get_tag_ancestors(tag_id: int) -> [models.Tag]:
+    return await fetch_all(
+        select(models.Tag)
+        .join(models.TagPath, models.TagPath.ancestor_id == models.Tag.id)
+        .where(models.TagPath.descendant_id == tag_id)
+        .where(models.TagPath.depth > 0)
+        .order_by(models.TagPath.depth.desc())
+    )
+
+
+async def get_tag_descendants(tag_id: int) -> [models.Tag]:
+    return await fetch_all(
+        select(models.Tag)
+        .join(models.TagPath, models.TagPath.descendant_id == models.Tag.id)
+        .where(models.TagPath.ancestor_id == tag_id)
+        .where(models.TagPath.depth > 0)
+        .order_by(models.TagPath.depth, models.Tag.id)
+    )
+
+
+async def get_tag_by_name(tag_name: str) -> Optional[models.Tag]:
+    tag = (await get_tag_registry()).get_by_name(tag_name)
+
+    return await get_tag(tag.id) if tag else None
+
+
+async def create_tag(tag: schemas.TagCreate) -> models.Tag:
+    async with open_session() as session:
+        tag = models.Tag(
+            id=(await allocate_ids(session, models.Tag))[0],
+            **tag.dict(),
+        )
+
+        session.add(tag)
+        if tag.parent_id:
+            await session.flush()
+            await session.run_sync(counters.add_tree_counter, tag.parent_id)
+        await session.commit()
+
+    invalidate_tag_registry()
+    # The parent may get its first child, and so a view of its tree.
+    invalidate_view_summary()
+
+    return tag
+
+
+async def edit_tag(tag: models.Tag, tag_data: schemas.TagCreate):
+    values = tag_data.dict(exclude={'children', 'items'})
+
+    def update_tag(session: Session):
+        # The validators of the tag query its descendants.
+        stored_tag = session.get(models.Tag, tag.id)
+        for (key, value) in values.items():
+            setattr(stored_tag, key, value)
+
+    async with open_session() as session:
+        await session.run_sync(update_tag)
+        await session.commit()
+
+    # Moving a subtree changes the trees of all of its old and new ancestors.
+    if counters.VIEW_COUNTERS and values.get('parent_id') != tag.parent_id:
+        await rebuild_view_counters()
+
+    for (key, value) in values.items():
+        set_committed_value(tag, key, value)
+
+    invalidate_tag_registry()
+    invalidate_view_summary()
+
+
+# Items are loaded with their tags, so they are rendered without queries.
+get_item_text_to_show = facade.get_item_text_to_show
+
+
+async def get_tag_text_to_show(
+    tag: models.Tag, context: models.Tag = None
+) -> str:
+    registry = await get_tag_registry()
+
+    return facade.make_tag_text(
+        tag.name, registry.get_ancestors(tag.id), context
+    )
+
+
+async def export_snapshot(output: IO[bytes]) -> (int, int):
+    async with open_session() as session:
+        return await session.run_sync(snapshot.write_snapshot, output)
+
+
+async def import_snapshot(file: IO[bytes]) -> (int, int):
+    async with get_lock('allocate'), open_session() as session:
+        counts = await session.run_sync(snapshot.read_snapshot, file)
+
+    invalidate_tag_registry()
+    invalidate_view_summary()
+
+    return counts
@@ -0,0 +1,29 @@
+from typing import Any, Dict, List
+
+from fuzzy_filter import FuzzyIndex
+from InquirerPy.prompts.fuzzy import FuzzyPrompt
+
+
+class FilterPrompt(FuzzyPrompt):
+    """Fuzzy prompt that filters its choices with a `FuzzyIndex`.
+
+    InquirerPy scores every choice again on each key and waits longer before
+    filtering the more choices there are; the index is fast enough to filter
+    right away.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+
+        control = self.content_control
+        self.index = FuzzyIndex(choice['name'] for choice in control.choices)
+        control._filter_choices = self._filter_choices
+
+    async def _filter_choices(self, _: float) -> List[Dict[str, Any]]:
+        choices = self.content_control.choices
+        text = self._get_current_text()
+
+        return [choices[position] for position in self.index.filter(text)]
+
+    def _calculate_wait_time(self) -> float:
+        return 0.0
@@ -0,0 +1,57 @@
+import csv
+import json
+from typing import IO, Callable, Iterable
+
+import facade
+import models
+
+CSV_FIELDS = ['id', 'name', 'description', 'status', 'tags']
+
+
+def get_item_data(item: models.Item) -> dict:
+    return {
+        'id': item.id,
+        'name': item.name,
+        'description': item.description,
+        'status': item.status.value,
+        'tags': [tag.name for tag in item.tags],
+    }
+
+
+def write_plain(items: Iterable[models.Item], output: IO[str]):
+    for item in items:
+        output.write(facade.get_item_text_to_show(item) + '\n')
+
+
+def write_ndjson(items: Iterable[models.Item], output: IO[str]):
+    for item in items:
+        output.write(json.dumps(get_item_data(item)) + '\n')
+
+
+def write_json(items: Iterable[models.Item], output: IO[str]):
+    # Written one item at a time, so the whole list is never in memory.
+    separator = '\n'
+
+    output.write('[')
+    for item in items:
+        output.write(separator + json.dumps(get_item_data(item)))
+        separator = ',\n'
+    output.write('\n]\n')
+
+
+def write_csv(items: Iterable[models.Item], output: IO[str]):
+    writer = csv.DictWriter(output, fieldnames=CSV_FIELDS, lineterminator='\n')
+    writer.writeheader()
+
+    for item in items:
+        data = get_item_data(item)
+        data['tags'] = ';'.join(data['tags'])
+        writer.writerow(data)
+
+
+WRITERS: {str: Callable} = {
+    'plain': write_plain,
+    'json': write_json,
+    'ndjson': write_ndjson,
+    'csv': write_csv,
+}
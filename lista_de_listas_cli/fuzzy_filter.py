@@ -0,0 +1,51 @@
+from typing import Iterable
+
+
+class FuzzyIndex:
+    """Filter a fixed list of texts by the words typed so far.
+
+    A text matches when every word of the query is part of it, ignoring
+    case. The matches of the previous queries are kept, so each key typed
+    only rechecks the texts that matched before it instead of all of them.
+    """
+
+    def __init__(self, texts: Iterable[str]):
+        self.texts = [text.lower() for text in texts]
+        self._matches_by_query = []
+
+    def __len__(self) -> int:
+        return len(self.texts)
+
+    def filter(self, query: str) -> [int]:
+        """Return the positions of the matching texts, in their order."""
+        query = query.lower()
+        terms = query.split()
+
+        if not terms:
+            self._matches_by_query.clear()
+            return list(range(len(self.texts)))
+
+        # Typing more only narrows the matches of the query typed before,
+        # while anything else, like a deleted character, goes back to the
+        # last query that is still a prefix of this one.
+        while self._matches_by_query and not query.startswith(
+            self._matches_by_query[-1][0]
+        ):
+            self._matches_by_query.pop()
+
+        if self._matches_by_query:
+            previous_query, matches = self._matches_by_query[-1]
+            if previous_query == query:
+                return matches
+        else:
+            matches = range(len(self.texts))
+
+        texts = self.texts
+        for term in sorted(terms, key=len, reverse=True):
+            matches = [
+                position for position in matches if term in texts[position]
+            ]
+
+        self._matches_by_query.append((query, matches))
+
+        return matches
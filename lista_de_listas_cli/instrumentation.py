@@ -0,0 +1,164 @@
+import heapq
+import json
+import sys
+import threading
+import time
+from collections import Counter
+from typing import IO, NamedTuple, Optional
+
+from decouple import config
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# Writes one JSON line per SQL statement to this file when set.
+SQL_TRACE_FILE: Optional[str] = config('SQL_TRACE_FILE', None)
+SQL_SLOW_THRESHOLD_MS: float = config(
+    'SQL_SLOW_THRESHOLD_MS', default=50.0, cast=float
+)
+
+CALLER_MODULE = 'facade'
+SUMMARY_SIZE = 10
+
+
+class Statement(NamedTuple):
+    caller: str
+    statement: str
+    duration_ms: float
+
+
+def get_caller() -> str:
+    """Return the facade function running the statement.
+
+    Statements run outside the facade, like lazy loads from the UI, are
+    reported with the first function that is not part of SQLAlchemy.
+    """
+    frame = sys._getframe(1)
+    outside_sqlalchemy = None
+
+    while frame:
+        module = frame.f_globals.get('__name__', '')
+        if module == CALLER_MODULE:
+            return f'{module}.{frame.f_code.co_name}'
+
+        if outside_sqlalchemy is None and not module.startswith(
+            ('sqlalchemy', __name__)
+        ):
+            outside_sqlalchemy = f'{module}.{frame.f_code.co_name}'
+
+        frame = frame.f_back
+
+    return outside_sqlalchemy or 'unknown'
+
+
+class QueryProfiler:
+    """Count and time the SQL statements run by an engine.
+
+    It listens to the engine only between `start()` and `stop()`.
+    """
+
+    def __init__(
+        self,
+        slow_threshold_ms: float = SQL_SLOW_THRESHOLD_MS,
+        trace: Optional[IO[str]] = None,
+    ):
+        self.slow_threshold_ms = slow_threshold_ms
+        self.trace = trace
+        self.count_by_caller = Counter()
+        self.time_by_caller = Counter()
+        self.count_by_statement = Counter()
+        # The slowest ones only, as a heap.
+        self.slow_statements: [(float, Statement)] = []
+        self._lock = threading.Lock()
+        self._bind = None
+
+    def start(self, bind: Engine):
+        event.listen(bind, 'before_cursor_execute', self.before_execute)
+        event.listen(bind, 'after_cursor_execute', self.after_execute)
+        self._bind = bind
+
+    def stop(self):
+        if self._bind is None:
+            return
+
+        event.remove(self._bind, 'before_cursor_execute', self.before_execute)
+        event.remove(self._bind, 'after_cursor_execute', self.after_execute)
+        self._bind = None
+
+        if self.trace:
+            self.trace.flush()
+
+    def before_execute(self, connection, *_):
+        connection.info.setdefault('query_start_times', []).append(
+            time.perf_counter()
+        )
+
+    def after_execute(self, connection, _cursor, statement: str, *_):
+        started = connection.info['query_start_times'].pop()
+        duration_ms = (time.perf_counter() - started) * 1000
+        record = Statement(get_caller(), statement, duration_ms)
+
+        with self._lock:
+            self.count_by_caller[record.caller] += 1
+            self.time_by_caller[record.caller] += duration_ms
+            self.count_by_statement[statement] += 1
+
+            if duration_ms >= self.slow_threshold_ms:
+                heapq.heappush(self.slow_statements, (duration_ms, record))
+                if len(self.slow_statements) > SUMMARY_SIZE:
+                    heapq.heappop(self.slow_statements)
+
+            if self.trace:
+                self.trace.write(
+                    json.dumps(
+                        {
+                            'time': time.time(),
+                            'caller': record.caller,
+                            'duration_ms': round(duration_ms, 3),
+                            'statement': statement,
+                        }
+                    )
+                    + '\n'
+                )
+
+    def format_summary(self) -> str:
+        total_count = sum(self.count_by_caller.values())
+        total_time = sum(self.time_by_caller.values())
+        lines = [f'{total_count} SQL statements in {total_time:.1f} ms']
+
+        if total_count:
+            lines.append('By caller:')
+            lines += [
+                f'  {self.count_by_caller[caller]:6d} '
+                f'{duration:10.1f} ms  {caller}'
+                for (caller, duration) in self.time_by_caller.most_common(
+                    SUMMARY_SIZE
+                )
+            ]
+
+            # A statement run many times is usually a query in a loop.
+            lines.append('Most repeated statements:')
+            lines += [
+                f'  {count:6d}  {shorten(statement)}'
+                for (statement, count) in self.count_by_statement.most_common(
+                    SUMMARY_SIZE
+                )
+            ]
+
+        if self.slow_statements:
+            lines.append(f'Over {self.slow_threshold_ms:g} ms:')
+            lines += [
+                f'  {record.duration_ms:10.1f} ms  {record.caller}  '
+                f'{shorten(record.statement)}'
+                for (_, record) in sorted(self.slow_statements, reverse=True)
+            ]
+
+        return '\n'.join(lines)
+
+
+def shorten(statement: str, width: int = 100) -> str:
+    statement = ' '.join(statement.split())
+
+    if len(statement) <= width:
+        return statement
+
+    return statement[: width - 3] + '...'
@@ -1,26 +1,166 @@
 import time
-from typing import Callable, List, Union
+from typing import Any, Callable, List, NamedTuple, Optional, Union
 
 import click
+import daemon_client
 import facade
+import formats
+import instrumentation
 import models
 import schemas
-from database import Base, db_session, engine
-from InquirerPy import inquirer
-from InquirerPy.base.control import Choice, Separator
-from utils import clear_screen, get_selected_items_info, init_tags, return_to
+import snapshot
+import write_behind
+from database import db_session, engine
+from tag_registry import TagInfo
+from utils import (
+    ItemLineError,
+    LazyImport,
+    clear_screen,
+    get_selected_items_info,
+    init_tags,
+    read_items_from_lines,
+)
+
+# InquirerPy is only imported once a prompt is shown, so that commands used
+# from scripts, like `add`, do not pay for loading prompt_toolkit.
+inquirer = LazyImport('InquirerPy.inquirer')
+Choice = LazyImport('InquirerPy.base.control', 'Choice')
+Separator = LazyImport('InquirerPy.base.control', 'Separator')
+FilterPrompt = LazyImport('filter_prompt', 'FilterPrompt')
+# Only `serve` runs the daemon, which loads asyncio.
+daemon = LazyImport('daemon')
 
 PREFIX_IN_CHOICE = '  '
+LOAD_MORE = 'load-more'
+FILTER = 'filter'
+FILTER_PAGE_SIZE = 1000
+
+
+class Screen(NamedTuple):
+    """A view of the interactive mode, opened by returning it from another.
+
+    Once it is done, the view that opened it is shown again with
+    `return_choice` as its default choice.
+    """
+
+    function: Callable
+    kwargs: Optional[dict] = None
+    return_choice: Any = None
+
+
+def ask(prompt) -> Any:
+    # The pending writes can only be committed while the session is not in
+    # use, like when waiting for an answer.
+    with facade.waiting_for_input():
+        return prompt.execute()
+
+
+def navigate(function: Callable, **kwargs):
+    """Show a view and every view it opens, until the first one is done.
+
+    The open views are kept in a list instead of the call stack, so the
+    stack depth and the memory used stay the same however long a session
+    runs.
+    """
+    screens = [Screen(function, kwargs)]
+
+    while screens:
+        screen = screens[-1]
+        result = screen.function(**(screen.kwargs or {}))
+
+        if isinstance(result, Screen):
+            screens.append(result)
+            continue
+
+        screens.pop()
+
+        if screens:
+            previous = screens[-1]
+            screens[-1] = previous._replace(
+                kwargs={
+                    **(previous.kwargs or {}),
+                    'default_choice': screen.return_choice,
+                }
+            )
 
 
 @click.group()
-def cli():
-    pass
+@click.option(
+    '--profile',
+    is_flag=True,
+    help='Print the SQL statements run, by facade function, at the end.',
+)
+@click.pass_context
+def cli(context: click.Context, profile: bool):
+    if not (profile or instrumentation.SQL_TRACE_FILE):
+        return
+
+    trace = None
+    if instrumentation.SQL_TRACE_FILE:
+        trace = context.with_resource(
+            open(instrumentation.SQL_TRACE_FILE, 'a', encoding='utf-8')
+        )
+
+    profiler = instrumentation.QueryProfiler(trace=trace)
+    profiler.start(facade.db_session.get_bind())
+
+    @context.call_on_close
+    def stop_profiler():
+        profiler.stop()
+
+        if profile:
+            click.echo(profiler.format_summary(), err=True)
 
 
 @cli.command(name='list')
-def list_command():
-    show_items(facade.get_actionable_items)
+@click.option(
+    '--format',
+    'output_format',
+    type=click.Choice(['interactive', *formats.WRITERS]),
+    default='interactive',
+    help='Pick items interactively, or print them as text, JSON or CSV.',
+)
+@click.option(
+    '--status',
+    'statuses',
+    type=click.Choice([status.value for status in schemas.ItemStatus]),
+    multiple=True,
+    help='Only items with this status, undone by default. Can be repeated.',
+)
+@click.option('--tag', 'tag_name', help='Only items with this tag.')
+@click.option('--inbox', is_flag=True, help='Only items without tags.')
+def list_command(
+    output_format: str, statuses: [str], tag_name: str, inbox: bool
+):
+    filtered = statuses or tag_name or inbox
+
+    if output_format == 'interactive':
+        if filtered:
+            raise click.UsageError(
+                'Filters need a --format other than interactive.'
+            )
+
+        navigate(show_items, function_to_get_items=facade.get_actionable_items)
+        return
+
+    if output_format == 'plain' and not filtered:
+        print_items()
+        return
+
+    tag = None
+    if tag_name:
+        tag = facade.get_tag_by_name(tag_name)
+        if not tag:
+            raise click.ClickException(f'There is no tag named {tag_name}.')
+
+    items = facade.iterate_items(
+        statuses=[schemas.ItemStatus(status) for status in statuses]
+        or [schemas.ItemStatus.UNDONE],
+        tag=tag,
+        inbox=inbox,
+    )
+
+    formats.WRITERS[output_format](items, click.get_text_stream('stdout'))
 
 
 @cli.command(name='add')
@@ -28,12 +168,132 @@ def list_command():
 def add_command(name: str):
     item = schemas.ItemCreate(name=name)
 
-    facade.create_item(item)
+    response = daemon_client.send_request(
+        {'command': 'add', 'name': item.name}
+    )
+
+    if response is None:
+        # The process exits right after, so it reserves no block of IDs.
+        facade.create_item(item, id_block_size=1)
+    elif not response['ok']:
+        raise click.ClickException(response['error'])
+
+
+@cli.command(name='search')
+@click.argument('query')
+@click.option(
+    '--status',
+    'statuses',
+    type=click.Choice([status.value for status in schemas.ItemStatus]),
+    multiple=True,
+    help='Only items with this status. Can be repeated.',
+)
+@click.option('--limit', type=click.IntRange(min=1), default=20)
+def search_command(query: str, statuses: [str], limit: int):
+    items = facade.search_items(
+        query,
+        statuses=[schemas.ItemStatus(status) for status in statuses],
+        limit=limit,
+    )
+
+    for item in items:
+        click.echo(facade.get_item_text_to_show(item))
+
+
+@cli.command(name='serve')
+@click.option('--socket', 'socket_path', default=daemon_client.SOCKET_PATH)
+def serve_command(socket_path: str):
+    click.echo(f'Listening on {socket_path}')
+
+    try:
+        daemon.serve(socket_path)
+    except daemon.DaemonError as error:
+        raise click.ClickException(str(error)) from error
+    except KeyboardInterrupt:
+        pass
+
+
+@cli.command(name='import')
+@click.argument('file', type=click.File('r'), default='-')
+@click.option(
+    '--format',
+    'file_format',
+    type=click.Choice(['text', 'jsonl']),
+    default='text',
+    help='One item name per line, or one JSON object per line.',
+)
+@click.option(
+    '--chunk-size',
+    type=click.IntRange(min=1),
+    default=facade.IMPORT_CHUNK_SIZE,
+    help='Number of items written per transaction.',
+)
+def import_command(file, file_format: str, chunk_size: int):
+    items = read_items_from_lines(file, file_format=file_format)
+    total = 0
+
+    try:
+        for count in facade.insert_items_in_chunks(items, chunk_size):
+            total += count
+    except ItemLineError as error:
+        raise click.ClickException(
+            f'{error} {total} items were imported before it.'
+        ) from error
+
+    click.echo(f'{total} items imported.')
+
+
+@cli.command(name='export')
+@click.argument('file', type=click.File('wb'), default='-')
+def export_command(file):
+    tags, items = facade.export_snapshot(file)
+
+    click.echo(f'{tags} tags and {items} items exported.', err=True)
+
+
+@cli.command(name='import-snapshot')
+@click.argument('file', type=click.File('rb'), default='-')
+def import_snapshot_command(file):
+    try:
+        tags, items = facade.import_snapshot(file)
+    except snapshot.SnapshotError as error:
+        raise click.ClickException(str(error)) from error
+
+    click.echo(f'{tags} tags and {items} items imported.')
+
+
+@cli.command(name='rebuild-counters')
+def rebuild_counters_command():
+    total = facade.rebuild_view_counters()
+
+    click.echo(f'{total} counters rebuilt.')
+
+
+@cli.command(name='check-counters')
+def check_counters_command():
+    differences = facade.check_view_counters()
+
+    for (name, expected, actual) in differences:
+        click.echo(f'{name}: {actual} counted, {expected} expected')
+
+    if differences:
+        raise click.ClickException('The counters do not match the items.')
+
+    click.echo('The counters match the items.')
 
 
 @cli.command(name='interactive')
 def interactive_command():
-    start_interactive()
+    if write_behind.WRITE_BEHIND:
+        try:
+            facade.start_write_behind()
+        except write_behind.JournalError as error:
+            raise click.ClickException(str(error)) from error
+
+    try:
+        navigate(start_interactive)
+    finally:
+        facade.stop_write_behind()
 
 
 @cli.command(name='init_tags')
@@ -47,24 +307,64 @@ def init_tags_command():
 #         engine.execute(tbl.delete())
 
 
+def print_items():
+    cursor = None
+
+    while True:
+        response = daemon_client.send_request(
+            {'command': 'list', 'cursor': cursor}
+        )
+
+        if response is None:
+            response = facade.get_actionable_page(cursor)
+        elif not response['ok']:
+            raise click.ClickException(response['error'])
+
+        for item in response['items']:
+            click.echo(item['text'])
+
+        cursor = response['cursor']
+        if not cursor:
+            break
+
+
 def get_view_of_items_as_choices() -> List[Choice]:
+    summary = facade.get_view_summary()
     choices = []
 
-    if facade.get_inbox_items(limit=1):
-        choices.append(Choice('inbox', name=f'{PREFIX_IN_CHOICE}Inbox'))
+    if summary.inbox:
+        choices.append(
+            Choice('inbox', name=f'{PREFIX_IN_CHOICE}Inbox ({summary.inbox})')
+        )
 
-    tag_list = facade.get_list_of_tags_with_actionable_items()
-    for tag in tag_list:
+    for tag in summary.tags:
         choices.append(
             Choice(
                 f'tag.{tag.id}',
-                name=f'{PREFIX_IN_CHOICE}Context {tag.name}',
+                name=f'{PREFIX_IN_CHOICE}Context {tag.name} ({tag.count})',
+            )
+        )
+
+    for tag in summary.trees:
+        choices.append(
+            Choice(
+                f'tree.{tag.id}',
+                name=(
+                    f'{PREFIX_IN_CHOICE}Context {tag.name} and subtags '
+                    f'({tag.count})'
+                ),
             )
         )
 
-    if choices or facade.get_actionable_items(limit=1):
+    if choices or summary.actionable:
         choices.append(
-            Choice('actionable', name=f'{PREFIX_IN_CHOICE}Actionable items')
+            Choice(
+                'actionable',
+                name=(
+                    f'{PREFIX_IN_CHOICE}Actionable items '
+                    f'({summary.actionable})'
+                ),
+            )
         )
 
         choices.insert(0, Separator('Views'))
@@ -81,39 +381,67 @@ def choices_for_interactive_menu() -> List[Choice]:
     ]
 
 
-def start_interactive(default_choice: int = None):
+def start_interactive(default_choice: int = None) -> Optional[Screen]:
     clear_screen()
 
+    # Leaving a view commits the changes made in it.
+    facade.commit_pending_writes()
+
+    # Back at the menu, objects loaded by the previous views are not needed
+    # anymore, so the identity map does not grow during long sessions.
+    db_session.expunge_all()
+
     choices = choices_for_interactive_menu()
 
-    action = inquirer.select(
-        message='Select an action:',
-        choices=choices,
-        default=default_choice or choices[0].value,
-    ).execute()
-
-    if action:
-        return_to_kwargs = {
-            'return_func': start_interactive,
-            'return_choice': action,
-        }
-
-        if action == 'create':
-            create_item(**return_to_kwargs)
-        elif action == 'inbox':
-            show_items(facade.get_inbox_items, **return_to_kwargs)
-        elif action == 'actionable':
-            show_items(facade.get_actionable_items, **return_to_kwargs)
-        elif action == 'tags':
-            show_tags(**return_to_kwargs)
-        elif action.startswith('tag.'):
-            tag_id = int(action[4:])
-
-            show_items(
-                facade.get_actionable_items_with_the_tag,
-                context=facade.get_tag(tag_id),
-                **return_to_kwargs,
-            )
+    action = ask(
+        inquirer.select(
+            message='Select an action:',
+            choices=choices,
+            default=default_choice or choices[0].value,
+        )
+    )
+
+    if not action:
+        return None
+
+    if action == 'create':
+        screen = Screen(create_item)
+    elif action == 'inbox':
+        screen = Screen(
+            show_items, {'function_to_get_items': facade.get_inbox_items}
+        )
+    elif action == 'actionable':
+        screen = Screen(
+            show_items, {'function_to_get_items': facade.get_actionable_items}
+        )
+    elif action == 'tags':
+        screen = Screen(show_tags)
+    elif action.startswith('tree.'):
+        tag_id = int(action[5:])
+
+        screen = Screen(
+            show_items,
+            {
+                'function_to_get_items': (
+                    facade.get_actionable_items_under_the_tag
+                ),
+                'context': facade.get_tag(tag_id),
+            },
+        )
+    else:
+        tag_id = int(action[4:])
+
+        screen = Screen(
+            show_items,
+            {
+                'function_to_get_items': (
+                    facade.get_actionable_items_with_the_tag
+                ),
+                'context': facade.get_tag(tag_id),
+            },
+        )
+
+    return screen._replace(return_choice=action)
 
 
 def name_is_valid(value: str) -> bool:
@@ -125,58 +453,56 @@ def questions_when_creating_or_editing_an_item(
 ) -> schemas.ItemCreate:
     new_data = item.__dict__.copy() if item else {}
 
-    new_data['name'] = inquirer.text(
-        message='Enter the title:',
-        default=item.name if item else '',
-        validate=name_is_valid,
-        invalid_message='Name cannot be empty.',
-    ).execute()
+    new_data['name'] = ask(
+        inquirer.text(
+            message='Enter the title:',
+            default=item.name if item else '',
+            validate=name_is_valid,
+            invalid_message='Name cannot be empty.',
+        )
+    )
 
     new_data['description'] = (
-        inquirer.text(
-            message='Enter the description:',
-            multiline=True,
-            default=(item.description if item else None) or '',
-        ).execute()
+        ask(
+            inquirer.text(
+                message='Enter the description:',
+                multiline=True,
+                default=(item.description if item else None) or '',
+            )
+        )
         or None
     )
 
     return schemas.ItemCreate(**new_data)
 
 
-@return_to
-def create_item(**_) -> Union[models.Item, None]:
+def create_item() -> Union[models.Item, None]:
     item = questions_when_creating_or_editing_an_item()
 
-    if inquirer.confirm(message='Confirm?', default=True).execute():
+    if ask(inquirer.confirm(message='Confirm?', default=True)):
         item = facade.create_item(item)
         edit_item_tags(item)
 
-        db_session.commit()
-
         return item
 
     return None
 
 
-@return_to
-def edit_item(item: models.Item, **_):
+def edit_item(item: models.Item):
     new_data = questions_when_creating_or_editing_an_item(item)
 
-    if inquirer.confirm(message='Confirm?', default=True).execute():
-        for (key, value) in new_data.dict().items():
-            setattr(item, key, value)
-
-        db_session.commit()
+    if ask(inquirer.confirm(message='Confirm?', default=True)):
+        facade.edit_item(item, new_data)
 
 
 def validate_selected_item_tags(tag_id_list: [int]) -> bool:
+    registry = facade.get_tag_registry()
     parent_list = []
 
     for tag_id in tag_id_list:
-        tag = facade.get_tag(tag_id)
+        tag = registry.get(tag_id)
 
-        if tag.parent_id:
+        if tag and tag.parent_id:
             if tag.parent_id in parent_list:
                 return False
 
@@ -211,57 +537,70 @@ def get_tag_list_as_choices(
     return result
 
 
-@return_to
-def edit_item_tags(item: models.Item, **_):
-    parent_list = facade.get_tag_list_without_parent()
-
-    if not parent_list:
-        click.echo('There are no tags to display.')
-        return
-
-    item_tag_id_list = [tag.id for tag in item.tags]
+def get_tag_choices(
+    tag_ids_to_select: [int],
+) -> [Union[Separator, Choice]]:
+    """Return the tags that can be given to an item, grouped by parent."""
+    registry = facade.get_tag_registry()
     choices = []
-    tags_with_children = [tag for tag in parent_list if tag.children]
-    independent_tags = [tag for tag in parent_list if not tag.children]
 
-    for tag_list in tags_with_children:
-        choices.extend(
-            get_grouped_tag_list_as_choices(
-                group_name=tag_list.name,
-                tag_list=tag_list.children,
-                tag_ids_to_select=item_tag_id_list,
+    independent_tags = [
+        tag
+        for tag in registry.get_children(None)
+        if not registry.get_children(tag.id)
+    ]
+
+    # Every tag with children is a group, at any depth of the tree.
+    for tag in registry.tags_by_id.values():
+        if registry.get_children(tag.id):
+            choices.extend(
+                get_grouped_tag_list_as_choices(
+                    group_name=get_tag_path(tag),
+                    tag_list=registry.get_children(tag.id),
+                    tag_ids_to_select=tag_ids_to_select,
+                )
             )
-        )
 
     if independent_tags:
         choices.extend(
             get_grouped_tag_list_as_choices(
                 group_name='Independent',
                 tag_list=independent_tags,
-                tag_ids_to_select=item_tag_id_list,
+                tag_ids_to_select=tag_ids_to_select,
             )
         )
 
-    action = inquirer.checkbox(
-        message='Select one or more tags:',
-        choices=choices,
-        validate=validate_selected_item_tags,
-        invalid_message='Select only one tag per group',
-        transformer=get_selected_items_info,
-    ).execute()
+    return choices
+
+
+def get_tag_path(tag: TagInfo) -> str:
+    """Return the names from the root down to the tag, like `Area/Work`."""
+    ancestors = facade.get_tag_registry().get_ancestors(tag.id)
+
+    return '/'.join([*(ancestor.name for ancestor in ancestors), tag.name])
+
+
+def edit_item_tags(item: models.Item):
+    if not facade.get_tag_registry().get_children(None):
+        click.echo('There are no tags to display.')
+        return
+
+    choices = get_tag_choices(tag_ids_to_select=[tag.id for tag in item.tags])
 
-    tags = []
-    for tag_id in action:
-        tag = facade.get_tag(tag_id)
-        if tag:
-            tags.append(tag)
-    item.tags = tags
+    action = ask(
+        inquirer.checkbox(
+            message='Select one or more tags:',
+            choices=choices,
+            validate=validate_selected_item_tags,
+            invalid_message='Select only one tag per group',
+            transformer=get_selected_items_info,
+        )
+    )
 
-    db_session.commit()
+    facade.set_item_tags(item.id, action)
 
 
-@return_to
-def show_item_options(item: models.Item, **_):
+def show_item_options(item: models.Item):
     choices = [
         Choice(schemas.ItemStatus.DONE, name='Done'),
         Choice(schemas.ItemStatus.WONT, name="Won't do"),
@@ -275,11 +614,13 @@ def show_item_options(item: models.Item, **_):
         Choice(value=None, name='Return'),
     ]
 
-    action = inquirer.select(
-        message='Select an action:',
-        choices=choices,
-        default=choices[0].value,
-    ).execute()
+    action = ask(
+        inquirer.select(
+            message='Select an action:',
+            choices=choices,
+            default=choices[0].value,
+        )
+    )
 
     if isinstance(action, schemas.ItemStatus):
         facade.set_item_status(item=item, status=action)
@@ -289,13 +630,53 @@ def show_item_options(item: models.Item, **_):
         edit_item_tags(item)
 
 
-@return_to
+def show_options_of_the_items(item_ids: [int]):
+    choices = [
+        Choice(schemas.ItemStatus.DONE, name='Done'),
+        Choice(schemas.ItemStatus.WONT, name="Won't do"),
+        Choice('tag', name='Assign tag'),
+        Choice(schemas.ItemStatus.NOTE, name='Convert to note'),
+        Choice(value=None, name='Return'),
+    ]
+
+    action = ask(
+        inquirer.select(
+            message=f'Select an action for {len(item_ids)} items:',
+            choices=choices,
+            default=choices[0].value,
+        )
+    )
+
+    if isinstance(action, schemas.ItemStatus):
+        facade.set_items_status(item_ids, status=action)
+    elif action == 'tag':
+        assign_tag_to_the_items(item_ids)
+
+
+def assign_tag_to_the_items(item_ids: [int]):
+    choices = get_tag_choices(tag_ids_to_select=[])
+
+    if not choices:
+        click.echo('There are no tags to display.')
+        return
+
+    tag_id = ask(
+        inquirer.select(
+            message='Select a tag:',
+            choices=[*choices, Choice(value=None, name='Return')],
+        )
+    )
+
+    tag = facade.get_tag(tag_id) if tag_id else None
+    if tag:
+        facade.assign_tag(item_ids, tag)
+
+
 def show_items(
     function_to_get_items: Callable,
     context: models.Tag = None,
     default_choice: int = None,
-    **_,
-):
+) -> Optional[Screen]:
     arguments = [context] if context else []
     item_list = function_to_get_items(*arguments)
 
@@ -303,49 +684,95 @@ def show_items(
         # TODO: Create a function to show the message and wait a second
         click.echo('There are no items to display.')
         time.sleep(1)
-        return
+        return None
 
     choices = []
+    cursor = facade.get_next_cursor(item_list)
+
+    while True:
+        for item in item_list:
+            choice_name = facade.get_item_text_to_show(item, context=context)
+            choices.append(Choice(item.id, name=choice_name))
+
+        select_choices = choices.copy()
+        if cursor:
+            select_choices.append(Choice(LOAD_MORE, name='Load more items'))
+        select_choices.append(Choice(FILTER, name='Filter items'))
+        select_choices.append(Choice(value=None, name='Return'))
+
+        select_items = ask(
+            inquirer.select(
+                message='Select one or more items:',
+                choices=select_choices,
+                default=default_choice,
+                multiselect=True,
+                transformer=get_selected_items_info,
+            )
+        )
 
-    for item in item_list:
-        choice_name = facade.get_item_text_to_show(item, context=context)
-        choices.append(Choice(item.id, name=choice_name))
+        if not select_items or LOAD_MORE not in select_items:
+            break
 
-    choices.append(Choice(value=None, name='Return'))
+        item_list = function_to_get_items(*arguments, cursor=cursor)
+        cursor = facade.get_next_cursor(item_list)
+        default_choice = item_list[0].id if item_list else None
+
+    if select_items and FILTER in select_items:
+        select_items = filter_items(function_to_get_items, context=context)
+
+    item_ids = [
+        item_id
+        for item_id in select_items or []
+        if item_id not in (None, LOAD_MORE, FILTER)
+    ]
+
+    if len(item_ids) == 1:
+        item = facade.get_item(item_ids[0])
+        if item:
+            return Screen(
+                show_item_options, {'item': item}, return_choice=item.id
+            )
+    elif len(item_ids) > 1:
+        return Screen(show_options_of_the_items, {'item_ids': item_ids})
+
+    return None
 
-    select_items = inquirer.select(
-        message='Select one or more items:',
-        choices=choices,
-        default=default_choice,
-        multiselect=True,
-        transformer=get_selected_items_info,
-    ).execute()
-
-    if select_items:
-        if len(select_items) == 1:
-            item_id = select_items[0]
-            item = facade.get_item(item_id)
-            if item:
-                show_item_options(
-                    item=item,
-                    return_func=show_items,
-                    return_args={
-                        'function_to_get_items': function_to_get_items,
-                        'context': context,
-                        'default_choice': item_id,
-                    },
-                )
-        else:
-            ...
 
+def filter_items(
+    function_to_get_items: Callable, context: models.Tag = None
+) -> [int]:
+    arguments = [context] if context else []
+    item_list = facade.get_all_pages(
+        function_to_get_items, *arguments, limit=FILTER_PAGE_SIZE
+    )
+
+    choices = [
+        Choice(
+            item.id, name=facade.get_item_text_to_show(item, context=context)
+        )
+        for item in item_list
+    ]
 
-@return_to
-def show_tags(default_choice: int = None, **_):
+    return (
+        ask(
+            FilterPrompt(
+                message='Type to filter, select one or more items:',
+                choices=choices,
+                multiselect=True,
+                transformer=get_selected_items_info,
+            )
+        )
+        or []
+    )
+
+
+def show_tags(default_choice: int = None) -> Optional[Screen]:
     choices = [Choice('create', name='New tag')]
 
     tag_list = facade.get_tag_list()
 
     if tag_list:
+        choices.append(Choice(FILTER, name='Filter tags'))
         choices.append(Separator('Tags'))
 
     for tag in tag_list:
@@ -358,24 +785,40 @@ def show_tags(default_choice: int = None, **_):
 
     choices.append(Choice(value=None, name='Return'))
 
-    action = inquirer.select(
-        message='Select an action:',
-        choices=choices,
-        default=default_choice or choices[0].value,
-    ).execute()
+    action = ask(
+        inquirer.select(
+            message='Select an action:',
+            choices=choices,
+            default=default_choice or choices[0].value,
+        )
+    )
+
+    if action == 'create':
+        return Screen(create_tag, return_choice=action)
+
+    if action == FILTER:
+        action = filter_tags()
+
+    tag = facade.get_tag(action) if action else None
+    if tag:
+        show_tag_options(tag)
+
+    return None
+
+
+def filter_tags() -> Union[int, None]:
+    tag_list = facade.get_all_pages(
+        facade.get_tag_list, limit=FILTER_PAGE_SIZE
+    )
 
-    if action:
-        return_to_kwargs = {
-            'return_func': show_tags,
-            'return_choice': action,
-        }
+    choices = [
+        Choice(tag.id, name=facade.get_tag_text_to_show(tag))
+        for tag in tag_list
+    ]
 
-        if action == 'create':
-            create_tag(**return_to_kwargs)
-        else:
-            tag = facade.get_tag(action)
-            if tag:
-                show_tag_options(tag)
+    return ask(
+        FilterPrompt(message='Type to filter, select a tag:', choices=choices)
+    )
 
 
 def questions_when_creating_or_editing_a_tag(
@@ -383,15 +826,17 @@ def questions_when_creating_or_editing_a_tag(
 ) -> schemas.TagCreate:
     new_data = tag.__dict__.copy() if tag else {}
 
-    new_data['name'] = inquirer.text(
-        message='Enter the tag title:',
-        default=tag.name if tag else '',
-        validate=name_is_valid,
-        invalid_message='Name cannot be empty.',
-    ).execute()
+    new_data['name'] = ask(
+        inquirer.text(
+            message='Enter the tag title:',
+            default=tag.name if tag else '',
+            validate=name_is_valid,
+            invalid_message='Name cannot be empty.',
+        )
+    )
 
     parent_id = ask_for_parent_tag_when_editing_a_tag(
-        tag.parent_id if tag else None
+        tag.parent_id if tag else None, tag_id=tag.id if tag else None
     )
 
     if parent_id:
@@ -400,65 +845,68 @@ def questions_when_creating_or_editing_a_tag(
     return schemas.TagCreate(**new_data)
 
 
-@return_to
-def create_tag(**_) -> Union[models.Tag, None]:
+def create_tag() -> Union[models.Tag, None]:
     tag = questions_when_creating_or_editing_a_tag()
 
-    if inquirer.confirm(message='Confirm?', default=True).execute():
-        tag = facade.create_tag(tag)
-
-        db_session.commit()
-
-        return tag
+    if ask(inquirer.confirm(message='Confirm?', default=True)):
+        return facade.create_tag(tag)
 
     return None
 
 
-@return_to
-def show_tag_options(tag: models.Tag, **_):
+def show_tag_options(tag: models.Tag):
     choices = [
         Choice('edit', name='Edit'),
         # Choice('delete', name='Delete'),
         Choice(value=None, name='Return'),
     ]
 
-    action = inquirer.select(
-        message='Select an action:',
-        choices=choices,
-        default=choices[0].value,
-    ).execute()
+    action = ask(
+        inquirer.select(
+            message='Select an action:',
+            choices=choices,
+            default=choices[0].value,
+        )
+    )
 
     if action == 'edit':
         edit_tag(tag)
 
 
-@return_to
-def edit_tag(tag: models.Tag, **_):
+def edit_tag(tag: models.Tag):
     new_data = questions_when_creating_or_editing_a_tag(tag)
 
-    if inquirer.confirm(message='Confirm?', default=True).execute():
-        for (key, value) in new_data.dict().items():
-            setattr(tag, key, value)
-
-        db_session.commit()
+    if ask(inquirer.confirm(message='Confirm?', default=True)):
+        facade.edit_tag(tag, new_data)
 
 
-def ask_for_parent_tag_when_editing_a_tag(default_choice: int = None):
+def ask_for_parent_tag_when_editing_a_tag(
+    default_choice: int = None, tag_id: int = None
+):
+    registry = facade.get_tag_registry()
     choices = [Choice(value=None, name='No parent tag')]
 
-    for tag_list_item in facade.get_tag_list_without_parent():
-        choices.append(Choice(tag_list_item.id, name=tag_list_item.name))
+    # A tag cannot go under itself or under one of its descendants.
+    for tag_list_item in registry.tags_by_id.values():
+        if tag_id is None or not registry.is_descendant(
+            tag_list_item.id, tag_id
+        ):
+            choices.append(
+                Choice(tag_list_item.id, name=get_tag_path(tag_list_item))
+            )
 
-    return inquirer.select(
-        message='Select a parent tag:',
-        choices=choices,
-        default=default_choice,
-    ).execute()
+    return ask(
+        inquirer.select(
+            message='Select a parent tag:',
+            choices=choices,
+            default=default_choice,
+        )
+    )
 
 
 if __name__ == '__main__':
-    Base.metadata.create_all(bind=engine)
+    models.create_or_upgrade_schema(bind=engine)
     try:
         cli()
     finally:
-        db_session.close()
+        db_session.remove()
@@ -1,11 +1,146 @@
-from typing import Any, Union
+from typing import Any, Iterable, Optional, Union
 
-from database import Base, engine
+from database import Base
 from schemas import ItemStatus
-from sqlalchemy import BigInteger, Column, Enum, ForeignKey, String
-from sqlalchemy.orm import relationship, validates
+from sqlalchemy import (
+    BigInteger,
+    Column,
+    Enum,
+    ForeignKey,
+    Index,
+    Integer,
+    String,
+    delete,
+    event,
+    exists,
+    func,
+    insert,
+    inspect,
+    literal_column,
+    or_,
+    select,
+)
+from sqlalchemy.orm import object_session, relationship, validates
+from sqlalchemy.sql import Select
 
-Base.metadata.create_all(bind=engine)
+# Increase it whenever a table or an index is added, so that existing
+# databases get upgraded by `create_or_upgrade_schema`.
+SCHEMA_VERSION = 5
+
+# SQLite full-text index over the item names and descriptions. It reads the
+# text from the item table itself, and the triggers keep it in sync.
+ITEM_SEARCH_DDL = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS item_search USING fts5(
+        name, description, content='item', content_rowid='id'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS item_search_insert AFTER INSERT ON item
+    BEGIN
+        INSERT INTO item_search (rowid, name, description)
+        VALUES (new.id, new.name, new.description);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS item_search_delete AFTER DELETE ON item
+    BEGIN
+        INSERT INTO item_search (item_search, rowid, name, description)
+        VALUES ('delete', old.id, old.name, old.description);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS item_search_update
+    AFTER UPDATE OF id, name, description ON item
+    BEGIN
+        INSERT INTO item_search (item_search, rowid, name, description)
+        VALUES ('delete', old.id, old.name, old.description);
+        INSERT INTO item_search (rowid, name, description)
+        VALUES (new.id, new.name, new.description);
+    END
+    """,
+]
+
+# Every ancestor of each tag, the tag itself included with depth 0, kept so
+# that the subtree or the ancestry of a tag is one query. SQLite keeps it with
+# these triggers, other databases with the events of the Tag mapper.
+TAG_PATH_DDL = [
+    """
+    CREATE TRIGGER IF NOT EXISTS tag_path_insert AFTER INSERT ON tag
+    BEGIN
+        INSERT INTO tag_path (ancestor_id, descendant_id, depth)
+        SELECT new.id, new.id, 0
+        UNION ALL
+        SELECT ancestor_id, new.id, depth + 1
+        FROM tag_path WHERE descendant_id = new.parent_id;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS tag_path_cycle
+    BEFORE UPDATE OF parent_id ON tag
+    WHEN EXISTS (
+        SELECT 1 FROM tag_path
+        WHERE ancestor_id = new.id AND descendant_id = new.parent_id
+    )
+    BEGIN
+        SELECT RAISE(ABORT, 'Mother tag cannot also be your child');
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS tag_path_update
+    AFTER UPDATE OF parent_id ON tag
+    WHEN old.parent_id IS NOT new.parent_id
+    BEGIN
+        DELETE FROM tag_path
+        WHERE descendant_id IN (
+            SELECT descendant_id FROM tag_path WHERE ancestor_id = new.id
+        )
+        AND ancestor_id IN (
+            SELECT ancestor_id FROM tag_path
+            WHERE descendant_id = new.id AND ancestor_id != new.id
+        );
+        INSERT INTO tag_path (ancestor_id, descendant_id, depth)
+        SELECT above.ancestor_id, below.descendant_id,
+            above.depth + below.depth + 1
+        FROM tag_path AS above, tag_path AS below
+        WHERE above.descendant_id = new.parent_id
+        AND below.ancestor_id = new.id;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS tag_path_delete AFTER DELETE ON tag
+    BEGIN
+        DELETE FROM tag_path
+        WHERE descendant_id = old.id OR ancestor_id = old.id;
+    END
+    """,
+]
+
+
+class IdBlock(Base):
+    __tablename__ = 'id_block'
+
+    name: str = Column(String, primary_key=True)
+    next_id: int = Column(BigInteger, nullable=False)
+
+
+class ViewCounter(Base):
+    __tablename__ = 'view_counter'
+
+    # 'inbox', 'actionable', 'tag.<tag id>' or 'tree.<tag id>', like the
+    # menu choices.
+    name: str = Column(String, primary_key=True)
+    tag_id: int = Column(BigInteger, ForeignKey('tag.id'), nullable=True)
+    count: int = Column(BigInteger, nullable=False, default=0)
+
+
+class JournalBatch(Base):
+    __tablename__ = 'journal_batch'
+
+    # The last batch of a write-behind journal that was committed, so that
+    # the journal is not applied twice after a crash.
+    journal: str = Column(String, primary_key=True)
+    batch: int = Column(BigInteger, nullable=False)
 
 
 class ItemTag(Base):
@@ -14,6 +149,22 @@ class ItemTag(Base):
     item_id = Column(ForeignKey('item.id'), primary_key=True)
     tag_id = Column(ForeignKey('tag.id'), primary_key=True)
 
+    __table_args__ = (
+        Index('ix_item_tag_tag_id_item_id', 'tag_id', 'item_id'),
+    )
+
+
+class TagPath(Base):
+    __tablename__ = 'tag_path'
+
+    ancestor_id = Column(ForeignKey('tag.id'), primary_key=True)
+    descendant_id = Column(ForeignKey('tag.id'), primary_key=True)
+    depth: int = Column(Integer, nullable=False)
+
+    __table_args__ = (
+        Index('ix_tag_path_descendant_id_depth', 'descendant_id', 'depth'),
+    )
+
 
 class Item(Base):
     __tablename__ = 'item'
@@ -26,6 +177,8 @@ class Item(Base):
         'Tag', secondary='item_tag', back_populates='items'
     )
 
+    __table_args__ = (Index('ix_item_status_id', 'status', 'id'),)
+
     def __str__(self):
         return self.name
 
@@ -53,7 +206,9 @@ class Tag(Base):
 
     id: int = Column(BigInteger, primary_key=True, index=True)
     name: str = Column(String)
-    parent_id: int = Column(BigInteger, ForeignKey('tag.id'), nullable=True)
+    parent_id: int = Column(
+        BigInteger, ForeignKey('tag.id'), nullable=True, index=True
+    )
     children: Union[list, Any] = relationship('Tag')
     items: Union[list, Any] = relationship(
         'Item', secondary='item_tag', back_populates='tags'
@@ -73,7 +228,170 @@ class Tag(Base):
 
     @validates('parent_id')
     def mother_tag_cannot_be_your_child(self, _, parent_id):
-        for tag in self.children:
-            if parent_id == tag.id:
-                raise ValueError('Mother tag cannot also be your child')
+        session = object_session(self)
+
+        # A tag that was never stored has no children yet.
+        if parent_id is None or session is None:
+            return parent_id
+
+        is_descendant = exists().where(
+            TagPath.ancestor_id == self.id,
+            TagPath.descendant_id == parent_id,
+        )
+        if session.query(is_descendant).scalar():
+            raise ValueError('Mother tag cannot also be your child')
+
         return parent_id
+
+
+def create_item_search_index(connection, rebuild: bool = False):
+    if connection.dialect.name != 'sqlite':
+        return
+
+    for statement in ITEM_SEARCH_DDL:
+        connection.exec_driver_sql(statement)
+
+    if rebuild:
+        connection.exec_driver_sql(
+            "INSERT INTO item_search (item_search) VALUES ('rebuild')"
+        )
+
+
+def has_tag_path_triggers(connection) -> bool:
+    return connection.dialect.name == 'sqlite'
+
+
+def create_tag_paths(connection, rebuild: bool = False):
+    if has_tag_path_triggers(connection):
+        for statement in TAG_PATH_DDL:
+            connection.exec_driver_sql(statement)
+
+    if rebuild:
+        connection.execute(delete(TagPath))
+        insert_tag_paths(connection)
+
+
+def select_tag_paths(tag_ids: Optional[Iterable[int]] = None) -> Select:
+    """Walk up from the tags, every tag by default, to all their ancestors.
+
+    The depth is limited in case the parents of an old database have a
+    cycle.
+    """
+    tag = Tag.__table__
+    path = select(
+        tag.c.id.label('ancestor_id'),
+        tag.c.id.label('descendant_id'),
+        literal_column('0').label('depth'),
+    )
+    if tag_ids is not None:
+        path = path.where(tag.c.id.in_(tag_ids))
+
+    path = path.cte('path', recursive=True)
+    path = path.union_all(
+        select(tag.c.parent_id, path.c.descendant_id, path.c.depth + 1)
+        .join(tag, tag.c.id == path.c.ancestor_id)
+        .where(tag.c.parent_id.isnot(None))
+        .where(
+            path.c.depth
+            < select(func.count()).select_from(tag).scalar_subquery()
+        )
+    )
+
+    return select(
+        path.c.ancestor_id, path.c.descendant_id, func.min(path.c.depth)
+    ).group_by(path.c.ancestor_id, path.c.descendant_id)
+
+
+def insert_tag_paths(connection, tag_ids: Optional[Iterable[int]] = None):
+    connection.execute(
+        insert(TagPath).from_select(
+            ['ancestor_id', 'descendant_id', 'depth'],
+            select_tag_paths(tag_ids),
+        )
+    )
+
+
+def add_tag_paths(connection, tag_ids: [int]):
+    """Add the paths of new tags, where no trigger does it."""
+    if not has_tag_path_triggers(connection):
+        insert_tag_paths(connection, tag_ids)
+
+
+@event.listens_for(Tag, 'after_insert')
+def add_tag_paths_of_the_tag(_, connection, tag: Tag):
+    add_tag_paths(connection, [tag.id])
+
+
+@event.listens_for(Tag, 'after_update')
+def move_tag_paths_of_the_tag(_, connection, tag: Tag):
+    if has_tag_path_triggers(connection):
+        return
+
+    if not inspect(tag).attrs.parent_id.history.has_changes():
+        return
+
+    # The paths of the whole subtree are walked again from its new parent.
+    subtree_ids = (
+        connection.execute(
+            select(TagPath.descendant_id).where(TagPath.ancestor_id == tag.id)
+        )
+        .scalars()
+        .all()
+    )
+    connection.execute(
+        delete(TagPath).where(TagPath.descendant_id.in_(subtree_ids))
+    )
+    insert_tag_paths(connection, subtree_ids)
+
+
+@event.listens_for(Tag, 'before_delete')
+def delete_tag_paths_of_the_tag(_, connection, tag: Tag):
+    if not has_tag_path_triggers(connection):
+        connection.execute(
+            delete(TagPath).where(
+                or_(
+                    TagPath.ancestor_id == tag.id,
+                    TagPath.descendant_id == tag.id,
+                )
+            )
+        )
+
+
+@event.listens_for(Item.__table__, 'after_create')
+def create_item_search_index_with_the_table(_, connection, **__):
+    create_item_search_index(connection)
+
+
+@event.listens_for(TagPath.__table__, 'after_create')
+def create_tag_paths_with_the_table(_, connection, **__):
+    create_tag_paths(connection)
+
+
+def upgrade_schema(bind):
+    Base.metadata.create_all(bind=bind)
+
+    # create_all() skips the indexes of tables that already exist.
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=bind, checkfirst=True)
+
+    with bind.begin() as connection:
+        create_item_search_index(connection, rebuild=True)
+        create_tag_paths(connection, rebuild=True)
+
+
+def create_or_upgrade_schema(bind):
+    if bind.dialect.name != 'sqlite':
+        upgrade_schema(bind=bind)
+        return
+
+    with bind.connect() as connection:
+        version = connection.exec_driver_sql('PRAGMA user_version').scalar()
+
+    if version < SCHEMA_VERSION:
+        upgrade_schema(bind=bind)
+
+        with bind.begin() as connection:
+            connection.exec_driver_sql(
+                f'PRAGMA user_version = {SCHEMA_VERSION}'
+            )
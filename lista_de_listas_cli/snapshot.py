@@ -0,0 +1,326 @@
+import gzip
+import json
+from collections import Counter
+from itertools import groupby, islice
+from typing import IO, Iterable, Iterator
+
+import counters
+import models
+import schemas
+from allocator import allocate_ids
+from sqlalchemy import func, insert, select
+from sqlalchemy.orm import Session
+
+# A snapshot is gzip compressed NDJSON: a header line with the version and
+# the number of tags and items, then one line per tag, parents before their
+# children, and one line per item with the IDs of its tags.
+SNAPSHOT_FORMAT = 'lista-de-listas'
+SNAPSHOT_VERSION = 1
+SNAPSHOT_BATCH_SIZE = 1000
+
+
+class SnapshotError(ValueError):
+    pass
+
+
+def get_tags_in_hierarchy_order(session: Session) -> [models.Tag]:
+    tags = session.execute(
+        select(models.Tag.id, models.Tag.name, models.Tag.parent_id).order_by(
+            models.Tag.id
+        )
+    ).all()
+    children_by_parent_id = {}
+    for tag in tags:
+        children_by_parent_id.setdefault(tag.parent_id, []).append(tag)
+
+    ordered = []
+    pending = children_by_parent_id.get(None, [])
+    while pending:
+        ordered.extend(pending)
+        pending = [
+            child
+            for tag in pending
+            for child in children_by_parent_id.get(tag.id, [])
+        ]
+
+    return ordered
+
+
+def iterate_item_rows(session: Session) -> Iterator[tuple]:
+    """Yield each item with its tag IDs, merging two scans in ID order."""
+    items = session.execute(
+        select(
+            models.Item.id,
+            models.Item.name,
+            models.Item.description,
+            models.Item.status,
+        ).order_by(models.Item.id)
+    ).yield_per(SNAPSHOT_BATCH_SIZE)
+    links = session.execute(
+        select(models.ItemTag.item_id, models.ItemTag.tag_id).order_by(
+            models.ItemTag.item_id, models.ItemTag.tag_id
+        )
+    ).yield_per(SNAPSHOT_BATCH_SIZE)
+    tag_ids_by_item = groupby(links, key=lambda link: link.item_id)
+
+    item_id_with_tags, tag_links = next(tag_ids_by_item, (None, []))
+    for item in items:
+        tag_ids = []
+        if item.id == item_id_with_tags:
+            tag_ids = [link.tag_id for link in tag_links]
+            item_id_with_tags, tag_links = next(tag_ids_by_item, (None, []))
+
+        yield (*item, tag_ids)
+
+
+def write_snapshot(session: Session, output: IO[bytes]) -> (int, int):
+    """Write every tag and item to the output, and return how many."""
+    # Everything is read in one transaction, so the header counts match the
+    # lines written even with other processes writing meanwhile.
+    tags = get_tags_in_hierarchy_order(session)
+    item_count = session.execute(select(func.count(models.Item.id))).scalar()
+
+    with gzip.open(output, 'wt', encoding='utf-8') as stream:
+        write_line(
+            stream,
+            {
+                'format': SNAPSHOT_FORMAT,
+                'version': SNAPSHOT_VERSION,
+                'tags': len(tags),
+                'items': item_count,
+            },
+        )
+
+        for (tag_id, name, parent_id) in tags:
+            write_line(
+                stream,
+                {'tag': tag_id, 'name': name, 'parent': parent_id},
+            )
+
+        for (item_id, name, description, status, tag_ids) in iterate_item_rows(
+            session
+        ):
+            write_line(
+                stream,
+                {
+                    'item': item_id,
+                    'name': name,
+                    'description': description,
+                    'status': status.value,
+                    'tags': tag_ids,
+                },
+            )
+
+    return len(tags), item_count
+
+
+def write_line(stream: IO[str], data: dict):
+    stream.write(json.dumps(data, separators=(',', ':')) + '\n')
+
+
+def read_header(lines: Iterator[str]) -> dict:
+    header = read_line(next(lines, ''))
+
+    if header.get('format') != SNAPSHOT_FORMAT:
+        raise SnapshotError('The file is not a snapshot.')
+
+    if header.get('version') != SNAPSHOT_VERSION:
+        raise SnapshotError(
+            f'Snapshot version {header.get("version")} is not supported.'
+        )
+
+    for key in ('tags', 'items'):
+        if not isinstance(header.get(key), int) or header[key] < 0:
+            raise SnapshotError(f'The snapshot header has no {key} count.')
+
+    return header
+
+
+def read_line(line: str) -> dict:
+    try:
+        data = json.loads(line)
+    except ValueError as error:
+        raise SnapshotError(f'Invalid snapshot line: {line!r}') from error
+
+    if not isinstance(data, dict):
+        raise SnapshotError(f'Invalid snapshot line: {line!r}')
+
+    return data
+
+
+def read_snapshot(session: Session, file: IO[bytes]) -> (int, int):
+    """Add the tags and items of the snapshot, and return how many.
+
+    They get new IDs, so a snapshot can be loaded into a database that has
+    items already. Tags are matched by name, ignoring case, and parent with
+    the existing ones, and only the added tags are counted. Nothing is written
+    unless the whole snapshot is valid.
+    """
+    try:
+        with gzip.open(file, 'rt', encoding='utf-8') as stream:
+            counts = load_snapshot(session, iter(stream))
+    except (EOFError, UnicodeDecodeError, gzip.BadGzipFile) as error:
+        session.rollback()
+        raise SnapshotError('The file is not a complete snapshot.') from error
+    except Exception:
+        session.rollback()
+        raise
+
+    session.commit()
+
+    return counts
+
+
+def load_snapshot(session: Session, lines: Iterator[str]) -> (int, int):
+    header = read_header(lines)
+
+    # The IDs are reserved before the transaction starts, since the allocator
+    # writes with its own connection.
+    tag_ids = iter(allocate_ids(session, models.Tag, header['tags']))
+    item_ids = iter(allocate_ids(session, models.Item, header['items']))
+
+    # The header is the first line.
+    tag_id_map, tag_count = load_tags(
+        session, islice(lines, header['tags']), tag_ids, first_line=2
+    )
+    tree_ids_by_tag_id = {}
+    if counters.VIEW_COUNTERS:
+        tree_ids_by_tag_id = counters.load_tree_ids(
+            session, set(tag_id_map.values())
+        )
+
+    deltas = load_items(
+        session,
+        lines,
+        item_ids,
+        tag_id_map,
+        tree_ids_by_tag_id,
+        first_line=header['tags'] + 2,
+    )
+    counters.update_counters(session, deltas)
+
+    return tag_count, header['items']
+
+
+def load_tags(
+    session: Session,
+    lines: Iterable[str],
+    new_ids: Iterator[int],
+    first_line: int = 1,
+) -> ({int: int}, int):
+    """Return the new ID of every tag, and how many tags were added.
+
+    A tag is the existing one with its name, ignoring case, under the same
+    parent.
+    """
+    existing_id_by_key = {
+        (name.lower(), parent_id): tag_id
+        for (name, parent_id, tag_id) in session.execute(
+            select(models.Tag.name, models.Tag.parent_id, models.Tag.id)
+        )
+    }
+    tag_id_map = {}
+    rows = []
+
+    for number, line in enumerate(lines, start=first_line):
+        data = read_line(line)
+        if 'tag' not in data:
+            raise SnapshotError('The snapshot has fewer tags than expected.')
+
+        try:
+            tag = schemas.TagCreate(
+                name=data['name'], parent_id=data['parent']
+            )
+        except (KeyError, ValueError) as error:
+            raise SnapshotError(
+                f'Invalid snapshot tag on line {number}: {line!r}'
+            ) from error
+
+        if tag.parent_id is not None and tag.parent_id not in tag_id_map:
+            raise SnapshotError(f'Tag {tag.name} has an unknown parent.')
+
+        parent_id = tag_id_map.get(tag.parent_id)
+        existing_id = existing_id_by_key.get((tag.name.lower(), parent_id))
+        if existing_id is not None:
+            tag_id_map[data['tag']] = existing_id
+            continue
+
+        tag_id = tag_id_map[data['tag']] = next(new_ids)
+        rows.append({'id': tag_id, 'name': tag.name, 'parent_id': parent_id})
+
+    if rows:
+        session.execute(insert(models.Tag), rows)
+        models.add_tag_paths(session.connection(), [row['id'] for row in rows])
+
+    # Existing tags that get their first child start counting their tree.
+    existing_ids = set(existing_id_by_key.values())
+    for parent_id in {row['parent_id'] for row in rows} & existing_ids:
+        counters.add_tree_counter(session, parent_id)
+
+    return tag_id_map, len(rows)
+
+
+def load_items(
+    session: Session,
+    lines: Iterable[str],
+    new_ids: Iterator[int],
+    tag_id_map: {int: int},
+    tree_ids_by_tag_id: dict = None,
+    first_line: int = 1,
+) -> Counter:
+    deltas = Counter()
+    item_rows = []
+    link_rows = []
+
+    for number, line in enumerate(lines, start=first_line):
+        data = read_line(line)
+        item_id = next(new_ids, None)
+        if 'item' not in data or item_id is None:
+            raise SnapshotError('The snapshot does not match its header.')
+
+        try:
+            item = schemas.ItemCreate(
+                name=data['name'],
+                description=data.get('description'),
+                status=data['status'],
+            )
+            tag_ids = [tag_id_map[tag_id] for tag_id in data['tags']]
+        except (KeyError, TypeError, ValueError) as error:
+            raise SnapshotError(
+                f'Invalid snapshot item on line {number}: {line!r}'
+            ) from error
+
+        status = item.status
+        item_rows.append(
+            {
+                'id': item_id,
+                'name': item.name,
+                'description': item.description,
+                'status': status,
+            }
+        )
+
+        link_rows.extend(
+            {'item_id': item_id, 'tag_id': tag_id} for tag_id in tag_ids
+        )
+        tree_ids = counters.get_tree_ids(tag_ids, tree_ids_by_tag_id or {})
+        deltas.update(counters.get_counter_names(status, tag_ids, tree_ids))
+
+        if len(item_rows) >= SNAPSHOT_BATCH_SIZE:
+            insert_item_rows(session, item_rows, link_rows)
+            item_rows, link_rows = [], []
+
+    if next(new_ids, None) is not None:
+        raise SnapshotError('The snapshot has fewer items than expected.')
+
+    insert_item_rows(session, item_rows, link_rows)
+
+    return deltas
+
+
+def insert_item_rows(session: Session, item_rows: [dict], link_rows: [dict]):
+    if item_rows:
+        session.execute(insert(models.Item), item_rows)
+
+    if link_rows:
+        session.execute(insert(models.ItemTag), link_rows)
@@ -0,0 +1,78 @@
+from typing import NamedTuple, Optional
+
+import models
+from sqlalchemy import and_
+from sqlalchemy.orm import Session
+
+
+class TagInfo(NamedTuple):
+    id: int
+    name: str
+    parent_id: Optional[int]
+
+
+class TagRegistry:
+    def __init__(
+        self, tag_list: [TagInfo], ancestor_ids_by_id: {int: [int]} = None
+    ):
+        self.tags_by_id = {}
+        self.tags_by_name = {}
+        self.children_by_parent_id = {}
+        self.ancestor_ids_by_id = ancestor_ids_by_id or {}
+
+        for tag in tag_list:
+            self.tags_by_id[tag.id] = tag
+            self.tags_by_name.setdefault(tag.name.lower(), tag)
+            self.children_by_parent_id.setdefault(tag.parent_id, [])
+            self.children_by_parent_id[tag.parent_id].append(tag)
+
+    @classmethod
+    def load(cls, session: Session) -> 'TagRegistry':
+        # One row per ancestor of each tag, from the root down to the parent.
+        rows = (
+            session.query(
+                models.Tag.id,
+                models.Tag.name,
+                models.Tag.parent_id,
+                models.TagPath.ancestor_id,
+            )
+            .outerjoin(
+                models.TagPath,
+                and_(
+                    models.TagPath.descendant_id == models.Tag.id,
+                    models.TagPath.depth > 0,
+                ),
+            )
+            .order_by(models.Tag.id, models.TagPath.depth.desc())
+        )
+        tag_list = []
+        ancestor_ids_by_id = {}
+
+        for (tag_id, name, parent_id, ancestor_id) in rows:
+            if tag_id not in ancestor_ids_by_id:
+                tag_list.append(TagInfo(tag_id, name, parent_id))
+                ancestor_ids_by_id[tag_id] = []
+            if ancestor_id is not None:
+                ancestor_ids_by_id[tag_id].append(ancestor_id)
+
+        return cls(tag_list, ancestor_ids_by_id)
+
+    def get(self, tag_id: int) -> Optional[TagInfo]:
+        return self.tags_by_id.get(tag_id)
+
+    def get_by_name(self, tag_name: str) -> Optional[TagInfo]:
+        return self.tags_by_name.get(tag_name.lower())
+
+    def get_children(self, tag_id: Optional[int]) -> [TagInfo]:
+        return self.children_by_parent_id.get(tag_id, [])
+
+    def get_ancestors(self, tag_id: int) -> [TagInfo]:
+        return [
+            self.tags_by_id[ancestor_id]
+            for ancestor_id in self.ancestor_ids_by_id.get(tag_id, [])
+        ]
+
+    def is_descendant(self, tag_id: int, ancestor_id: int) -> bool:
+        return tag_id == ancestor_id or ancestor_id in (
+            self.ancestor_ids_by_id.get(tag_id, [])
+        )
@@ -1,30 +1,41 @@
+import importlib
+import json
 import os
-from typing import Any, Callable, Union
+from typing import Any, Iterable, Iterator, Union
 
 import facade
 import schemas
+from pydantic import ValidationError
 
 
 def clear_screen():
     os.system('cls' if os.name == 'nt' else 'clear')
 
 
-def return_to(function: Callable):
-    def inner(*args, **kwargs):
-        try:
-            result = function(*args, **kwargs)
-        finally:
-            if isinstance(kwargs.get('return_func'), Callable):
-                return_func = kwargs.pop('return_func')
-                return_args = kwargs.get('return_args', {})
-                if 'return_choice' in kwargs:
-                    return_choice = kwargs.pop('return_choice')
-                    return_args['default_choice'] = return_choice
-                return_func(**return_args)
+class LazyImport:
+    def __init__(self, module_name: str, attribute: str = None):
+        self._module_name = module_name
+        self._attribute = attribute
+        self._target = None
 
-        return result
+    def _load(self) -> Any:
+        if self._target is None:
+            target = importlib.import_module(self._module_name)
+            if self._attribute:
+                target = getattr(target, self._attribute)
+            self._target = target
 
-    return inner
+        return self._target
+
+    def __getattr__(self, name: str) -> Any:
+        if name.startswith('__'):
+            # Keeps introspection, like typing's, from importing the module.
+            raise AttributeError(name)
+
+        return getattr(self._load(), name)
+
+    def __call__(self, *args, **kwargs) -> Any:
+        return self._load()(*args, **kwargs)
 
 
 # def decorator_factory(argument):
@@ -91,3 +102,44 @@ def init_tags():
         if not facade.get_tag_by_name(tag_name):
             tag = schemas.TagCreate(name=tag_name, parent_id=actions_tag.id)
             facade.create_tag(tag)
+
+
+class ItemLineError(ValueError):
+    pass
+
+
+def read_items_from_lines(
+    lines: Iterable[str], file_format: str = 'text'
+) -> Iterator[schemas.ItemCreate]:
+    for (number, line) in enumerate(lines, start=1):
+        line = line.strip()
+
+        if not line:
+            continue
+
+        if file_format == 'jsonl':
+            yield read_item_from_json(line, number)
+        else:
+            yield schemas.ItemCreate(name=line)
+
+
+def read_item_from_json(line: str, number: int) -> schemas.ItemCreate:
+    try:
+        data = json.loads(line)
+    except ValueError as error:
+        raise ItemLineError(
+            f'Line {number}: invalid JSON, {error}.'
+        ) from error
+
+    if not isinstance(data, dict):
+        raise ItemLineError(f'Line {number}: expected a JSON object.')
+
+    # Items are inserted without their tags.
+    if data.get('tags'):
+        raise ItemLineError(f'Line {number}: tags cannot be imported.')
+
+    try:
+        return schemas.ItemCreate(**data)
+    except ValidationError as error:
+        messages = ', '.join(detail['msg'] for detail in error.errors())
+        raise ItemLineError(f'Line {number}: {messages}') from error
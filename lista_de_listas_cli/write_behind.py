@@ -0,0 +1,334 @@
+import json
+import os
+import threading
+from contextlib import contextmanager
+from typing import IO, Iterator, Optional
+
+import models
+from decouple import config
+from sqlalchemy import event, insert, select, update
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+# Keeps the changes of the interactive mode in one open transaction and
+# commits them together, so that triage does not wait for the disk on every
+# change. Each change is written to a journal first, and the ones that were
+# not committed are applied again on the next start.
+WRITE_BEHIND: bool = config('WRITE_BEHIND', default=False, cast=bool)
+WRITE_BEHIND_INTERVAL: float = config(
+    'WRITE_BEHIND_INTERVAL', default=2.0, cast=float
+)
+WRITE_BEHIND_MAX_PENDING: int = config(
+    'WRITE_BEHIND_MAX_PENDING', default=20, cast=int
+)
+# Next to the database file by default.
+WRITE_BEHIND_JOURNAL: Optional[str] = config('WRITE_BEHIND_JOURNAL', None)
+
+
+class JournalError(ValueError):
+    pass
+
+
+def get_journal_path(bind: Engine) -> str:
+    if WRITE_BEHIND_JOURNAL:
+        return WRITE_BEHIND_JOURNAL
+
+    database = bind.url.database
+    if bind.dialect.name != 'sqlite' or database in (None, '', ':memory:'):
+        raise JournalError(
+            'Set WRITE_BEHIND_JOURNAL to use write-behind with this database.'
+        )
+
+    return f'{database}.writes'
+
+
+def read_journal(file: IO[str]) -> (Optional[dict], [list]):
+    """Return the header of the journal and its complete changes.
+
+    Every change is written as one line, so a line cut short by a crash is a
+    change that was never completed, and it is left out.
+    """
+    lines = file.read().splitlines()
+    header = None
+    changes = []
+
+    try:
+        header = json.loads(lines[0]) if lines else None
+        for line in lines[1:]:
+            changes.append(json.loads(line))
+    except ValueError:
+        pass
+
+    return (header if changes else None), changes
+
+
+def lock_journal(file: IO[str]):
+    """Keep the journal to this process until the file is closed."""
+    try:
+        if fcntl:
+            fcntl.flock(file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        else:
+            file.seek(0)
+            msvcrt.locking(file.fileno(), msvcrt.LK_NBLCK, 1)
+    except OSError as error:
+        raise JournalError(
+            f'Another session is using the journal {file.name}.'
+        ) from error
+
+
+def apply_changes(connection: Connection, changes: [list]):
+    for change in changes:
+        for (statement, parameters, many) in change:
+            connection.exec_driver_sql(
+                statement,
+                [tuple(row) for row in parameters]
+                if many
+                else tuple(parameters),
+            )
+
+
+class WriteBehind:
+    """Commit the changes made in a session in batches.
+
+    `changed()` takes the place of `Session.commit()`. The batch is
+    committed after `max_pending` changes, or `interval` seconds after its
+    first change once the session is not in use: the thread of the session
+    holds `lock`, except inside `waiting_for_input()`.
+    """
+
+    def __init__(
+        self,
+        session: Session,
+        journal_path: str,
+        interval: float = WRITE_BEHIND_INTERVAL,
+        max_pending: int = WRITE_BEHIND_MAX_PENDING,
+    ):
+        self.session = session
+        self.journal_path = os.path.abspath(journal_path)
+        self.interval = interval
+        self.max_pending = max_pending
+        self.lock = threading.Lock()
+        # The changes journaled since the last commit.
+        self.changes: [list] = []
+        self._bind = session.get_bind()
+        self._journal: Optional[IO[str]] = None
+        self._batch = 0
+        self._connection: Optional[Connection] = None
+        self._statements: [list] = []
+        self._replaying = False
+        self._timer: Optional[threading.Timer] = None
+
+    @property
+    def pending(self) -> int:
+        return len(self.changes)
+
+    def start(self) -> int:
+        """Apply what the journal has left, and return how many changes."""
+        self.lock.acquire()
+        self._journal = open(self.journal_path, 'a+', encoding='utf-8')
+
+        try:
+            lock_journal(self._journal)
+            recovered = self.recover()
+            self._batch = self.get_committed_batch() + 1
+        except BaseException:
+            self._journal.close()
+            self.lock.release()
+            raise
+
+        self._journal.seek(0)
+        self._journal.truncate()
+
+        event.listen(self.session, 'after_begin', self.after_begin)
+        event.listen(self.session, 'before_commit', self.before_commit)
+        event.listen(self.session, 'after_commit', self.after_commit)
+        event.listen(
+            self.session, 'after_soft_rollback', self.after_soft_rollback
+        )
+        event.listen(self._bind, 'after_cursor_execute', self.after_execute)
+        self._connection = self.session.connection()
+
+        return recovered
+
+    def stop(self):
+        """Commit the pending changes and stop journaling."""
+        try:
+            if self.pending:
+                self.commit()
+        finally:
+            event.remove(self.session, 'after_begin', self.after_begin)
+            event.remove(self.session, 'before_commit', self.before_commit)
+            event.remove(self.session, 'after_commit', self.after_commit)
+            event.remove(
+                self.session, 'after_soft_rollback', self.after_soft_rollback
+            )
+            event.remove(
+                self._bind, 'after_cursor_execute', self.after_execute
+            )
+            self.cancel_timer()
+
+            # The file is kept, empty unless the commit failed, so that no
+            # other session locks a journal that is being removed.
+            self._journal.close()
+            self.lock.release()
+
+    def recover(self) -> int:
+        self._journal.seek(0)
+        header, changes = read_journal(self._journal)
+
+        if header is None or header['batch'] <= self.get_committed_batch():
+            return 0
+
+        if header['database'] != str(self._bind.url):
+            raise JournalError(
+                f'The journal {self.journal_path} has changes for '
+                f'{header["database"]}.'
+            )
+
+        apply_changes(self.session.connection(), changes)
+        self.save_batch(header['batch'])
+        self.session.commit()
+
+        return len(changes)
+
+    def get_committed_batch(self) -> int:
+        batch = self.session.execute(
+            select(models.JournalBatch.batch).where(
+                models.JournalBatch.journal == self.journal_path
+            )
+        ).scalar()
+
+        return batch or 0
+
+    def save_batch(self, batch: int):
+        table = models.JournalBatch
+        updated = self.session.execute(
+            update(table)
+            .where(table.journal == self.journal_path)
+            .values(batch=batch)
+        ).rowcount
+
+        if not updated:
+            self.session.execute(
+                insert(table).values(journal=self.journal_path, batch=batch)
+            )
+
+    def changed(self):
+        """Journal the changes made since the last call, to commit later."""
+        self.session.flush()
+
+        if self._statements:
+            lines = [json.dumps(self._statements)]
+            if not self._journal.tell():
+                header = {
+                    'database': str(self._bind.url),
+                    'batch': self._batch,
+                }
+                lines.insert(0, json.dumps(header))
+
+            # Not synced to disk, like the commits of the `performance`
+            # SQLite profile.
+            self._journal.write(''.join(line + '\n' for line in lines))
+            self._journal.flush()
+
+            self.changes.append(self._statements)
+            self._statements = []
+
+        if self.pending >= self.max_pending:
+            self.commit()
+        elif self.pending and self._timer is None:
+            self.schedule()
+
+    def commit(self):
+        self.session.commit()
+
+    def schedule(self):
+        self._timer = threading.Timer(self.interval, self.commit_when_idle)
+        self._timer.daemon = True
+        self._timer.start()
+
+    def commit_when_idle(self):
+        with self.lock:
+            self._timer = None
+
+            if not self.pending:
+                return
+
+            try:
+                self.commit()
+            except SQLAlchemyError:
+                # Most likely another writer holds the database, so the
+                # changes are applied again and committed on the next try.
+                self.session.rollback()
+                self.schedule()
+
+    @contextmanager
+    def waiting_for_input(self) -> Iterator[None]:
+        self.lock.release()
+
+        try:
+            yield
+        finally:
+            self.lock.acquire()
+
+    def cancel_timer(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+    def after_begin(self, _session, _transaction, connection: Connection):
+        self._connection = connection
+
+    def after_execute(
+        self, connection, _cursor, statement, parameters, context, many
+    ):
+        if connection is not self._connection or self._replaying:
+            return
+
+        if context.isinsert or context.isupdate or context.isdelete:
+            self._statements.append(
+                [
+                    statement,
+                    [list(row) for row in parameters]
+                    if many
+                    else list(parameters),
+                    many,
+                ]
+            )
+
+    def before_commit(self, _session):
+        if self.pending:
+            self.save_batch(self._batch)
+
+    def after_commit(self, _session):
+        if self.pending:
+            self._journal.seek(0)
+            self._journal.truncate()
+            self._journal.flush()
+            self._batch += 1
+
+        self.changes = []
+        self._statements = []
+        self._connection = None
+        self.cancel_timer()
+
+    def after_soft_rollback(self, session: Session, previous_transaction):
+        self._statements = []
+
+        if previous_transaction.parent is not None or not self.pending:
+            return
+
+        # A rollback would lose the pending changes, so they are applied
+        # again from the journal.
+        self._replaying = True
+        try:
+            apply_changes(session.connection(), self.changes)
+        finally:
+            self._replaying = False
@@ -1,12 +1,15 @@
 import os
+from contextlib import contextmanager
 
+import allocator
+import counters
 import facade
 import pytest as pytest
 import schemas
 from click.testing import CliRunner
-from database import Base
+from database import Base, configure_sqlite
 from decouple import config
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
 from sqlalchemy.orm import Session, sessionmaker
 from sqlalchemy_utils import create_database, database_exists, drop_database
 
@@ -14,7 +17,13 @@ SQLALCHEMY_DATABASE_URL = config(
     'DATABASE_TEST_URL', f'sqlite:///{os.path.dirname(__file__)}/test.db'
 )
 
-engine = create_engine(SQLALCHEMY_DATABASE_URL)
+connect_args = (
+    {'check_same_thread': False}
+    if SQLALCHEMY_DATABASE_URL.startswith('sqlite:')
+    else {}
+)
+engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args=connect_args)
+configure_sqlite(engine)
 
 
 @pytest.fixture(scope='session', autouse=True)
@@ -50,6 +59,9 @@ def db_session():
     for tbl in reversed(Base.metadata.sorted_tables):
         engine.execute(tbl.delete())
 
+    # The ID blocks reserved by this process were deleted along with the data
+    allocator.forget_reserved_ids()
+
     # put back the connection to the connection pool
     session.close()
 
@@ -59,6 +71,39 @@ def configure_db_session(db_session):
     facade.db_session = db_session
 
 
+@pytest.fixture
+def view_counters(monkeypatch):
+    """Turn the view counters on for the test."""
+    monkeypatch.setattr(counters, 'VIEW_COUNTERS', True)
+    counters.listen_for_flushes()
+
+    yield
+
+    counters.stop_listening_for_flushes()
+
+
+@contextmanager
+def statements_executed_on(bind):
+    """Collect every SQL statement sent to the database inside the block."""
+    statements = []
+
+    def before_cursor_execute(_conn, _cursor, statement, *_):
+        statements.append(statement)
+
+    event.listen(bind, 'before_cursor_execute', before_cursor_execute)
+
+    try:
+        yield statements
+    finally:
+        event.remove(bind, 'before_cursor_execute', before_cursor_execute)
+
+
+@pytest.fixture
+def count_queries():
+    """Returns a context manager that records the executed statements."""
+    return lambda: statements_executed_on(engine)
+
+
 @pytest.fixture
 def item_1(db_session):
     item = schemas.ItemCreate(name='Something')
@@ -124,3 +169,12 @@ def child_tag_2_of_parent_tag_1(db_session, parent_tag_1):
             name='Child 2 of Parent tag 1', parent_id=parent_tag_1.id
         )
     )
+
+
+@pytest.fixture
+def grandchild_tag_of_parent_tag_1(db_session, child_tag_1_of_parent_tag_1):
+    return facade.create_tag(
+        schemas.TagCreate(
+            name='Grandchild', parent_id=child_tag_1_of_parent_tag_1.id
+        )
+    )
@@ -0,0 +1,70 @@
+import multiprocessing
+
+import allocator
+import facade
+import models
+import schemas
+from conftest import SQLALCHEMY_DATABASE_URL
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+PROCESSES = 8
+ITEMS_PER_PROCESS = 60
+
+
+def add_items(count: int):
+    engine = create_engine(SQLALCHEMY_DATABASE_URL)
+    facade.db_session = sessionmaker(bind=engine)()
+
+    for index in range(count):
+        facade.create_item(schemas.ItemCreate(name=f'Item {index}'))
+
+    facade.db_session.close()
+
+
+def test_allocate_ids__sequential_ids(db_session):
+    first, second = allocator.allocate_ids(db_session, models.Item, count=2)
+
+    assert second == first + 1
+
+
+def test_allocate_ids__starts_after_existent_items(db_session, item_1):
+    allocator.forget_reserved_ids()
+    db_session.query(models.IdBlock).delete()
+    db_session.commit()
+
+    assert allocator.allocate_ids(db_session, models.Item)[0] > item_1.id
+
+
+def test_allocate_ids__more_ids_than_a_block(db_session):
+    count = allocator.ID_BLOCK_SIZE * 2
+
+    assert len(allocator.allocate_ids(db_session, models.Item, count)) == count
+
+
+def test_allocate_ids__reserves_a_block_once(db_session):
+    allocator.forget_reserved_ids()
+    allocator.allocate_ids(db_session, models.Item)
+
+    next_id = db_session.query(models.IdBlock.next_id).scalar()
+    allocator.allocate_ids(db_session, models.Item)
+
+    assert db_session.query(models.IdBlock.next_id).scalar() == next_id
+
+
+def test_allocate_ids__block_size(db_session):
+    allocator.forget_reserved_ids()
+    (first_id,) = allocator.allocate_ids(db_session, models.Item, block_size=1)
+
+    assert db_session.query(models.IdBlock.next_id).scalar() == first_id + 1
+
+
+def test_create_item__concurrent_processes(db_session):
+    allocator.forget_reserved_ids()
+
+    with multiprocessing.Pool(PROCESSES) as pool:
+        pool.map(add_items, [ITEMS_PER_PROCESS] * PROCESSES)
+
+    total = db_session.query(models.Item).count()
+
+    assert total == PROCESSES * ITEMS_PER_PROCESS
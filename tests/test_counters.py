@@ -0,0 +1,250 @@
+from unittest.mock import patch
+
+import counters
+import facade
+import main
+import models
+import pytest
+import schemas
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+
+@pytest.fixture(autouse=True)
+def counted(view_counters, monkeypatch, db_session):
+    monkeypatch.setattr(main, 'db_session', db_session)
+
+
+def test_stop_listening_for_flushes(db_session, item_1):
+    counters.stop_listening_for_flushes()
+    item_1.status = schemas.ItemStatus.DONE
+    db_session.commit()
+
+    # The item is still counted as actionable.
+    assert facade.check_view_counters() != []
+    assert not event.contains(
+        Session, 'before_flush', counters.count_flushed_items
+    )
+
+
+def test_get_counter_names__untagged_item():
+    names = counters.get_counter_names(schemas.ItemStatus.UNDONE, [])
+
+    assert names == ['actionable', 'inbox']
+
+
+def test_get_counter_names__tagged_item():
+    names = counters.get_counter_names(schemas.ItemStatus.UNDONE, [1, 2])
+
+    assert names == ['actionable', 'tag.1', 'tag.2']
+
+
+def test_get_counter_names__done_item():
+    assert counters.get_counter_names(schemas.ItemStatus.DONE, [1]) == []
+
+
+def test_create_item__counted(item_1):
+    assert facade.get_view_summary() == facade.ViewSummary(
+        inbox=1, actionable=1, tags=[]
+    )
+    assert facade.check_view_counters() == []
+
+
+def test_insert_items__counted():
+    facade.insert_items(
+        [
+            schemas.ItemCreate(name='First'),
+            schemas.ItemCreate(name='Second', status=schemas.ItemStatus.NOTE),
+        ]
+    )
+
+    assert facade.get_view_summary().inbox == 1
+    assert facade.check_view_counters() == []
+
+
+def test_set_item_status__counted(item_1, tag_1):
+    item_1.tags = [tag_1]
+    facade.set_item_status(item_1, schemas.ItemStatus.DONE)
+
+    assert facade.get_view_summary() == facade.ViewSummary(
+        inbox=0, actionable=0, tags=[]
+    )
+    assert facade.check_view_counters() == []
+
+
+@patch('main.inquirer.checkbox')
+def test_edit_item_tags__counted(mock, item_1, tag_1, tag_2):
+    mock.return_value.execute.return_value = [tag_1.id, tag_2.id]
+    main.edit_item_tags(item_1)
+
+    mock.return_value.execute.return_value = [tag_2.id]
+    main.edit_item_tags(item_1)
+
+    assert facade.get_view_summary() == facade.ViewSummary(
+        inbox=0, actionable=1, tags=[facade.TagCount(tag_2.id, tag_2.name, 1)]
+    )
+    assert facade.check_view_counters() == []
+
+
+def test_deleting_an_item__counted(db_session, item_1):
+    db_session.delete(item_1)
+    db_session.commit()
+
+    assert facade.check_view_counters() == []
+
+
+def test_get_view_summary__reads_only_the_counters(count_queries, item_1):
+    facade.invalidate_view_summary()
+
+    with count_queries() as statements:
+        facade.get_view_summary()
+
+    assert len(statements) == 1
+    assert 'FROM view_counter' in statements[0]
+    assert 'FROM item' not in statements[0]
+
+
+def test_check_view_counters__finds_differences(monkeypatch, item_1):
+    monkeypatch.setattr(counters, 'VIEW_COUNTERS', False)
+    facade.create_item(schemas.ItemCreate(name='Not counted'))
+
+    assert facade.check_view_counters() == [
+        ('actionable', 2, 1),
+        ('inbox', 2, 1),
+    ]
+
+
+def test_rebuild_view_counters(db_session, monkeypatch, item_1, tag_1):
+    monkeypatch.setattr(counters, 'VIEW_COUNTERS', False)
+    item_1.tags = [tag_1]
+    db_session.commit()
+
+    assert facade.rebuild_view_counters() == 2
+    assert facade.check_view_counters() == []
+    assert db_session.get(models.ViewCounter, f'tag.{tag_1.id}').count == 1
+
+
+def test_rebuild_counters_command(runner, item_1):
+    result = runner.invoke(main.rebuild_counters_command)
+
+    assert result.output == '2 counters rebuilt.\n'
+
+
+def test_check_counters_command__match(runner, item_1):
+    result = runner.invoke(main.check_counters_command)
+
+    assert result.exit_code == 0
+
+
+def test_check_counters_command__differences(runner, monkeypatch, item_1):
+    monkeypatch.setattr(counters, 'VIEW_COUNTERS', False)
+    facade.create_item(schemas.ItemCreate(name='Not counted'))
+
+    result = runner.invoke(main.check_counters_command)
+
+    assert result.exit_code == 1
+    assert 'inbox: 1 counted, 2 expected' in result.output
+
+
+def test_set_items_status__counted(item_1, undone_item_1, tag_1):
+    item_1.tags = [tag_1]
+    facade.set_items_status([item_1.id], schemas.ItemStatus.WONT)
+
+    assert facade.get_view_summary() == facade.ViewSummary(
+        inbox=1, actionable=1, tags=[]
+    )
+    assert facade.check_view_counters() == []
+
+
+def test_assign_tag__counted(
+    item_1,
+    undone_item_1,
+    child_tag_1_of_parent_tag_1,
+    child_tag_2_of_parent_tag_1,
+):
+    item_1.tags = [child_tag_1_of_parent_tag_1]
+    facade.assign_tag(
+        [item_1.id, undone_item_1.id], child_tag_2_of_parent_tag_1
+    )
+
+    assert facade.get_view_summary().tags == [
+        facade.TagCount(
+            child_tag_2_of_parent_tag_1.id, child_tag_2_of_parent_tag_1.name, 2
+        )
+    ]
+    assert facade.check_view_counters() == []
+
+
+def test_get_counter_names__trees():
+    names = counters.get_counter_names(schemas.ItemStatus.UNDONE, [3], [1])
+
+    assert names == ['actionable', 'tag.3', 'tree.1']
+
+
+def test_tree_counters(
+    db_session,
+    item_1,
+    undone_item_1,
+    parent_tag_1,
+    child_tag_1_of_parent_tag_1,
+    grandchild_tag_of_parent_tag_1,
+):
+    facade.assign_tag([item_1.id], child_tag_1_of_parent_tag_1)
+    facade.assign_tag([item_1.id], grandchild_tag_of_parent_tag_1)
+    undone_item_1.tags = [grandchild_tag_of_parent_tag_1]
+    db_session.commit()
+    facade.set_items_status([item_1.id], schemas.ItemStatus.DONE)
+
+    assert facade.get_view_summary().trees == [
+        facade.TagCount(parent_tag_1.id, parent_tag_1.name, 1),
+        facade.TagCount(
+            child_tag_1_of_parent_tag_1.id, child_tag_1_of_parent_tag_1.name, 1
+        ),
+    ]
+    assert facade.check_view_counters() == []
+
+
+def test_create_tag__counts_the_tree_of_the_parent(item_1, tag_1):
+    facade.assign_tag([item_1.id], tag_1)
+
+    facade.create_tag(schemas.TagCreate(name='Child', parent_id=tag_1.id))
+
+    assert facade.get_view_summary().trees == [
+        facade.TagCount(tag_1.id, tag_1.name, 1)
+    ]
+    assert facade.check_view_counters() == []
+
+
+def test_edit_tag__counts_the_moved_tree(
+    item_1, tag_1, parent_tag_1, child_tag_1_of_parent_tag_1
+):
+    facade.assign_tag([item_1.id], child_tag_1_of_parent_tag_1)
+
+    facade.edit_tag(
+        child_tag_1_of_parent_tag_1,
+        schemas.TagCreate(name='Moved', parent_id=tag_1.id),
+    )
+
+    assert facade.get_view_summary().trees == [
+        facade.TagCount(tag_1.id, tag_1.name, 1)
+    ]
+    assert facade.check_view_counters() == []
+
+
+def test_set_item_tags__counted(
+    item_1, tag_1, child_tag_1_of_parent_tag_1, grandchild_tag_of_parent_tag_1
+):
+    facade.set_item_tags(item_1.id, [tag_1.id, child_tag_1_of_parent_tag_1.id])
+    facade.set_item_tags(
+        item_1.id, [tag_1.id, grandchild_tag_of_parent_tag_1.id]
+    )
+
+    assert facade.get_view_summary().tags == [
+        facade.TagCount(tag_1.id, tag_1.name, 1),
+        facade.TagCount(
+            grandchild_tag_of_parent_tag_1.id,
+            grandchild_tag_of_parent_tag_1.name,
+            1,
+        ),
+    ]
+    assert facade.check_view_counters() == []
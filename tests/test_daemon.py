@@ -0,0 +1,176 @@
+import asyncio
+import json
+import socket
+import threading
+from unittest.mock import patch
+
+import daemon
+import daemon_client
+import facade
+import main
+import pytest
+
+
+@pytest.fixture
+def socket_path(tmp_path):
+    return str(tmp_path / 'daemon.sock')
+
+
+@pytest.fixture
+def running_daemon(socket_path):
+    loop = asyncio.new_event_loop()
+    server = daemon.Daemon()
+    task = loop.create_task(server.serve(socket_path))
+
+    def run_until_cancelled():
+        try:
+            loop.run_until_complete(task)
+        except asyncio.CancelledError:
+            pass
+
+    thread = threading.Thread(target=run_until_cancelled)
+    thread.start()
+
+    while not daemon_client.send_request({'command': 'ping'}, socket_path):
+        pass
+
+    yield server
+
+    loop.call_soon_threadsafe(task.cancel)
+    thread.join()
+    loop.close()
+
+
+def test_send_request__daemon_not_running(socket_path):
+    assert daemon_client.send_request({'command': 'ping'}, socket_path) is None
+
+
+def test_send_request__stale_socket_file(socket_path):
+    open(socket_path, 'w').close()
+
+    assert daemon_client.send_request({'command': 'ping'}, socket_path) is None
+
+
+def test_add(running_daemon, socket_path):
+    response = daemon_client.send_request(
+        {'command': 'add', 'name': 'Something'}, socket_path
+    )
+
+    assert facade.get_item(response['id']).name == 'Something'
+
+
+def test_add__invalid_name(running_daemon, socket_path):
+    response = daemon_client.send_request(
+        {'command': 'add', 'name': ' '}, socket_path
+    )
+
+    assert not response['ok']
+
+
+def test_unknown_command(running_daemon, socket_path):
+    response = daemon_client.send_request({'command': 'unknown'}, socket_path)
+
+    assert response == {'ok': False, 'error': 'Unknown command.'}
+
+
+@pytest.mark.parametrize('line', [b'not json\n', b'[]\n'])
+def test_invalid_request(running_daemon, socket_path, line):
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+        client.connect(socket_path)
+        client.sendall(line)
+
+        with client.makefile('rb') as response:
+            assert json.loads(response.readline()) == {
+                'ok': False,
+                'error': 'Invalid request.',
+            }
+
+
+def test_list(running_daemon, socket_path, item_1, done_item_1):
+    response = daemon_client.send_request({'command': 'list'}, socket_path)
+
+    assert response['items'] == [{'id': item_1.id, 'text': item_1.name}]
+
+
+def test_serve__already_running(running_daemon, socket_path):
+    with pytest.raises(daemon.DaemonError):
+        daemon.serve(socket_path)
+
+
+def test_commit_pending_items__group_commit():
+    async def add_items(server: daemon.Daemon):
+        server.pending_items = asyncio.Queue()
+        commit_task = asyncio.create_task(server.commit_pending_items())
+
+        responses = await asyncio.gather(
+            *(server.add({'name': f'Item {index}'}) for index in range(20))
+        )
+
+        commit_task.cancel()
+
+        return responses
+
+    with patch('facade.insert_items', wraps=facade.insert_items) as mock:
+        responses = asyncio.run(add_items(daemon.Daemon(batch_delay=0.01)))
+
+    assert mock.call_count == 1 and len({r['id'] for r in responses}) == 20
+
+
+def test_commit_pending_items__rolls_back_a_failed_batch(db_session):
+    async def add_items(server: daemon.Daemon):
+        server.pending_items = asyncio.Queue()
+        commit_task = asyncio.create_task(server.commit_pending_items())
+
+        with patch('facade.insert_items', side_effect=ValueError('Failed')):
+            with pytest.raises(ValueError):
+                await server.add({'name': 'Lost'})
+
+        response = await server.add({'name': 'Kept'})
+        commit_task.cancel()
+
+        return response
+
+    with patch.object(
+        db_session, 'rollback', wraps=db_session.rollback
+    ) as mock:
+        response = asyncio.run(add_items(daemon.Daemon(batch_delay=0.01)))
+
+    assert mock.call_count == 1
+    assert facade.get_item(response['id']).name == 'Kept'
+
+
+@patch('daemon_client.send_request')
+def test_add_command__forwarded_to_daemon(send_request_mock, runner):
+    send_request_mock.return_value = {'ok': True, 'id': 1}
+
+    runner.invoke(main.add_command, ['A task'])
+
+    assert facade.get_item_list() == []
+
+
+@patch('daemon_client.send_request')
+def test_add_command__daemon_not_running(send_request_mock, runner):
+    send_request_mock.return_value = None
+
+    runner.invoke(main.add_command, ['A task'])
+
+    assert [item.name for item in facade.get_item_list()] == ['A task']
+
+
+def test_list_command__plain(runner, item_1):
+    result = runner.invoke(main.list_command, ['--format', 'plain'])
+
+    assert result.output == f'{item_1.name}\n'
+
+
+@patch('daemon_client.send_request')
+def test_list_command__plain_from_daemon(send_request_mock, runner):
+    send_request_mock.return_value = {
+        'ok': True,
+        'items': [{'id': 1, 'text': 'From daemon'}],
+        'cursor': None,
+    }
+
+    result = runner.invoke(main.list_command, ['--format', 'plain'])
+
+    assert result.output == 'From daemon\n'
@@ -0,0 +1,72 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import database
+import facade
+import pytest
+import schemas
+from conftest import engine
+from sqlalchemy import create_engine
+from sqlalchemy.orm import scoped_session, sessionmaker
+
+
+def pragma(bind, name: str):
+    with bind.connect() as connection:
+        return connection.exec_driver_sql(f'PRAGMA {name}').scalar()
+
+
+def test_get_sqlite_pragmas__default_profile():
+    assert database.get_sqlite_pragmas('default') == {}
+
+
+def test_get_sqlite_pragmas__overridden_by_setting(monkeypatch):
+    monkeypatch.setenv('SQLITE_CACHE_SIZE', '-2000')
+
+    pragmas = database.get_sqlite_pragmas('performance')
+
+    assert pragmas['cache_size'] == '-2000'
+
+
+def test_get_sqlite_pragmas__unknown_profile():
+    with pytest.raises(KeyError):
+        database.get_sqlite_pragmas('unknown')
+
+
+@pytest.mark.skipif(engine.dialect.name != 'sqlite', reason='SQLite only')
+def test_configure_sqlite__performance_profile(tmp_path):
+    bind = create_engine(f'sqlite:///{tmp_path}/profile.db')
+    database.configure_sqlite(bind, 'performance')
+
+    assert (pragma(bind, 'journal_mode'), pragma(bind, 'synchronous')) == (
+        'wal',
+        1,
+    )
+
+
+@pytest.mark.skipif(engine.dialect.name != 'sqlite', reason='SQLite only')
+def test_configure_sqlite__default_profile(tmp_path):
+    bind = create_engine(f'sqlite:///{tmp_path}/profile.db')
+    database.configure_sqlite(bind, 'default')
+
+    assert pragma(bind, 'journal_mode') == 'delete'
+
+
+@pytest.fixture
+def scoped_facade_session(monkeypatch):
+    session_registry = scoped_session(sessionmaker(bind=engine))
+    monkeypatch.setattr(facade, 'db_session', session_registry)
+
+    yield session_registry
+
+    session_registry.remove()
+
+
+def test_facade__used_from_a_thread_pool(scoped_facade_session):
+    def add_and_list(index: int):
+        facade.create_item(schemas.ItemCreate(name=f'Item {index}'))
+        facade.get_actionable_items()
+        facade.db_session.remove()
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        list(executor.map(add_and_list, range(40)))
+
+    assert len(facade.get_item_list()) == 40
@@ -74,6 +74,193 @@ def test_get_actionable_items_with_the_tag__with_items_and_the_tag(
     assert facade.get_actionable_items_with_the_tag(tag_1) == [undone_item_1]
 
 
+@pytest.fixture
+def tagged_items(db_session, tag_1, tag_2):
+    items = [
+        facade.create_item(schemas.ItemCreate(name=f'Item {index}'))
+        for index in range(5)
+    ]
+
+    for item in items:
+        item.tags = [tag_1, tag_2]
+
+    db_session.commit()
+    db_session.expire_all()
+
+    return items
+
+
+@pytest.mark.parametrize(
+    'function_to_get_items',
+    [facade.get_item_list, facade.get_actionable_items],
+)
+def test_showing_a_list_of_items__constant_queries(
+    count_queries, tagged_items, function_to_get_items
+):
+    with count_queries() as statements:
+        item_list = function_to_get_items()
+        for item in item_list:
+            facade.get_item_text_to_show(item)
+
+    assert item_list and len(statements) == 2
+
+
+def test_get_actionable_items_with_the_tag__constant_queries(
+    db_session, count_queries, tagged_items, tag_1
+):
+    db_session.refresh(tag_1)
+
+    with count_queries() as statements:
+        item_list = facade.get_actionable_items_with_the_tag(tag_1)
+        for item in item_list:
+            facade.get_item_text_to_show(item, context=tag_1)
+
+    assert item_list and len(statements) == 2
+
+
+def test_get_inbox_items__constant_queries(
+    db_session, count_queries, tagged_items
+):
+    facade.create_item(schemas.ItemCreate(name='Untagged'))
+    db_session.expire_all()
+
+    with count_queries() as statements:
+        for item in facade.get_inbox_items():
+            facade.get_item_text_to_show(item)
+
+    assert len(statements) == 2
+
+
+def test_get_item_list__lazy_tags(count_queries, tagged_items):
+    with count_queries() as statements:
+        for item in facade.get_item_list(load_tags=None):
+            facade.get_item_text_to_show(item)
+
+    assert len(statements) == 1 + len(tagged_items)
+
+
+def test_decode_cursor__round_trip():
+    assert facade.decode_cursor(facade.encode_cursor(42)) == 42
+
+
+def test_decode_cursor__invalid():
+    with pytest.raises(ValueError):
+        facade.decode_cursor('not a cursor')
+
+
+def test_get_next_cursor__last_page(item_1):
+    assert facade.get_next_cursor([item_1], limit=2) is None
+
+
+def test_get_item_list__pages_with_cursor():
+    facade.create_items(schemas.ItemCreate(name=f'{i}') for i in range(5))
+
+    pages = []
+    cursor = None
+    while page := facade.get_item_list(cursor=cursor, limit=2):
+        pages.append([item.name for item in page])
+        cursor = facade.get_next_cursor(page, limit=2)
+        if not cursor:
+            break
+
+    assert pages == [['0', '1'], ['2', '3'], ['4']]
+
+
+def test_get_actionable_items__keyset_query(count_queries, item_1):
+    cursor = facade.encode_cursor(item_1.id)
+
+    with count_queries() as statements:
+        facade.get_actionable_items(cursor=cursor, load_tags=None)
+
+    assert 'item.id > ?' in statements[0]
+    assert 'ORDER BY item.id' in statements[0]
+
+
+def test_get_tag_list__with_cursor(tag_1, tag_2):
+    cursor = facade.encode_cursor(tag_1.id)
+
+    assert facade.get_tag_list(cursor=cursor) == [tag_2]
+
+
+@pytest.fixture
+def items_to_search(db_session):
+    facade.create_items(
+        [
+            schemas.ItemCreate(name='Buy milk'),
+            schemas.ItemCreate(name='Call the bank', description='Milk money'),
+            schemas.ItemCreate(name='Write report'),
+            schemas.ItemCreate(
+                name='Milkshake recipe', status=schemas.ItemStatus.NOTE
+            ),
+        ]
+    )
+
+
+@pytest.mark.parametrize(
+    'search_function',
+    [
+        facade.search_items,
+        facade.search_items_with_fts,
+        facade.search_items_with_like,
+    ],
+)
+def test_search_items__name_and_description(items_to_search, search_function):
+    result = search_function('milk')
+
+    assert {item.name for item in result} == {
+        'Buy milk',
+        'Call the bank',
+        'Milkshake recipe',
+    }
+
+
+@pytest.mark.parametrize(
+    'search_function',
+    [facade.search_items_with_fts, facade.search_items_with_like],
+)
+def test_search_items__all_terms_must_match(items_to_search, search_function):
+    result = search_function('bank MILK')
+
+    assert [item.name for item in result] == ['Call the bank']
+
+
+def test_search_items__prefix(items_to_search):
+    assert [item.name for item in facade.search_items('rep')] == [
+        'Write report'
+    ]
+
+
+def test_search_items__with_status(items_to_search):
+    result = facade.search_items('milk', statuses=[schemas.ItemStatus.NOTE])
+
+    assert [item.name for item in result] == ['Milkshake recipe']
+
+
+def test_search_items__ranked(items_to_search):
+    facade.create_item(schemas.ItemCreate(name='Milk, milk and more milk'))
+
+    assert facade.search_items('milk')[0].name == 'Milk, milk and more milk'
+
+
+def test_search_items__empty_query(items_to_search):
+    assert facade.search_items(' "* ') == []
+
+
+def test_search_items__after_editing_an_item(db_session, item_1):
+    item_1.name = 'Renamed item'
+    db_session.commit()
+
+    assert facade.search_items('renamed') == [item_1]
+    assert facade.search_items('something') == []
+
+
+def test_search_items__after_deleting_an_item(db_session, item_1):
+    db_session.delete(item_1)
+    db_session.commit()
+
+    assert facade.search_items('something') == []
+
+
 def test_get_item(item_1):
     assert facade.get_item(item_id=item_1.id) == item_1
 
@@ -84,6 +271,43 @@ def test_create_item():
     assert facade.create_item(item=item).id
 
 
+def test_create_items():
+    items = [schemas.ItemCreate(name=f'Item {i}') for i in range(5)]
+
+    assert facade.create_items(items) == 5
+
+
+def test_create_items__in_more_than_one_chunk():
+    items = (schemas.ItemCreate(name=f'Item {i}') for i in range(5))
+
+    facade.create_items(items, chunk_size=2)
+
+    item_list = facade.get_item_list()
+
+    assert len({item.id for item in item_list}) == 5
+
+
+def test_create_items__after_an_existent_item(item_1):
+    facade.create_items([schemas.ItemCreate(name='Something else')])
+
+    assert len(facade.get_item_list()) == 2
+
+
+def test_create_items__keeps_status_and_description():
+    item = schemas.ItemCreate(
+        name='Note', description='Text', status=schemas.ItemStatus.NOTE
+    )
+
+    facade.create_items([item])
+
+    result = facade.get_item_list()[0]
+
+    assert (result.description, result.status) == (
+        'Text',
+        schemas.ItemStatus.NOTE,
+    )
+
+
 @pytest.mark.parametrize('status', [*schemas.ItemStatus])
 def test_set_item_status(item_1, status):
     facade.set_item_status(item=item_1, status=status)
@@ -127,6 +351,61 @@ def test_create_tag():
     assert facade.create_tag(tag=tag).id
 
 
+def test_get_tags(tag_1, tag_2):
+    assert facade.get_tags([tag_2.id, tag_1.id]) == [tag_2, tag_1]
+
+
+def test_get_tags__ignores_unknown_ids(tag_1):
+    assert facade.get_tags([tag_1.id, tag_1.id + 1000]) == [tag_1]
+
+
+def test_get_tag_registry__loaded_once(count_queries, tag_1):
+    facade.get_tag_registry()
+
+    with count_queries() as statements:
+        facade.get_tag_registry()
+
+    assert not statements
+
+
+def test_get_tag_registry__children(parent_tag_1, child_tag_1_of_parent_tag_1):
+    children = facade.get_tag_registry().get_children(parent_tag_1.id)
+
+    assert [tag.id for tag in children] == [child_tag_1_of_parent_tag_1.id]
+
+
+def test_get_tag_registry__invalidated_by_create_tag(tag_1):
+    facade.get_tag_registry()
+
+    tag_2 = facade.create_tag(schemas.TagCreate(name='Another tag'))
+
+    assert facade.get_tag_registry().get(tag_2.id)
+
+
+def test_edit_item__keeps_the_tags(item_1, tag_1):
+    facade.assign_tag([item_1.id], tag_1)
+
+    facade.edit_item(item_1, schemas.ItemCreate(name='Renamed'))
+
+    assert facade.get_item(item_1.id).tags == [tag_1]
+
+
+def test_edit_tag(tag_1):
+    facade.get_tag_registry()
+
+    facade.edit_tag(tag_1, schemas.TagCreate(name='New name'))
+
+    assert facade.get_tag_registry().get(tag_1.id).name == 'New name'
+
+
+def test_edit_tag__keeps_items(item_1, tag_1):
+    item_1.tags = [tag_1]
+
+    facade.edit_tag(tag_1, schemas.TagCreate(name='New name'))
+
+    assert tag_1.items == [item_1]
+
+
 def test_get_tag_by_name__case_insensitive(tag_1):
     tag_1.name = 'Next Actions'
 
@@ -249,6 +528,75 @@ def test_get_tag_text_to_show__item_with_one_tag_and_context(
     assert result == expected
 
 
+def test_get_tag_text_to_show__constant_queries(
+    db_session, count_queries, parent_tag_1, child_tag_1_of_parent_tag_1
+):
+    db_session.expire_all()
+
+    with count_queries() as statements:
+        for tag in facade.get_tag_list():
+            facade.get_tag_text_to_show(tag)
+
+    assert len(statements) == 2
+
+
+def test_get_tag_text_to_show__all_the_ancestors(
+    parent_tag_1, grandchild_tag_of_parent_tag_1
+):
+    assert facade.get_tag_text_to_show(grandchild_tag_of_parent_tag_1) == (
+        'Grandchild @Parent_tag_1/Child_1_of_Parent_tag_1'
+    )
+
+
+def test_get_tag_text_to_show__ancestors_below_the_context(
+    parent_tag_1, grandchild_tag_of_parent_tag_1
+):
+    result = facade.get_tag_text_to_show(
+        grandchild_tag_of_parent_tag_1, context=parent_tag_1
+    )
+
+    assert result == 'Grandchild @Child_1_of_Parent_tag_1'
+
+
+def test_get_tag_ancestors(
+    parent_tag_1, child_tag_1_of_parent_tag_1, grandchild_tag_of_parent_tag_1
+):
+    assert facade.get_tag_ancestors(grandchild_tag_of_parent_tag_1.id) == [
+        parent_tag_1,
+        child_tag_1_of_parent_tag_1,
+    ]
+
+
+def test_get_tag_descendants(
+    parent_tag_1,
+    child_tag_1_of_parent_tag_1,
+    child_tag_2_of_parent_tag_1,
+    grandchild_tag_of_parent_tag_1,
+):
+    assert facade.get_tag_descendants(parent_tag_1.id) == [
+        child_tag_1_of_parent_tag_1,
+        child_tag_2_of_parent_tag_1,
+        grandchild_tag_of_parent_tag_1,
+    ]
+
+
+def test_edit_tag__moves_the_descendants(
+    tag_1, child_tag_1_of_parent_tag_1, grandchild_tag_of_parent_tag_1
+):
+    facade.edit_tag(
+        child_tag_1_of_parent_tag_1,
+        schemas.TagCreate(name='Moved', parent_id=tag_1.id),
+    )
+
+    assert facade.get_tag_descendants(tag_1.id) == [
+        child_tag_1_of_parent_tag_1,
+        grandchild_tag_of_parent_tag_1,
+    ]
+    assert facade.get_tag_text_to_show(grandchild_tag_of_parent_tag_1) == (
+        'Grandchild @Tag_name/Moved'
+    )
+
+
 def test_get_list_of_tags_with_actionable_items__with_a_done_item(
     done_item_1, tag_1
 ):
@@ -263,3 +611,203 @@ def test_get_list_of_tags_with_actionable_items__with_an_undone_item(
     undone_item_1.tags = [tag_1]
 
     assert facade.get_list_of_tags_with_actionable_items() == [tag_1]
+
+
+def test_get_view_summary__counts(
+    db_session, item_1, done_item_1, undone_item_1, tag_1, tag_2
+):
+    item_1.tags = [tag_1, tag_2]
+    done_item_1.tags = [tag_1]
+    db_session.commit()
+
+    assert facade.get_view_summary() == facade.ViewSummary(
+        inbox=1,
+        actionable=2,
+        tags=[
+            facade.TagCount(tag_1.id, tag_1.name, 1),
+            facade.TagCount(tag_2.id, tag_2.name, 1),
+        ],
+    )
+
+
+def test_get_view_summary__trees(
+    item_1,
+    undone_item_1,
+    parent_tag_1,
+    child_tag_1_of_parent_tag_1,
+    grandchild_tag_of_parent_tag_1,
+):
+    facade.assign_tag([item_1.id], parent_tag_1)
+    facade.assign_tag(
+        [item_1.id, undone_item_1.id], child_tag_1_of_parent_tag_1
+    )
+    facade.assign_tag([undone_item_1.id], grandchild_tag_of_parent_tag_1)
+
+    assert facade.get_view_summary().trees == [
+        facade.TagCount(parent_tag_1.id, parent_tag_1.name, 2),
+        facade.TagCount(
+            child_tag_1_of_parent_tag_1.id, child_tag_1_of_parent_tag_1.name, 2
+        ),
+    ]
+
+
+def test_get_view_summary__tree_of_a_new_child(item_1, parent_tag_1):
+    facade.assign_tag([item_1.id], parent_tag_1)
+    facade.get_view_summary()
+
+    facade.create_tag(
+        schemas.TagCreate(name='Child', parent_id=parent_tag_1.id)
+    )
+
+    assert facade.get_view_summary().trees == [
+        facade.TagCount(parent_tag_1.id, parent_tag_1.name, 1)
+    ]
+
+
+def test_get_actionable_items_under_the_tag(
+    item_1,
+    done_item_1,
+    undone_item_1,
+    tag_1,
+    parent_tag_1,
+    child_tag_1_of_parent_tag_1,
+    grandchild_tag_of_parent_tag_1,
+):
+    facade.assign_tag([item_1.id], child_tag_1_of_parent_tag_1)
+    facade.assign_tag([item_1.id], grandchild_tag_of_parent_tag_1)
+    facade.assign_tag([done_item_1.id], child_tag_1_of_parent_tag_1)
+    facade.assign_tag([undone_item_1.id], tag_1)
+
+    assert facade.get_actionable_items_under_the_tag(parent_tag_1) == [item_1]
+
+
+def test_get_actionable_items_under_the_tag__pages(
+    parent_tag_1, child_tag_1_of_parent_tag_1, grandchild_tag_of_parent_tag_1
+):
+    facade.create_items(
+        schemas.ItemCreate(name=f'Item {index}') for index in range(5)
+    )
+    item_ids = [item.id for item in facade.get_item_list()]
+    facade.assign_tag(item_ids[:3], child_tag_1_of_parent_tag_1)
+    facade.assign_tag(item_ids[2:], grandchild_tag_of_parent_tag_1)
+
+    items = facade.get_all_pages(
+        facade.get_actionable_items_under_the_tag, parent_tag_1, limit=2
+    )
+
+    assert [item.id for item in items] == item_ids
+
+
+def test_get_view_summary__one_query_until_the_next_write(
+    count_queries, item_1
+):
+    with count_queries() as statements:
+        facade.get_view_summary()
+        facade.get_view_summary()
+
+    assert len(statements) == 1
+
+    facade.set_item_status(item_1, schemas.ItemStatus.DONE)
+
+    assert facade.get_view_summary().actionable == 0
+
+
+def test_set_items_status(item_1, undone_item_1, count_queries):
+    item_ids = [item_1.id, undone_item_1.id]
+
+    with count_queries() as statements:
+        total = facade.set_items_status(item_ids, schemas.ItemStatus.DONE)
+
+    assert total == 2
+    assert [statement.split()[0] for statement in statements] == ['UPDATE']
+    assert item_1.status == undone_item_1.status == schemas.ItemStatus.DONE
+
+
+def test_set_item_tags(item_1, tag_1, tag_2):
+    item_1.tags = [tag_1]
+
+    assert facade.set_item_tags(item_1.id, [tag_2.id]) == 2
+    assert item_1.tags == [tag_2]
+    assert tag_1.items == []
+
+
+def test_set_item_tags__one_tag_per_group(
+    item_1, tag_1, child_tag_1_of_parent_tag_1, child_tag_2_of_parent_tag_1
+):
+    facade.set_item_tags(
+        item_1.id,
+        [
+            child_tag_1_of_parent_tag_1.id,
+            tag_1.id,
+            child_tag_2_of_parent_tag_1.id,
+        ],
+    )
+
+    assert sorted(tag.id for tag in item_1.tags) == sorted(
+        [tag_1.id, child_tag_2_of_parent_tag_1.id]
+    )
+
+
+def test_set_item_tags__writes_only_the_changes(
+    db_session, count_queries, item_1, tag_1, tag_2
+):
+    item_1.tags = [tag_1]
+    db_session.commit()
+
+    with count_queries() as statements:
+        facade.set_item_tags(item_1.id, [tag_1.id, tag_2.id, 0])
+
+    writes = [
+        statement
+        for statement in statements
+        if statement.startswith(('INSERT', 'DELETE'))
+    ]
+    assert writes == ['INSERT INTO item_tag (item_id, tag_id) VALUES (?, ?)']
+
+
+def test_set_item_tags__unchanged(item_1, tag_1):
+    facade.set_item_tags(item_1.id, [tag_1.id])
+
+    assert facade.set_item_tags(item_1.id, [tag_1.id]) == 0
+
+
+def test_assign_tag(item_1, undone_item_1, tag_1):
+    item_1.tags = [tag_1]
+
+    assert facade.assign_tag([item_1.id, undone_item_1.id], tag_1) == 1
+    assert undone_item_1.tags == [tag_1]
+    assert item_1.tags == [tag_1]
+
+
+def test_assign_tag__replaces_the_tag_of_the_same_group(
+    item_1, tag_1, child_tag_1_of_parent_tag_1, child_tag_2_of_parent_tag_1
+):
+    item_1.tags = [tag_1, child_tag_1_of_parent_tag_1]
+
+    facade.assign_tag([item_1.id], child_tag_2_of_parent_tag_1)
+
+    assert item_1.tags == [tag_1, child_tag_2_of_parent_tag_1]
+
+
+def test_iterate_items__filters(item_1, done_item_1, undone_item_1, tag_1):
+    undone_item_1.tags = [tag_1]
+
+    items = facade.iterate_items(
+        statuses=[schemas.ItemStatus.UNDONE], inbox=True
+    )
+
+    assert list(items) == [item_1]
+
+
+def test_iterate_items__releases_the_items(db_session):
+    facade.create_items(
+        schemas.ItemCreate(name=f'Item {index}') for index in range(50)
+    )
+    db_session.expunge_all()
+    sizes = []
+
+    for _ in facade.iterate_items(batch_size=10):
+        sizes.append(len(db_session.identity_map))
+
+    assert len(sizes) == 50
+    assert max(sizes) <= 10
@@ -0,0 +1,336 @@
+import asyncio
+import io
+
+import facade
+import facade_async
+import pytest
+import schemas
+from conftest import SQLALCHEMY_DATABASE_URL
+
+
+@pytest.fixture(autouse=True)
+def async_session(db_session):
+    session_factory = facade_async.create_session_factory(
+        facade_async.get_async_url(SQLALCHEMY_DATABASE_URL)
+    )
+    facade_async.async_session = session_factory
+    facade_async.invalidate_tag_registry()
+    facade_async.invalidate_view_summary()
+
+    yield session_factory
+
+    asyncio.run(session_factory.kw['bind'].dispose())
+
+
+@pytest.fixture
+def items(db_session, tag_1, done_item_1):
+    facade.create_items(
+        [schemas.ItemCreate(name='First'), schemas.ItemCreate(name='Second')]
+    )
+    first, second = facade.get_actionable_items()
+    facade.assign_tag([second.id], tag_1)
+
+    return first, second
+
+
+def test_get_async_url():
+    assert facade_async.get_async_url('sqlite:////tmp/db.sqlite3') == (
+        'sqlite+aiosqlite:////tmp/db.sqlite3'
+    )
+
+
+def test_get_async_url__needs_a_setting_for_other_databases():
+    with pytest.raises(ValueError, match='ASYNC_DATABASE_URL'):
+        facade_async.get_async_url('postgresql://localhost/lists')
+
+
+def test_get_session_factory__created_on_first_use(monkeypatch, items):
+    monkeypatch.setattr(facade_async, 'async_session', None)
+    monkeypatch.setattr(
+        facade_async.database,
+        'SQLALCHEMY_DATABASE_URL',
+        SQLALCHEMY_DATABASE_URL,
+    )
+
+    result = asyncio.run(facade_async.get_item_list())
+
+    assert len(result) == 3
+    asyncio.run(facade_async.async_session.kw['bind'].dispose())
+
+
+def test_get_item_list(items):
+    result = asyncio.run(facade_async.get_item_list())
+
+    assert [item.name for item in result] == ['Something', 'First', 'Second']
+
+
+def test_get_actionable_items__rendered_with_their_tags(items):
+    result = asyncio.run(facade_async.get_actionable_items())
+
+    assert [facade_async.get_item_text_to_show(item) for item in result] == [
+        'First',
+        'Second @Tag_name',
+    ]
+
+
+def test_get_inbox_items(items):
+    result = asyncio.run(facade_async.get_inbox_items())
+
+    assert [item.id for item in result] == [items[0].id]
+
+
+def test_get_actionable_items_with_the_tag(items, tag_1):
+    result = asyncio.run(facade_async.get_actionable_items_with_the_tag(tag_1))
+
+    assert [item.id for item in result] == [items[1].id]
+
+
+def test_get_all_pages(items):
+    result = asyncio.run(
+        facade_async.get_all_pages(facade_async.get_item_list, limit=2)
+    )
+
+    assert len(result) == 3
+
+
+def test_iterate_items(items):
+    async def collect():
+        return [
+            item.name
+            async for item in facade_async.iterate_items(
+                statuses=[schemas.ItemStatus.UNDONE], batch_size=1
+            )
+        ]
+
+    assert asyncio.run(collect()) == ['First', 'Second']
+
+
+def test_search_items(items):
+    result = asyncio.run(facade_async.search_items('sec'))
+
+    assert [item.name for item in result] == ['Second']
+
+
+def test_get_view_summary(items, tag_1):
+    assert asyncio.run(facade_async.get_view_summary()) == (
+        facade.ViewSummary(
+            inbox=1,
+            actionable=2,
+            tags=[facade.TagCount(tag_1.id, 'Tag name', 1)],
+        )
+    )
+
+
+def test_items_under_the_tag(
+    items, parent_tag_1, grandchild_tag_of_parent_tag_1
+):
+    facade.assign_tag([items[0].id], grandchild_tag_of_parent_tag_1)
+
+    async def read():
+        return (
+            await facade_async.get_actionable_items_under_the_tag(
+                parent_tag_1
+            ),
+            await facade_async.get_view_summary(),
+        )
+
+    result, summary = asyncio.run(read())
+
+    assert [item.id for item in result] == [items[0].id]
+    assert [tree.count for tree in summary.trees] == [1, 1]
+
+
+def test_concurrent_readers(items):
+    async def read_all():
+        return await asyncio.gather(
+            *(facade_async.get_actionable_items() for _ in range(20))
+        )
+
+    pages = asyncio.run(read_all())
+
+    assert {len(page) for page in pages} == {2}
+
+
+def test_create_item__concurrent_writers():
+    async def create_all():
+        return await asyncio.gather(
+            *(
+                facade_async.create_item(schemas.ItemCreate(name=f'Item {n}'))
+                for n in range(20)
+            )
+        )
+
+    items = asyncio.run(create_all())
+
+    assert len({item.id for item in items}) == 20
+    assert len(facade.get_item_list()) == 20
+
+
+def test_create_items():
+    total = asyncio.run(
+        facade_async.create_items(
+            (schemas.ItemCreate(name=f'Item {n}') for n in range(5)),
+            chunk_size=2,
+        )
+    )
+
+    assert total == 5
+    assert [item.name for item in facade.get_item_list()][-1] == 'Item 4'
+
+
+def test_set_item_status(item_1):
+    item = asyncio.run(facade_async.get_item(item_1.id))
+
+    asyncio.run(facade_async.set_item_status(item, schemas.ItemStatus.DONE))
+
+    assert item.status == schemas.ItemStatus.DONE
+    assert facade.get_actionable_items() == []
+
+
+def test_edit_item__keeps_the_tags(item_1, tag_1):
+    facade.assign_tag([item_1.id], tag_1)
+    item = asyncio.run(facade_async.get_item(item_1.id))
+
+    asyncio.run(
+        facade_async.edit_item(item, schemas.ItemCreate(name='Renamed'))
+    )
+
+    item = asyncio.run(facade_async.get_item(item_1.id))
+    assert item.name == 'Renamed'
+    assert [tag.name for tag in item.tags] == [tag_1.name]
+
+
+def test_assign_tag__replaces_siblings(
+    item_1, child_tag_1_of_parent_tag_1, child_tag_2_of_parent_tag_1
+):
+    facade.assign_tag([item_1.id], child_tag_1_of_parent_tag_1)
+
+    asyncio.run(
+        facade_async.assign_tag([item_1.id], child_tag_2_of_parent_tag_1)
+    )
+
+    item = asyncio.run(facade_async.get_item(item_1.id))
+    assert [tag.name for tag in item.tags] == ['Child 2 of Parent tag 1']
+
+
+def test_set_item_tags(
+    item_1, tag_1, child_tag_1_of_parent_tag_1, child_tag_2_of_parent_tag_1
+):
+    facade.assign_tag([item_1.id], child_tag_1_of_parent_tag_1)
+
+    count = asyncio.run(
+        facade_async.set_item_tags(
+            item_1.id, [tag_1.id, child_tag_2_of_parent_tag_1.id]
+        )
+    )
+
+    item = asyncio.run(facade_async.get_item(item_1.id))
+    assert count == 3
+    assert sorted(tag.id for tag in item.tags) == sorted(
+        [tag_1.id, child_tag_2_of_parent_tag_1.id]
+    )
+
+
+def test_writes_keep_the_counters(view_counters, items, tag_1):
+    facade.rebuild_view_counters()
+
+    async def write():
+        await facade_async.create_item(schemas.ItemCreate(name='Third'))
+        await facade_async.assign_tag([items[0].id], tag_1)
+        await facade_async.set_item_tags(items[1].id, [])
+        await facade_async.set_items_status(
+            [items[1].id], schemas.ItemStatus.DONE
+        )
+
+        return await facade_async.check_view_counters()
+
+    assert asyncio.run(write()) == []
+    assert facade.check_view_counters() == []
+
+
+def test_tags(parent_tag_1):
+    async def create_and_edit():
+        tag = await facade_async.create_tag(schemas.TagCreate(name='Child'))
+        await facade_async.edit_tag(
+            tag, schemas.TagCreate(name='Child', parent_id=parent_tag_1.id)
+        )
+        tag = await facade_async.get_tag_by_name('child')
+
+        return tag, await facade_async.get_tag_text_to_show(tag)
+
+    tag, text = asyncio.run(create_and_edit())
+
+    assert tag.parent_id == parent_tag_1.id
+    assert text == 'Child @Parent_tag_1'
+
+
+def test_create_tag__tree_of_a_new_child(items, tag_1):
+    async def create_child():
+        await facade_async.get_view_summary()
+        await facade_async.create_tag(
+            schemas.TagCreate(name='Child', parent_id=tag_1.id)
+        )
+
+        return await facade_async.get_view_summary()
+
+    summary = asyncio.run(create_child())
+
+    assert summary.trees == [facade.TagCount(tag_1.id, 'Tag name', 1)]
+
+
+def test_tag_ancestry(parent_tag_1, grandchild_tag_of_parent_tag_1):
+    async def get_ancestry():
+        return (
+            await facade_async.get_tag_ancestors(
+                grandchild_tag_of_parent_tag_1.id
+            ),
+            await facade_async.get_tag_descendants(parent_tag_1.id),
+            await facade_async.get_tag_text_to_show(
+                grandchild_tag_of_parent_tag_1, context=parent_tag_1
+            ),
+        )
+
+    ancestors, descendants, text = asyncio.run(get_ancestry())
+
+    assert [tag.name for tag in ancestors] == [
+        'Parent tag 1',
+        'Child 1 of Parent tag 1',
+    ]
+    assert len(descendants) == 2
+    assert text == 'Grandchild @Child_1_of_Parent_tag_1'
+
+
+def test_tag_lists(items, tag_1, parent_tag_1, child_tag_1_of_parent_tag_1):
+    async def get_ids(function) -> [int]:
+        return [tag.id for tag in await function()]
+
+    async def get_all_ids():
+        return await asyncio.gather(
+            get_ids(facade_async.get_tag_list),
+            get_ids(facade_async.get_list_of_tags_with_items),
+            get_ids(facade_async.get_list_of_tags_with_actionable_items),
+            get_ids(facade_async.get_actionable_tag_list),
+            get_ids(facade_async.get_tag_list_without_parent),
+        )
+
+    child_id = child_tag_1_of_parent_tag_1.id
+    assert asyncio.run(get_all_ids()) == [
+        [tag_1.id, parent_tag_1.id, child_id],
+        [tag_1.id],
+        [tag_1.id],
+        [tag_1.id, child_id],
+        [tag_1.id, parent_tag_1.id],
+    ]
+
+
+def test_snapshot_round_trip(items):
+    async def round_trip():
+        output = io.BytesIO()
+        await facade_async.export_snapshot(output)
+
+        return await facade_async.import_snapshot(
+            io.BytesIO(output.getvalue())
+        )
+
+    assert asyncio.run(round_trip()) == (0, 3)
+    assert len(facade.get_item_list()) == 6
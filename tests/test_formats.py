@@ -0,0 +1,70 @@
+import io
+import json
+
+import formats
+import models
+import pytest
+import schemas
+
+
+@pytest.fixture
+def items() -> [models.Item]:
+    return [
+        models.Item(
+            id=1,
+            name='First',
+            description='Two\nlines',
+            status=schemas.ItemStatus.UNDONE,
+            tags=[
+                models.Tag(id=1, name='Next'),
+                models.Tag(id=2, name='Work'),
+            ],
+        ),
+        models.Item(
+            id=2, name='Second, with a comma', status=schemas.ItemStatus.DONE
+        ),
+    ]
+
+
+def write(output_format: str, items: [models.Item]) -> str:
+    output = io.StringIO()
+    formats.WRITERS[output_format](iter(items), output)
+
+    return output.getvalue()
+
+
+def test_write_plain(items):
+    assert write('plain', items) == (
+        'First @Next @Work\nSecond, with a comma\n'
+    )
+
+
+def test_write_json(items):
+    assert json.loads(write('json', items))[1] == {
+        'id': 2,
+        'name': 'Second, with a comma',
+        'description': None,
+        'status': 'done',
+        'tags': [],
+    }
+
+
+def test_write_json__no_items():
+    assert json.loads(write('json', [])) == []
+
+
+def test_write_ndjson(items):
+    lines = write('ndjson', items).splitlines()
+
+    assert [json.loads(line)['tags'] for line in lines] == [
+        ['Next', 'Work'],
+        [],
+    ]
+
+
+def test_write_csv(items):
+    assert write('csv', items) == (
+        'id,name,description,status,tags\n'
+        '1,First,"Two\nlines",undone,Next;Work\n'
+        '2,"Second, with a comma",,done,\n'
+    )
@@ -0,0 +1,81 @@
+import asyncio
+from unittest.mock import patch
+
+import pytest
+from filter_prompt import FilterPrompt
+from fuzzy_filter import FuzzyIndex
+from InquirerPy.base.control import Choice
+
+TEXTS = [
+    'Buy milk @Next',
+    'Call Bob',
+    'Buy bread @Someday',
+    'Book a table at the Bistro',
+]
+
+
+@pytest.fixture
+def index():
+    return FuzzyIndex(TEXTS)
+
+
+def filter_texts(query: str) -> [int]:
+    terms = query.lower().split()
+
+    return [
+        position
+        for position, text in enumerate(TEXTS)
+        if all(term in text.lower() for term in terms)
+    ]
+
+
+def test_filter__empty_query(index):
+    assert index.filter('  ') == [0, 1, 2, 3]
+
+
+def test_filter__ignores_case(index):
+    assert index.filter('BOB') == [1]
+
+
+def test_filter__every_word_has_to_match(index):
+    assert index.filter('buy @next') == [0]
+
+
+def test_filter__no_matches(index):
+    assert index.filter('xyz') == []
+
+
+def test_filter__typing_and_deleting(index):
+    queries = ['b', 'bu', 'buy', 'buy ', 'buy b', 'buy', 'bo', 'bi', 'b']
+
+    for query in queries:
+        assert index.filter(query) == filter_texts(query)
+
+
+def test_filter__only_rechecks_previous_matches(index):
+    index.filter('bo')
+    index.texts[0] = 'bob'
+
+    assert index.filter('bob') == [1]
+
+
+def test_filter__retyping_keeps_one_entry_per_query(index):
+    for _ in range(5):
+        index.filter('b')
+        index.filter('bu')
+
+    assert [query for (query, _) in index._matches_by_query] == ['b', 'bu']
+
+
+def test_filter_prompt__filters_with_the_index():
+    prompt = FilterPrompt(
+        message='Filter:',
+        choices=[
+            Choice(position, name=text) for position, text in enumerate(TEXTS)
+        ],
+    )
+
+    with patch.object(prompt, '_get_current_text', return_value='buy'):
+        choices = asyncio.run(prompt.content_control._filter_choices(0.0))
+
+    assert [choice['value'] for choice in choices] == [0, 2]
@@ -0,0 +1,100 @@
+import io
+import json
+
+import facade
+import instrumentation
+import main
+import pytest
+from click.testing import CliRunner
+
+
+@pytest.fixture
+def profiler(db_session):
+    profiler = instrumentation.QueryProfiler()
+    profiler.start(db_session.get_bind())
+
+    yield profiler
+
+    profiler.stop()
+
+
+def test_query_profiler__counts_by_facade_function(profiler, item_1):
+    facade.get_item_list(load_tags=None)
+    facade.get_item_list(load_tags=None)
+
+    assert profiler.count_by_caller['facade.get_item_list'] == 2
+    assert profiler.time_by_caller['facade.get_item_list'] > 0
+
+
+def test_query_profiler__caller_outside_the_facade(profiler, item_1):
+    items = facade.get_item_list(load_tags=None)
+    profiler.count_by_caller.clear()
+
+    assert items[0].tags == []
+    assert list(profiler.count_by_caller) == [
+        f'{__name__}.test_query_profiler__caller_outside_the_facade'
+    ]
+
+
+def test_query_profiler__repeated_statements(profiler, item_1, tag_1):
+    for _ in range(3):
+        facade.get_tag(tag_1.id + 1)
+
+    statement, count = profiler.count_by_statement.most_common(1)[0]
+    assert count == 3
+    assert statement.startswith('SELECT tag.id')
+
+
+def test_query_profiler__slow_statements(db_session):
+    profiler = instrumentation.QueryProfiler(slow_threshold_ms=0)
+    profiler.start(db_session.get_bind())
+
+    for _ in range(instrumentation.SUMMARY_SIZE + 5):
+        facade.get_item_list()
+    profiler.stop()
+
+    assert len(profiler.slow_statements) == instrumentation.SUMMARY_SIZE
+    assert 'Over 0 ms:' in profiler.format_summary()
+
+
+def test_query_profiler__trace(db_session):
+    trace = io.StringIO()
+    profiler = instrumentation.QueryProfiler(trace=trace)
+    profiler.start(db_session.get_bind())
+
+    facade.get_item_list()
+    profiler.stop()
+    facade.get_item_list()
+
+    lines = [json.loads(line) for line in trace.getvalue().splitlines()]
+    assert [line['caller'] for line in lines] == ['facade.get_item_list']
+    assert lines[0]['statement'].startswith('SELECT item.id')
+
+
+def test_query_profiler__summary(item_1, profiler):
+    facade.get_item_list(load_tags=None)
+
+    summary = profiler.format_summary().splitlines()
+
+    assert summary[0].startswith('1 SQL statements in')
+    assert summary[2].endswith('facade.get_item_list')
+
+
+def test_cli__profile():
+    runner = CliRunner(mix_stderr=False)
+
+    result = runner.invoke(main.cli, ['--profile', 'list', '--format', 'json'])
+
+    assert json.loads(result.stdout) == []
+    assert 'facade.iterate_items' in result.stderr
+
+
+def test_cli__trace_file(runner, monkeypatch, tmp_path):
+    path = tmp_path / 'trace.ndjson'
+    monkeypatch.setattr(instrumentation, 'SQL_TRACE_FILE', str(path))
+
+    runner.invoke(main.cli, ['search', 'something'])
+
+    assert json.loads(path.read_text())['caller'] == (
+        'facade.search_items_with_fts'
+    )
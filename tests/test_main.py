@@ -1,9 +1,14 @@
+import gc
+import json
+import sys
 from unittest.mock import Mock, patch
 
+import allocator
 import facade
 import main
 import pytest
 import schemas
+import write_behind
 from InquirerPy.base.control import Choice, Separator
 
 
@@ -20,12 +25,144 @@ def test_list_command__exists(mock, runner):
     assert mock.call_count
 
 
+def test_list_command__json(runner, item_1, done_item_1, tag_1):
+    item_1.tags = [tag_1]
+
+    result = runner.invoke(main.list_command, ['--format', 'json'])
+
+    assert json.loads(result.output) == [
+        {
+            'id': item_1.id,
+            'name': 'Something',
+            'description': None,
+            'status': 'undone',
+            'tags': ['Tag name'],
+        }
+    ]
+
+
+def test_list_command__status_filter(runner, item_1, done_item_1):
+    result = runner.invoke(
+        main.list_command, ['--format', 'ndjson', '--status', 'done']
+    )
+
+    assert [json.loads(line)['id'] for line in result.output.splitlines()] == [
+        done_item_1.id
+    ]
+
+
+def test_list_command__tag_filter(runner, item_1, undone_item_1, tag_1):
+    undone_item_1.tags = [tag_1]
+
+    result = runner.invoke(
+        main.list_command, ['--format', 'plain', '--tag', 'tag name']
+    )
+
+    assert result.output == 'Something @Tag_name\n'
+
+
+def test_list_command__unknown_tag(runner):
+    result = runner.invoke(
+        main.list_command, ['--format', 'csv', '--tag', 'Nothing']
+    )
+
+    assert 'There is no tag named Nothing' in result.output
+
+
+def test_list_command__inbox_filter(runner, item_1, undone_item_1, tag_1):
+    undone_item_1.tags = [tag_1]
+
+    result = runner.invoke(main.list_command, ['--format', 'csv', '--inbox'])
+
+    assert result.output.splitlines()[1:] == [
+        f'{item_1.id},Something,,undone,'
+    ]
+
+
+def test_list_command__filters_are_not_interactive(runner):
+    result = runner.invoke(main.list_command, ['--inbox'])
+
+    assert result.exit_code == 2
+
+
 def test_add_command(runner):
     result = runner.invoke(main.add_command, ['A task'])
 
     assert result.exit_code == 0
 
 
+def test_add_command__consecutive_ids(runner):
+    for name in ['First', 'Second']:
+        # Every run is a process of its own.
+        allocator.forget_reserved_ids()
+        runner.invoke(main.add_command, [name])
+
+    first, second = facade.get_item_list()
+
+    assert second.id == first.id + 1
+
+
+def test_import_command__text(runner):
+    result = runner.invoke(main.import_command, input='First\n\nSecond\n')
+
+    assert '2 items imported' in result.output
+
+
+def test_import_command__jsonl(runner):
+    lines = '{"name": "First", "description": "Text"}\n{"name": "Second"}\n'
+
+    runner.invoke(main.import_command, ['--format', 'jsonl'], input=lines)
+
+    assert [item.name for item in facade.get_item_list()] == [
+        'First',
+        'Second',
+    ]
+
+
+def test_import_command__invalid_line(runner):
+    lines = '{"name": "First"}\n{"name": ""}\n{"name": "Third"}\n'
+
+    result = runner.invoke(
+        main.import_command,
+        ['--format', 'jsonl', '--chunk-size', '1'],
+        input=lines,
+    )
+
+    assert result.exit_code == 1
+    assert result.output == (
+        'Error: Line 2: Name cannot be empty. '
+        '1 items were imported before it.\n'
+    )
+
+
+def test_export_and_import_snapshot_commands(runner, tmp_path, item_1):
+    path = str(tmp_path / 'lists.ndjson.gz')
+
+    exported = runner.invoke(main.export_command, [path])
+    imported = runner.invoke(main.import_snapshot_command, [path])
+
+    assert exported.exit_code == 0
+    assert imported.output == '0 tags and 1 items imported.\n'
+    assert [item.name for item in facade.get_item_list()] == [
+        'Something',
+        'Something',
+    ]
+
+
+def test_import_snapshot_command__invalid_file(runner):
+    result = runner.invoke(main.import_snapshot_command, input=b'Not gzip')
+
+    assert 'not a complete snapshot' in result.output
+
+
+def test_search_command(runner, item_1, tag_1):
+    item_1.tags = [tag_1]
+
+    result = runner.invoke(main.search_command, ['some'])
+
+    assert result.output == 'Something @Tag_name\n'
+
+
 def test_show_items__no_items_message(capsys):
     main.show_items(lambda: [])
     out, _ = capsys.readouterr()
@@ -47,6 +184,106 @@ def test_show_items__with_items(mock, item_1):
     assert mock.call_count
 
 
+@patch('main.inquirer.select')
+def test_show_items__load_more_choice(mock, item_1):
+    with patch('facade.get_next_cursor', return_value='cursor'):
+        main.show_items(lambda: [item_1])
+
+    choices = mock.call_args.kwargs['choices']
+
+    assert main.LOAD_MORE in [choice.value for choice in choices]
+
+
+@patch('main.inquirer.select')
+def test_show_items__loading_more_items(mock, item_1, done_item_1):
+    function_to_get_items = Mock(side_effect=[[item_1], [done_item_1]])
+    mock.return_value.execute.side_effect = [[main.LOAD_MORE], None]
+
+    with patch('facade.get_next_cursor', side_effect=['cursor', None]):
+        main.show_items(function_to_get_items)
+
+    choices = mock.call_args.kwargs['choices']
+
+    assert [choice.value for choice in choices] == [
+        item_1.id,
+        done_item_1.id,
+        main.FILTER,
+        None,
+    ]
+
+
+@patch('main.inquirer.select')
+def test_show_items__several_items_selected(mock, item_1, done_item_1):
+    mock.return_value.execute.return_value = [item_1.id, done_item_1.id]
+
+    screen = main.show_items(facade.get_item_list)
+
+    assert screen == main.Screen(
+        main.show_options_of_the_items,
+        {'item_ids': [item_1.id, done_item_1.id]},
+    )
+
+
+@patch('main.inquirer.select')
+def test_show_items__one_item_selected_with_return(mock, item_1):
+    mock.return_value.execute.return_value = [item_1.id, None]
+
+    screen = main.show_items(facade.get_item_list)
+
+    assert screen == main.Screen(
+        main.show_item_options, {'item': item_1}, return_choice=item_1.id
+    )
+
+
+@patch('main.inquirer.select')
+def test_show_items__only_return_selected(mock, item_1):
+    mock.return_value.execute.return_value = [None]
+
+    with patch('facade.get_item') as get_item_mock:
+        assert main.show_items(facade.get_item_list) is None
+
+    assert not get_item_mock.call_count
+
+
+@patch('main.inquirer.select')
+def test_show_options_of_the_items__status(mock, item_1, undone_item_1):
+    mock.return_value.execute.return_value = schemas.ItemStatus.DONE
+
+    main.show_options_of_the_items([item_1.id, undone_item_1.id])
+
+    assert facade.get_actionable_items() == []
+
+
+@patch('main.inquirer.select')
+def test_show_options_of_the_items__assign_tag(
+    mock, item_1, undone_item_1, tag_1
+):
+    mock.return_value.execute.side_effect = ['tag', tag_1.id]
+
+    main.show_options_of_the_items([item_1.id, undone_item_1.id])
+
+    assert facade.get_actionable_items_with_the_tag(tag_1) == [
+        item_1,
+        undone_item_1,
+    ]
+
+
+@patch('main.FilterPrompt')
+@patch('main.inquirer.select')
+def test_show_items__filter_choice(
+    select_mock, filter_mock, item_1, done_item_1
+):
+    select_mock.return_value.execute.return_value = [main.FILTER]
+    filter_mock.return_value.execute.return_value = [done_item_1.id]
+
+    screen = main.show_items(facade.get_item_list)
+
+    choices = filter_mock.call_args.kwargs['choices']
+
+    assert [choice.value for choice in choices] == [item_1.id, done_item_1.id]
+    assert screen.kwargs['item'] == done_item_1
+
+
 def test_show_items__function_is_called():
     function_to_get_items = Mock()
     function_to_get_items.return_value = []
@@ -72,6 +309,25 @@ def test_interactive_command__calls_start_interactive(mock, runner):
     assert mock.call_count
 
 
+@patch('main.start_interactive')
+def test_interactive_command__journal_in_use(
+    mock, runner, monkeypatch, tmp_path
+):
+    journal_path = tmp_path / 'db.sqlite3.writes'
+    monkeypatch.setattr(write_behind, 'WRITE_BEHIND', True)
+    monkeypatch.setattr(
+        write_behind, 'WRITE_BEHIND_JOURNAL', str(journal_path)
+    )
+
+    with open(journal_path, 'a+') as file:
+        write_behind.lock_journal(file)
+        result = runner.invoke(main.interactive_command)
+
+    assert result.exit_code == 1
+    assert 'Another session is using the journal' in result.output
+    assert not mock.call_count
+
+
 @patch('main.clear_screen')
 def test_start_interactive__is_clearing_screen(mock, runner):
     runner.invoke(main.interactive_command)
@@ -147,6 +403,58 @@ def test_choices_for_interactive_menu__has_the_tag_name_choice(item_1, tag_1):
     ]
 
 
+def test_choices_for_interactive_menu__counts_in_the_names(
+    item_1, undone_item_1, tag_1
+):
+    item_1.tags = [tag_1]
+
+    names = [
+        choice.name
+        for choice in main.choices_for_interactive_menu()
+        if isinstance(choice, Choice)
+    ]
+
+    assert f'{main.PREFIX_IN_CHOICE}Inbox (1)' in names
+    assert f'{main.PREFIX_IN_CHOICE}Context Tag name (1)' in names
+    assert f'{main.PREFIX_IN_CHOICE}Actionable items (2)' in names
+
+
+def test_choices_for_interactive_menu__context_with_subtags(
+    item_1,
+    undone_item_1,
+    child_tag_1_of_parent_tag_1,
+    grandchild_tag_of_parent_tag_1,
+):
+    facade.assign_tag([item_1.id], child_tag_1_of_parent_tag_1)
+    facade.assign_tag([undone_item_1.id], grandchild_tag_of_parent_tag_1)
+
+    names = [
+        choice.name
+        for choice in main.choices_for_interactive_menu()
+        if isinstance(choice, Choice)
+    ]
+
+    assert f'{main.PREFIX_IN_CHOICE}Context Parent tag 1 and subtags (2)' in (
+        names
+    )
+    assert (
+        f'{main.PREFIX_IN_CHOICE}Context Child 1 of Parent tag 1 and subtags '
+        '(2)'
+    ) in names
+
+
+@patch('main.inquirer.select')
+def test_start_interactive__context_with_subtags(mock, parent_tag_1):
+    mock.return_value.execute.return_value = f'tree.{parent_tag_1.id}'
+
+    screen = main.start_interactive()
+
+    assert screen.kwargs['function_to_get_items'] == (
+        facade.get_actionable_items_under_the_tag
+    )
+    assert screen.kwargs['context'].id == parent_tag_1.id
+
+
 def test_choices_for_interactive_menu__has_no_empty_context_tag(item_1, tag_1):
     tag_1.name = 'My tag'
 
@@ -345,6 +653,44 @@ def test_questions_when_creating_or_editing_a_tag__with_parent(
     assert result.parent_id == tag_1.id
 
 
+def test_get_tag_choices__groups_at_any_depth(
+    tag_1, child_tag_1_of_parent_tag_1, grandchild_tag_of_parent_tag_1
+):
+    choices = main.get_tag_choices(tag_ids_to_select=[])
+
+    assert [
+        str(choice) if isinstance(choice, Separator) else choice.name
+        for choice in choices
+    ] == [
+        'Parent tag 1',
+        'Child 1 of Parent tag 1',
+        'Parent tag 1/Child 1 of Parent tag 1',
+        'Grandchild',
+        'Independent',
+        'Tag name',
+    ]
+
+
+@patch('main.inquirer.select')
+def test_ask_for_parent_tag_when_editing_a_tag__without_descendants(
+    select_mock,
+    tag_1,
+    child_tag_1_of_parent_tag_1,
+    grandchild_tag_of_parent_tag_1,
+):
+    main.ask_for_parent_tag_when_editing_a_tag(
+        tag_id=child_tag_1_of_parent_tag_1.id
+    )
+
+    choices = select_mock.call_args.kwargs['choices']
+
+    assert [choice.name for choice in choices] == [
+        'No parent tag',
+        'Tag name',
+        'Parent tag 1',
+    ]
+
+
 @patch('main.inquirer.confirm')
 @patch('main.ask_for_parent_tag_when_editing_a_tag')
 @patch('main.inquirer.text')
@@ -391,6 +737,19 @@ def test_create_tag__with_name_and_confirmed(
     assert len(facade.get_tag_list()) == 1
 
 
+@patch('main.inquirer.confirm')
+@patch('main.ask_for_parent_tag_when_editing_a_tag')
+@patch('main.inquirer.text')
+def test_edit_tag__confirmed(text_mock, parent_id_mock, confirm_mock, tag_1):
+    text_mock.return_value.execute.return_value = 'Something'
+    parent_id_mock.return_value = None
+    confirm_mock.return_value.execute.return_value = True
+
+    main.edit_tag(tag_1)
+
+    assert facade.get_tag_by_name('something') == tag_1
+
+
 @patch('main.inquirer.confirm')
 @patch('main.inquirer.text')
 def test_edit_item__not_confirmed(text_mock, confirm_mock, item_1):
@@ -585,6 +944,21 @@ def test_validate_selected_item_tags__with_independent_tags(
     assert main.validate_selected_item_tags(tag_id_list)
 
 
+def test_validate_selected_item_tags__without_queries(
+    count_queries, child_tag_1_of_parent_tag_1, child_tag_2_of_parent_tag_1
+):
+    tag_id_list = [
+        child_tag_1_of_parent_tag_1.id,
+        child_tag_2_of_parent_tag_1.id,
+    ]
+    main.validate_selected_item_tags(tag_id_list)
+
+    with count_queries() as statements:
+        main.validate_selected_item_tags(tag_id_list)
+
+    assert not statements
+
+
 def test_validate_selected_item_tags__with_two_tags_from_the_same_group(
     child_tag_1_of_parent_tag_1, child_tag_2_of_parent_tag_1
 ):
@@ -594,3 +968,84 @@ def test_validate_selected_item_tags__with_two_tags_from_the_same_group(
     ]
 
     assert not main.validate_selected_item_tags(tag_id_list)
+
+
+@patch('main.show_tag_options')
+@patch('main.FilterPrompt')
+@patch('main.inquirer.select')
+def test_show_tags__filter_choice(
+    select_mock, filter_mock, options_mock, tag_1, child_tag_1_of_parent_tag_1
+):
+    select_mock.return_value.execute.return_value = main.FILTER
+    filter_mock.return_value.execute.return_value = tag_1.id
+
+    main.show_tags()
+
+    choices = filter_mock.call_args.kwargs['choices']
+
+    assert len(choices) == 3
+    options_mock.assert_called_once_with(tag_1)
+
+
+def test_navigate__returns_to_the_previous_screen():
+    shown = []
+
+    def menu(default_choice=None):
+        shown.append(('menu', default_choice))
+        if default_choice is None:
+            return main.Screen(view, {'name': 'inbox'}, return_choice=2)
+        return None
+
+    def view(name):
+        shown.append(('view', name))
+
+    main.navigate(menu)
+
+    assert shown == [('menu', None), ('view', 'inbox'), ('menu', 2)]
+
+
+class ScriptedInquirer:
+    """Answers the prompts in order, recording the stack depth and the
+    number of memory blocks in use."""
+
+    def __init__(self, answers, steps_to_measure):
+        self.answers = iter(answers)
+        self.steps_to_measure = steps_to_measure
+        self.step = 0
+        self.stack_depths = set()
+        self.memory = []
+
+    def select(self, **_):
+        self.step += 1
+
+        frame, depth = sys._getframe(), 0
+        while frame:
+            frame, depth = frame.f_back, depth + 1
+        self.stack_depths.add(depth)
+
+        if self.step in self.steps_to_measure:
+            gc.collect()
+            self.memory.append(sys.getallocatedblocks())
+
+        return self
+
+    def execute(self):
+        return next(self.answers)
+
+
+def test_navigate__long_session_keeps_stack_and_memory_bounded(item_1):
+    steps = 10_000
+    cycle = ['actionable', [item_1.id], None, None]
+    answers = [*cycle * (steps // len(cycle)), None]
+    inquirer = ScriptedInquirer(answers, steps_to_measure={1_000, steps})
+
+    with patch.object(main, 'inquirer', inquirer), patch.object(
+        main, 'clear_screen', lambda: None
+    ):
+        main.navigate(main.start_interactive)
+
+    assert inquirer.step == steps + 1
+    # Every view is called by the navigation loop itself.
+    assert len(inquirer.stack_depths) == 1
+    # Keeping anything per step would add at least 9,000 blocks.
+    assert inquirer.memory[1] - inquirer.memory[0] < 1_000
@@ -1,4 +1,15 @@
+import gzip
+import io
+import json
+from unittest.mock import patch
+
+import allocator
+import facade
+import models
 import pytest
+import schemas
+from sqlalchemy import create_engine, inspect, select
+from sqlalchemy.orm import Session
 
 
 def test_item_as_str(item_1):
@@ -81,3 +92,215 @@ def test_item_with_parent_and_child_tags(
     item_1.tags.append(child_tag_2_of_parent_tag_1)
 
     assert item_1.tags == [tag_1, child_tag_2_of_parent_tag_1]
+
+
+def test_upgrade_schema__creates_missing_indexes(tmp_path):
+    engine = create_engine(f'sqlite:///{tmp_path}/old.db')
+    models.Base.metadata.create_all(bind=engine)
+    engine.execute('DROP INDEX ix_item_status_id')
+
+    models.upgrade_schema(bind=engine)
+
+    indexes = [index['name'] for index in inspect(engine).get_indexes('item')]
+
+    assert 'ix_item_status_id' in indexes
+
+
+def test_create_or_upgrade_schema__runs_once(tmp_path):
+    engine = create_engine(f'sqlite:///{tmp_path}/new.db')
+    models.create_or_upgrade_schema(bind=engine)
+
+    with patch('models.upgrade_schema') as mock:
+        models.create_or_upgrade_schema(bind=engine)
+
+    assert not mock.call_count
+
+
+def test_create_or_upgrade_schema__creates_tables(tmp_path):
+    engine = create_engine(f'sqlite:///{tmp_path}/new.db')
+
+    models.create_or_upgrade_schema(bind=engine)
+
+    assert 'item' in inspect(engine).get_table_names()
+
+
+def test_upgrade_schema__indexes_existent_items_for_search(tmp_path):
+    engine = create_engine(f'sqlite:///{tmp_path}/old.db')
+    models.Base.metadata.create_all(bind=engine)
+    for trigger in ['insert', 'delete', 'update']:
+        engine.execute(f'DROP TRIGGER item_search_{trigger}')
+    engine.execute('DROP TABLE item_search')
+    engine.execute("INSERT INTO item (id, name) VALUES (1, 'Old item')")
+
+    models.upgrade_schema(bind=engine)
+
+    result = engine.execute(
+        "SELECT rowid FROM item_search WHERE item_search MATCH 'old'"
+    )
+
+    assert result.scalars().all() == [1]
+
+
+def get_tag_paths(db_session) -> [(int, int, int)]:
+    return sorted(
+        db_session.query(
+            models.TagPath.ancestor_id,
+            models.TagPath.descendant_id,
+            models.TagPath.depth,
+        )
+    )
+
+
+def test_tag_paths__kept_on_create(
+    db_session, parent_tag_1, child_tag_1_of_parent_tag_1
+):
+    parent_id, child_id = parent_tag_1.id, child_tag_1_of_parent_tag_1.id
+
+    assert get_tag_paths(db_session) == sorted(
+        [(parent_id, parent_id, 0), (child_id, child_id, 0)]
+        + [(parent_id, child_id, 1)]
+    )
+
+
+def test_tag_paths__kept_when_a_subtree_moves(
+    db_session,
+    tag_1,
+    child_tag_1_of_parent_tag_1,
+    grandchild_tag_of_parent_tag_1,
+):
+    child_tag_1_of_parent_tag_1.parent_id = tag_1.id
+    db_session.flush()
+
+    ancestors = db_session.scalars(
+        select(models.TagPath.ancestor_id).filter_by(
+            descendant_id=grandchild_tag_of_parent_tag_1.id
+        )
+    )
+
+    assert sorted(ancestors) == sorted(
+        [
+            tag_1.id,
+            child_tag_1_of_parent_tag_1.id,
+            grandchild_tag_of_parent_tag_1.id,
+        ]
+    )
+
+
+def test_mother_tag_cannot_be_your_granddaughter(
+    parent_tag_1, grandchild_tag_of_parent_tag_1
+):
+    with pytest.raises(ValueError):
+        parent_tag_1.parent_id = grandchild_tag_of_parent_tag_1.id
+
+
+def test_upgrade_schema__builds_the_tag_paths(tmp_path):
+    engine = create_engine(f'sqlite:///{tmp_path}/old.db')
+    models.Base.metadata.create_all(bind=engine)
+    for trigger in ['insert', 'cycle', 'update', 'delete']:
+        engine.execute(f'DROP TRIGGER tag_path_{trigger}')
+    engine.execute("INSERT INTO tag (id, name) VALUES (1, 'Area')")
+    engine.execute("INSERT INTO tag (id, name, parent_id) VALUES (2, 'B', 1)")
+    engine.execute("INSERT INTO tag (id, name, parent_id) VALUES (3, 'C', 2)")
+
+    models.upgrade_schema(bind=engine)
+
+    result = engine.execute(
+        'SELECT ancestor_id, depth FROM tag_path WHERE descendant_id = 3'
+    )
+
+    assert sorted(result.all()) == [(1, 2), (2, 1), (3, 0)]
+
+
+def test_upgrade_schema__tag_paths_of_a_cycle(tmp_path):
+    engine = create_engine(f'sqlite:///{tmp_path}/old.db')
+    models.Base.metadata.create_all(bind=engine)
+    engine.execute('DROP TRIGGER tag_path_insert')
+    engine.execute("INSERT INTO tag (id, name, parent_id) VALUES (1, 'A', 2)")
+    engine.execute("INSERT INTO tag (id, name, parent_id) VALUES (2, 'B', 1)")
+
+    models.upgrade_schema(bind=engine)
+
+    result = engine.execute(
+        'SELECT ancestor_id, depth FROM tag_path WHERE descendant_id = 1'
+    )
+
+    assert sorted(result.all()) == [(1, 0), (2, 1)]
+
+
+def snapshot_file(*lines: dict) -> io.BytesIO:
+    text = ''.join(json.dumps(line) + '\n' for line in lines)
+
+    return io.BytesIO(gzip.compress(text.encode()))
+
+
+@pytest.fixture
+def session_without_triggers(tmp_path, monkeypatch):
+    """A session on a database whose tag paths are kept by the mapper."""
+    engine = create_engine(f'sqlite:///{tmp_path}/other.db')
+    models.Base.metadata.create_all(bind=engine)
+    for trigger in ['insert', 'cycle', 'update', 'delete']:
+        engine.execute(f'DROP TRIGGER tag_path_{trigger}')
+    monkeypatch.setattr(models, 'has_tag_path_triggers', lambda _: False)
+
+    session = Session(bind=engine)
+    monkeypatch.setattr(facade, 'db_session', session)
+    facade.invalidate_tag_registry()
+
+    yield session
+
+    session.close()
+    facade.invalidate_tag_registry()
+    allocator.forget_reserved_ids()
+
+
+def test_tag_paths_without_triggers(session_without_triggers):
+    area = facade.create_tag(schemas.TagCreate(name='Area'))
+    work = facade.create_tag(schemas.TagCreate(name='Work', parent_id=area.id))
+    project = facade.create_tag(
+        schemas.TagCreate(name='Project', parent_id=work.id)
+    )
+    other = facade.create_tag(schemas.TagCreate(name='Other'))
+
+    assert [tag.id for tag in facade.get_tag_ancestors(project.id)] == [
+        area.id,
+        work.id,
+    ]
+    assert facade.get_tag_text_to_show(project) == 'Project @Area/Work'
+
+    facade.edit_tag(work, schemas.TagCreate(name='Work', parent_id=other.id))
+
+    assert [tag.id for tag in facade.get_tag_ancestors(project.id)] == [
+        other.id,
+        work.id,
+    ]
+    assert facade.get_tag_descendants(area.id) == []
+
+    with pytest.raises(ValueError):
+        other.parent_id = project.id
+
+    session_without_triggers.delete(project)
+    session_without_triggers.commit()
+
+    assert facade.get_tag_descendants(other.id) == [work]
+
+
+def test_tag_paths_without_triggers__snapshot(session_without_triggers):
+    snapshot = snapshot_file(
+        {'format': 'lista-de-listas', 'version': 1, 'tags': 2, 'items': 1},
+        {'tag': 1, 'name': 'Area', 'parent': None},
+        {'tag': 2, 'name': 'Work', 'parent': 1},
+        {
+            'item': 1,
+            'name': 'Task',
+            'description': None,
+            'status': 'undone',
+            'tags': [2],
+        },
+    )
+
+    facade.import_snapshot(snapshot)
+
+    area = facade.get_tag_by_name('area')
+    assert [
+        item.name for item in facade.get_actionable_items_under_the_tag(area)
+    ] == ['Task']
@@ -0,0 +1,80 @@
+import facade
+import pytest
+import schemas
+from conftest import engine
+from sqlalchemy import event
+
+pytestmark = pytest.mark.skipif(
+    engine.dialect.name != 'sqlite', reason='EXPLAIN QUERY PLAN is SQLite'
+)
+
+
+@pytest.fixture(autouse=True)
+def some_data(db_session, parent_tag_1, child_tag_1_of_parent_tag_1):
+    facade.create_items(
+        schemas.ItemCreate(name=f'Item {index}') for index in range(10)
+    )
+    facade.get_item_list()[0].tags = [child_tag_1_of_parent_tag_1]
+    db_session.commit()
+
+
+def query_plans(function, *args) -> [[str]]:
+    executed = []
+
+    def before_cursor_execute(_conn, _cursor, statement, parameters, *_):
+        executed.append((statement, parameters))
+
+    event.listen(engine, 'before_cursor_execute', before_cursor_execute)
+    try:
+        function(*args)
+    finally:
+        event.remove(engine, 'before_cursor_execute', before_cursor_execute)
+
+    with engine.connect() as connection:
+        return [
+            [
+                row[-1]
+                for row in connection.exec_driver_sql(
+                    f'EXPLAIN QUERY PLAN {statement}', parameters
+                )
+            ]
+            for statement, parameters in executed
+        ]
+
+
+@pytest.mark.parametrize(
+    'function',
+    [
+        facade.get_item_list,
+        facade.get_actionable_items,
+        facade.get_inbox_items,
+        facade.get_tag_list,
+        facade.get_list_of_tags_with_items,
+        facade.get_list_of_tags_with_actionable_items,
+        facade.get_actionable_tag_list,
+        facade.get_tag_list_without_parent,
+    ],
+)
+def test_query_plan__uses_indexes(function):
+    for plan in query_plans(function):
+        assert [step for step in plan if step.startswith('SCAN')] == []
+
+
+def test_query_plan__items_with_the_tag(tag_1):
+    for plan in query_plans(facade.get_actionable_items_with_the_tag, tag_1):
+        assert [step for step in plan if step.startswith('SCAN')] == []
+
+
+def test_query_plan__actionable_items_by_status():
+    plan = query_plans(facade.get_actionable_items, None, 100, None)[0]
+
+    assert plan == [
+        'SEARCH item USING INDEX ix_item_status_id (status=? AND id>?)'
+    ]
+
+
+def test_query_plan__view_summary_uses_indexes():
+    (plan,) = query_plans(facade.load_view_summary)
+
+    # None of the four counts scans a table.
+    assert [step for step in plan if step.startswith('SCAN')] == []
@@ -0,0 +1,235 @@
+import gzip
+import io
+import json
+
+import facade
+import models
+import pytest
+import schemas
+import snapshot
+from sqlalchemy import delete
+
+
+@pytest.fixture
+def tagged_items(db_session, parent_tag_1, child_tag_1_of_parent_tag_1):
+    facade.create_items(
+        [
+            schemas.ItemCreate(name='First', description='Text'),
+            schemas.ItemCreate(name='Second', status=schemas.ItemStatus.DONE),
+            schemas.ItemCreate(name='Third'),
+        ]
+    )
+    first, _, third = facade.get_item_list()
+    facade.assign_tag([first.id, third.id], child_tag_1_of_parent_tag_1)
+    facade.assign_tag([third.id], parent_tag_1)
+
+
+def export() -> bytes:
+    output = io.BytesIO()
+    facade.export_snapshot(output)
+
+    return output.getvalue()
+
+
+def make_snapshot(*lines: dict) -> io.BytesIO:
+    text = ''.join(json.dumps(line) + '\n' for line in lines)
+
+    return io.BytesIO(gzip.compress(text.encode()))
+
+
+def delete_lists(db_session):
+    for model in [models.ItemTag, models.Item, models.Tag, models.ViewCounter]:
+        db_session.execute(delete(model))
+    db_session.commit()
+
+
+def get_items_with_tags() -> [(str, str, str, [str])]:
+    return [
+        (
+            item.name,
+            item.description,
+            item.status,
+            sorted(tag.name for tag in item.tags),
+        )
+        for item in facade.iterate_items(statuses=list(schemas.ItemStatus))
+    ]
+
+
+def test_write_snapshot(tagged_items, parent_tag_1):
+    lines = gzip.decompress(export()).decode().splitlines()
+
+    assert json.loads(lines[0]) == {
+        'format': 'lista-de-listas',
+        'version': 1,
+        'tags': 2,
+        'items': 3,
+    }
+    assert json.loads(lines[1]) == {
+        'tag': parent_tag_1.id,
+        'name': 'Parent tag 1',
+        'parent': None,
+    }
+    assert json.loads(lines[5])['tags'] == sorted(
+        tag.id for tag in facade.get_tag_list()
+    )
+
+
+def test_write_snapshot__parents_before_children(db_session, parent_tag_1):
+    child = facade.create_tag(schemas.TagCreate(name='Child'))
+    facade.edit_tag(
+        parent_tag_1, schemas.TagCreate(name='Parent', parent_id=child.id)
+    )
+
+    lines = gzip.decompress(export()).decode().splitlines()
+
+    assert [json.loads(line)['name'] for line in lines[1:]] == [
+        'Child',
+        'Parent',
+    ]
+
+
+def test_read_snapshot__round_trip(db_session, tagged_items):
+    data = export()
+    expected = get_items_with_tags()
+    delete_lists(db_session)
+
+    assert facade.import_snapshot(io.BytesIO(data)) == (2, 3)
+    assert get_items_with_tags() == expected
+    assert facade.get_tag_by_name('Child 1 of Parent tag 1').parent_id == (
+        facade.get_tag_by_name('Parent tag 1').id
+    )
+
+
+def test_read_snapshot__new_ids_and_existing_tags(db_session, tagged_items):
+    data = export()
+    tag_ids = {tag.id for tag in facade.get_tag_list()}
+
+    facade.import_snapshot(io.BytesIO(data))
+
+    items = get_items_with_tags()
+    assert items[3:] == items[:3]
+    assert {tag.id for tag in facade.get_tag_list()} == tag_ids
+
+
+def test_read_snapshot__counts_only_the_created_tags(db_session, tag_1):
+    data = make_snapshot(
+        {'format': 'lista-de-listas', 'version': 1, 'tags': 2, 'items': 0},
+        {'tag': 1, 'name': 'TAG NAME', 'parent': None},
+        {'tag': 2, 'name': 'New', 'parent': 1},
+    )
+
+    assert facade.import_snapshot(data) == (1, 0)
+    assert facade.get_tag_by_name('new').parent_id == tag_1.id
+    assert len(facade.get_tag_list()) == 2
+
+
+def test_read_snapshot__same_name_under_other_parents(
+    db_session, parent_tag_1
+):
+    data = make_snapshot(
+        {'format': 'lista-de-listas', 'version': 1, 'tags': 4, 'items': 0},
+        {'tag': 1, 'name': 'Parent tag 1', 'parent': None},
+        {'tag': 2, 'name': 'Other', 'parent': None},
+        {'tag': 3, 'name': 'Next', 'parent': 1},
+        {'tag': 4, 'name': 'Next', 'parent': 2},
+    )
+
+    assert facade.import_snapshot(data) == (3, 0)
+    assert sorted(
+        tag.parent_id for tag in facade.get_tag_list() if tag.name == 'Next'
+    ) == sorted([parent_tag_1.id, facade.get_tag_by_name('other').id])
+
+
+def test_read_snapshot__counted(db_session, tagged_items, view_counters):
+    data = export()
+    delete_lists(db_session)
+
+    facade.import_snapshot(io.BytesIO(data))
+
+    assert facade.get_view_summary().actionable == 2
+    assert facade.check_view_counters() == []
+
+
+def test_read_snapshot__not_a_snapshot():
+    with pytest.raises(snapshot.SnapshotError, match='not a snapshot'):
+        facade.import_snapshot(make_snapshot({'name': 'An item'}))
+
+
+def test_read_snapshot__newer_version():
+    file = make_snapshot({'format': 'lista-de-listas', 'version': 2})
+
+    with pytest.raises(snapshot.SnapshotError, match='version 2'):
+        facade.import_snapshot(file)
+
+
+@pytest.mark.parametrize('missing', ['tags', 'items'])
+def test_read_snapshot__header_without_counts(missing):
+    header = {'format': 'lista-de-listas', 'version': 1, 'tags': 0, 'items': 0}
+    del header[missing]
+
+    with pytest.raises(snapshot.SnapshotError, match=f'no {missing} count'):
+        facade.import_snapshot(make_snapshot(header))
+
+
+@pytest.mark.parametrize(
+    'line, message',
+    [
+        ({'tag': 1, 'parent': None}, 'tag on line 2'),
+        ({'tag': 1, 'name': ' ', 'parent': None}, 'tag on line 2'),
+        ({'item': 1, 'status': 'undone', 'tags': []}, 'item on line 2'),
+        (
+            {'item': 1, 'name': '  ', 'status': 'undone', 'tags': []},
+            'item on line 2',
+        ),
+        ([], 'Invalid snapshot line'),
+    ],
+)
+def test_read_snapshot__invalid_line(db_session, line, message):
+    tags = 1 if 'tag' in line else 0
+    header = {
+        'format': 'lista-de-listas',
+        'version': 1,
+        'tags': tags,
+        'items': 1 - tags,
+    }
+
+    with pytest.raises(snapshot.SnapshotError, match=message):
+        facade.import_snapshot(make_snapshot(header, line))
+
+    assert facade.get_item_list() == []
+
+
+def test_read_snapshot__nothing_written_on_error(db_session):
+    file = make_snapshot(
+        {'format': 'lista-de-listas', 'version': 1, 'tags': 1, 'items': 2},
+        {'tag': 7, 'name': 'Next', 'parent': None},
+        {'item': 1, 'name': 'First', 'status': 'undone', 'tags': [7]},
+        {'item': 2, 'name': 'Second', 'status': 'undone', 'tags': [8]},
+    )
+
+    with pytest.raises(snapshot.SnapshotError, match='Second'):
+        facade.import_snapshot(file)
+
+    assert facade.get_tag_list() == []
+    assert facade.get_item_list() == []
+
+
+def test_read_snapshot__fewer_items_than_expected():
+    file = make_snapshot(
+        {'format': 'lista-de-listas', 'version': 1, 'tags': 0, 'items': 1},
+    )
+
+    with pytest.raises(snapshot.SnapshotError, match='fewer items'):
+        facade.import_snapshot(file)
+
+
+def test_export_snapshot__parents_before_children(tag_1, parent_tag_1):
+    tag_1.parent_id = parent_tag_1.id
+    facade.db_session.commit()
+
+    lines = gzip.decompress(export()).decode().splitlines()
+
+    assert [json.loads(line)['tag'] for line in lines[1:3]] == [
+        parent_tag_1.id,
+        tag_1.id,
+    ]
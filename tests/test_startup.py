@@ -0,0 +1,55 @@
+import os
+import subprocess
+import sys
+
+import pytest
+from decouple import config
+
+PACKAGE_DIR = os.path.join(
+    os.path.dirname(__file__), '..', 'lista_de_listas_cli'
+)
+
+STARTUP_TIME_BUDGET: float = config('STARTUP_TIME_BUDGET', 0.75, cast=float)
+
+
+def import_times(*arguments: str, tmp_path) -> {str: float}:
+    environment = {
+        **os.environ,
+        'DATABASE_URL': f'sqlite:///{tmp_path}/startup.db',
+    }
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', *arguments],
+        cwd=PACKAGE_DIR,
+        env=environment,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+
+    times = {}
+    for line in result.stderr.splitlines():
+        if line.startswith('import time:') and '|' in line:
+            _, cumulative, name = line.split('|')
+            if cumulative.strip().isdigit():
+                times[name.strip()] = int(cumulative) / 1_000_000
+
+    return times
+
+
+@pytest.mark.parametrize('module', ['InquirerPy', 'prompt_toolkit'])
+def test_add_command__does_not_import_prompts(tmp_path, module):
+    times = import_times('main.py', 'add', 'Something', tmp_path=tmp_path)
+
+    assert module not in times
+
+
+def test_add_command__does_not_import_the_daemon(tmp_path):
+    times = import_times('main.py', 'add', 'Something', tmp_path=tmp_path)
+
+    assert 'daemon_client' in times and 'daemon' not in times
+
+
+def test_import_main__under_startup_budget(tmp_path):
+    times = import_times('-c', 'import main', tmp_path=tmp_path)
+
+    assert times['main'] < STARTUP_TIME_BUDGET
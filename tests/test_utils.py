@@ -1,5 +1,8 @@
-from unittest.mock import Mock
+import os
+import re
 
+import pytest
+import schemas
 import utils
 
 
@@ -10,50 +13,61 @@ def test_clear_screen(capsys):
     assert not out + error
 
 
-def test_return_to__called():
-    @utils.return_to
-    def function_to_call(**_):
-        pass
+def test_get_selected_items_info__no_items():
+    assert utils.get_selected_items_info([]) is None
 
-    function_to_return = Mock()
 
-    function_to_call(return_func=function_to_return)
+def test_get_selected_items_info__with_one_item():
+    assert utils.get_selected_items_info([1]) == 1
 
-    function_to_return.assert_called_once()
 
+def test_get_selected_items_info__with_two_items():
+    assert utils.get_selected_items_info([1, 2]) == '2 items selected'
 
-def test_return_to__called_with_return_args():
-    @utils.return_to
-    def function_to_call(**_):
-        pass
 
-    function_to_return = Mock()
-    return_args = {'id': 1}
+def test_read_items_from_lines__text():
+    result = list(utils.read_items_from_lines(['First\n', ' \n', 'Second']))
 
-    function_to_call(return_func=function_to_return, return_args=return_args)
+    assert [item.name for item in result] == ['First', 'Second']
 
-    function_to_return.assert_called_once_with(**return_args)
 
+def test_read_items_from_lines__jsonl():
+    lines = ['{"name": "First", "status": "note"}']
 
-def test_return_to__called_with_return_choice():
-    @utils.return_to
-    def function_to_call(**_):
-        pass
+    result = list(utils.read_items_from_lines(lines, file_format='jsonl'))
 
-    function_to_return = Mock()
+    assert result[0].status == schemas.ItemStatus.NOTE
 
-    function_to_call(return_func=function_to_return, return_choice=1)
 
-    function_to_return.assert_called_once_with(default_choice=1)
+@pytest.mark.parametrize(
+    'line, message',
+    [
+        ('{"name": ', 'Line 2: invalid JSON'),
+        ('["First"]', 'Line 2: expected a JSON object.'),
+        ('{"name": " "}', 'Line 2: Name cannot be empty.'),
+        ('{"name": "First", "tags": ["Next"]}', 'Line 2: tags cannot'),
+    ],
+)
+def test_read_items_from_lines__invalid_jsonl(line, message):
+    lines = ['{"name": "First"}', line]
 
+    with pytest.raises(utils.ItemLineError, match=re.escape(message)):
+        list(utils.read_items_from_lines(lines, file_format='jsonl'))
 
-def test_get_selected_items_info__no_items():
-    assert utils.get_selected_items_info([]) is None
 
+def test_lazy_import__module_attribute():
+    lazy_path = utils.LazyImport('os', 'path')
 
-def test_get_selected_items_info__with_one_item():
-    assert utils.get_selected_items_info([1]) == 1
+    assert lazy_path.join('a', 'b') == os.path.join('a', 'b')
 
 
-def test_get_selected_items_info__with_two_items():
-    assert utils.get_selected_items_info([1, 2]) == '2 items selected'
+def test_lazy_import__callable():
+    lazy_loads = utils.LazyImport('json', 'loads')
+
+    assert lazy_loads('[1]') == [1]
+
+
+def test_lazy_import__not_loaded_by_dunder_lookup():
+    lazy_module = utils.LazyImport('module_that_does_not_exist')
+
+    assert not hasattr(lazy_module, '__origin__')
@@ -0,0 +1,211 @@
+import json
+import time
+
+import facade
+import models
+import pytest
+import schemas
+import write_behind
+from conftest import engine
+from sqlalchemy.exc import OperationalError
+
+
+@pytest.fixture
+def journal_path(tmp_path):
+    return tmp_path / 'db.sqlite3.writes'
+
+
+@pytest.fixture
+def writer(db_session, journal_path):
+    facade.start_write_behind(str(journal_path))
+    writer = facade._write_behind['writer']
+    writer.max_pending = 3
+
+    yield writer
+
+    facade.stop_write_behind()
+
+
+def count_committed_items() -> int:
+    with engine.connect() as connection:
+        return connection.exec_driver_sql('SELECT COUNT(*) FROM item').scalar()
+
+
+def write_journal(path, batch: int, changes: [list], tail: str = ''):
+    header = {'database': str(engine.url), 'batch': batch}
+    lines = [json.dumps(header)] + [json.dumps(change) for change in changes]
+
+    path.write_text('\n'.join(lines) + '\n' + tail)
+
+
+def insert_item(item_id: int, name: str) -> list:
+    return [
+        [
+            'INSERT INTO item (id, name, description, status) '
+            'VALUES (?, ?, ?, ?)',
+            [item_id, name, None, 'UNDONE'],
+            False,
+        ]
+    ]
+
+
+def test_get_journal_path(monkeypatch):
+    monkeypatch.setattr(write_behind, 'WRITE_BEHIND_JOURNAL', None)
+
+    assert write_behind.get_journal_path(engine).endswith('test.db.writes')
+
+
+def test_commit__batches_the_changes(writer, journal_path):
+    facade.create_item(schemas.ItemCreate(name='First'))
+    facade.create_item(schemas.ItemCreate(name='Second'))
+
+    assert count_committed_items() == 0
+    assert len(journal_path.read_text().splitlines()) == 3
+    assert [item.name for item in facade.get_item_list()] == [
+        'First',
+        'Second',
+    ]
+
+    facade.create_item(schemas.ItemCreate(name='Third'))
+
+    assert count_committed_items() == 3
+    assert journal_path.read_text() == ''
+
+
+def test_insert_items__batched(writer):
+    facade.insert_items([schemas.ItemCreate(name='First')])
+
+    assert writer.pending == 1
+    assert count_committed_items() == 0
+
+
+def test_commit__on_the_timer_while_waiting_for_input(writer):
+    writer.interval = 0.01
+    facade.create_item(schemas.ItemCreate(name='First'))
+    time.sleep(0.05)
+
+    assert count_committed_items() == 0
+
+    with facade.waiting_for_input():
+        for _ in range(100):
+            if not writer.pending:
+                break
+            time.sleep(0.01)
+
+    assert count_committed_items() == 1
+
+
+def test_commit__on_the_timer_again_after_a_failure(writer, monkeypatch):
+    writer.interval = 0.01
+    facade.create_item(schemas.ItemCreate(name='First'))
+    writer.cancel_timer()
+    commit = writer.commit
+
+    def fail_once():
+        monkeypatch.setattr(writer, 'commit', commit)
+        raise OperationalError('COMMIT', None, Exception('database is locked'))
+
+    monkeypatch.setattr(writer, 'commit', fail_once)
+
+    with facade.waiting_for_input():
+        writer.commit_when_idle()
+        for _ in range(100):
+            if not writer.pending:
+                break
+            time.sleep(0.01)
+
+    assert count_committed_items() == 1
+
+
+def test_commit_pending_writes(writer, item_1, tag_1):
+    facade.set_item_tags(item_1.id, [tag_1.id])
+
+    facade.commit_pending_writes()
+
+    assert writer.pending == 0
+    assert count_committed_items() == 1
+
+
+def test_stop_write_behind__commits(writer, journal_path):
+    facade.create_item(schemas.ItemCreate(name='First'))
+
+    facade.stop_write_behind()
+    facade.start_write_behind(str(journal_path))
+
+    assert count_committed_items() == 1
+
+
+def test_rollback__keeps_the_journaled_changes(writer, db_session, item_1):
+    facade.edit_item(item_1, schemas.ItemCreate(name='Renamed'))
+    db_session.add(models.Tag(id=1, name='Lost'))
+    db_session.flush()
+
+    db_session.rollback()
+
+    assert facade.get_item(item_1.id).name == 'Renamed'
+    assert facade.get_tag(1) is None
+
+
+def test_start_write_behind__applies_the_journal(db_session, journal_path):
+    write_journal(
+        journal_path,
+        1,
+        [insert_item(1, 'First'), insert_item(2, 'Second')],
+        tail='[["INSERT INTO item',
+    )
+
+    assert facade.start_write_behind(str(journal_path)) == 2
+    facade.stop_write_behind()
+
+    assert [item.name for item in facade.get_item_list()] == [
+        'First',
+        'Second',
+    ]
+    assert journal_path.read_text() == ''
+
+
+def test_start_write_behind__skips_a_committed_journal(
+    db_session, journal_path
+):
+    db_session.add(models.JournalBatch(journal=str(journal_path), batch=1))
+    db_session.commit()
+    write_journal(journal_path, 1, [insert_item(1, 'First')])
+
+    assert facade.start_write_behind(str(journal_path)) == 0
+    facade.stop_write_behind()
+
+    assert count_committed_items() == 0
+
+
+def test_start_write_behind__journal_of_another_database(
+    db_session, journal_path
+):
+    journal_path.write_text(
+        json.dumps({'database': 'sqlite:///other.db', 'batch': 1})
+        + '\n'
+        + json.dumps(insert_item(1, 'First'))
+        + '\n'
+    )
+
+    with pytest.raises(write_behind.JournalError):
+        facade.start_write_behind(str(journal_path))
+
+
+def test_start_write_behind__journal_in_use(db_session, journal_path):
+    with open(journal_path, 'a+') as file:
+        write_behind.lock_journal(file)
+
+        with pytest.raises(write_behind.JournalError, match='Another session'):
+            facade.start_write_behind(str(journal_path))
+
+    assert facade._write_behind['writer'] is None
+
+
+def test_create_item__after_the_reserved_ids(writer, monkeypatch):
+    monkeypatch.setattr(writer, 'max_pending', 100)
+
+    for number in range(60):
+        facade.create_item(schemas.ItemCreate(name=f'Item {number}'))
+
+    assert 0 < count_committed_items() < 60
+    assert len(facade.get_item_list(limit=100)) == 60